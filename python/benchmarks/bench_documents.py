@@ -0,0 +1,68 @@
+"""Per-batch overhead of building the GraphQL document of a request.
+
+Compares parsing (and validating) the document on every batch, which is
+what the client did before documents were cached, with the cached
+``build_document``/``validate_document`` path.
+
+Usage::
+
+    sierrapy introspection -o schema.json
+    python benchmarks/bench_documents.py --introspection schema.json
+
+Without ``--introspection`` only the parsing overhead is measured.
+"""
+import json
+import timeit
+import click  # type: ignore
+from typing import Optional, TextIO, Dict
+
+from gql import gql
+from graphql import GraphQLSchema, build_client_schema, validate
+from graphql.language.ast import DocumentNode as gqlDocument
+
+from sierrapy import fragments
+from sierrapy.sierraclient import (
+    SEQUENCE_ANALYSIS_QUERY, build_document, validate_document
+)
+
+
+@click.command()
+@click.option('--introspection', type=click.File('r'),
+              help='Introspection JSON used to validate the documents.')
+@click.option('-q', '--query', type=click.File('r'),
+              help=('Fragment on `SequenceAnalysis`.  '
+                    '[default: HIV-1 default fragment]'))
+@click.option('-n', '--number', type=int, default=200, show_default=True,
+              help='Number of simulated batches.')
+def main(
+    introspection: Optional[TextIO],
+    query: Optional[TextIO],
+    number: int
+) -> None:
+    schema: Optional[GraphQLSchema] = None
+    if introspection:
+        schema = build_client_schema(json.load(introspection))
+    query_text: str = (
+        query.read() if query else fragments.HIV1_SEQUENCE_ANALYSIS_DEFAULT
+    )
+    validated: Dict[int, gqlDocument] = {}
+
+    def before() -> None:
+        document: gqlDocument = gql(
+            SEQUENCE_ANALYSIS_QUERY.format(query=query_text))
+        if schema is not None:
+            validate(schema, document)
+
+    def after() -> None:
+        document: gqlDocument = build_document('sequenceAnalysis', query_text)
+        validate_document(schema, document, validated)
+
+    for name, func in (('before', before), ('after', after)):
+        seconds: float = timeit.timeit(func, number=number)
+        click.echo('{:<6}  {:9.3f} ms/batch  ({} batches{})'.format(
+            name, seconds / number * 1000, number,
+            ', validated' if schema is not None else ''))
+
+
+if __name__ == '__main__':
+    main()
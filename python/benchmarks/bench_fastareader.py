@@ -0,0 +1,134 @@
+"""Throughput of the FASTA readers on a large FASTA file.
+
+Compares the line-based ``fastareader.load`` with the block-based
+``iter_records``, the memory-mapped ``iter_file_records`` and, with
+``--gzip``, ``iter_file_records`` on a gzip compressed copy. All readers
+must return the same records.
+
+Usage::
+
+    # a synthetic file of SARS-CoV-2 sized records
+    python benchmarks/bench_fastareader.py --size-mb 2048
+    # or an existing file, e.g. a GISAID download
+    python benchmarks/bench_fastareader.py --fasta sequences.fasta
+"""
+import os
+import gzip
+import time
+import random
+import shutil
+import hashlib
+import tempfile
+import click  # type: ignore
+from typing import Optional, Iterator, Callable, Tuple, List
+
+from sierrapy import fastareader
+from sierrapy.common_types import Sequence
+
+
+def write_fasta(
+    path: str,
+    size_mb: int,
+    seq_length: int,
+    line_width: int
+) -> None:
+    idx: int = 0
+    pos: int
+    rand: random.Random = random.Random(0)
+    # a pool of random lines keeps generating the file fast
+    pool: List[bytes] = [
+        bytes(rand.choice(b'ACGTACGTACGTN') for _ in range(line_width))
+        for _ in range(997)
+    ]
+    with open(path, 'wb') as fp:
+        while fp.tell() < size_mb * 1024 * 1024:
+            fp.write('>hCoV-19/Synthetic/{}/2021|EPI_ISL_{}|2021-01-01\n'
+                     .format(idx, idx).encode('ASCII'))
+            for pos in range(0, seq_length, line_width):
+                fp.write(pool[(idx + pos) % len(pool)]
+                         [:seq_length - pos] + b'\n')
+            idx += 1
+
+
+def digest(records: Iterator[Sequence]) -> Tuple[int, int, str]:
+    count: int = 0
+    nucleotides: int = 0
+    sha1 = hashlib.sha1()
+    for seq in records:
+        count += 1
+        nucleotides += len(seq['sequence'])
+        sha1.update(seq['header'].encode('U8'))
+        sha1.update(seq['sequence'].encode('ASCII'))
+    return count, nucleotides, sha1.hexdigest()
+
+
+def read_load(path: str) -> Iterator[Sequence]:
+    with open(path) as fp:
+        yield from fastareader.load(fp)
+
+
+def read_blocks(path: str) -> Iterator[Sequence]:
+    with open(path, 'rb') as fp:
+        for seq, _ in fastareader.iter_records(fp):
+            yield seq
+
+
+@click.command()
+@click.option('--fasta', type=click.Path(exists=True, dir_okay=False),
+              help='FASTA file to read instead of a synthetic one.')
+@click.option('--size-mb', type=int, default=2048, show_default=True,
+              help='Size of the synthetic FASTA file.')
+@click.option('--seq-length', type=int, default=29903, show_default=True,
+              help='Length of each synthetic sequence.')
+@click.option('--line-width', type=int, default=60, show_default=True,
+              help='Line width of the synthetic sequences.')
+@click.option('--gzip', 'use_gzip', is_flag=True,
+              help='Also read a gzip compressed copy of the file.')
+def main(
+    fasta: Optional[str],
+    size_mb: int,
+    seq_length: int,
+    line_width: int,
+    use_gzip: bool
+) -> None:
+    tmpdir: str = tempfile.mkdtemp()
+    try:
+        if not fasta:
+            fasta = os.path.join(tmpdir, 'synthetic.fasta')
+            write_fasta(fasta, size_mb, seq_length, line_width)
+        readers: List[Tuple[str, str, Callable[[str], Iterator[Sequence]]]]
+        readers = [
+            ('load', fasta, read_load),
+            ('iter_records', fasta, read_blocks),
+            ('iter_file_records', fasta, fastareader.load_file)
+        ]
+        if use_gzip:
+            gz_path: str = os.path.join(tmpdir, 'copy.fasta.gz')
+            with open(fasta, 'rb') as src, \
+                    gzip.open(gz_path, 'wb', compresslevel=1) as dst:
+                shutil.copyfileobj(src, dst)
+            readers.append(('iter_file_records (gz)', gz_path,
+                            fastareader.load_file))
+        size: int = os.path.getsize(fasta)
+        click.echo('{}: {:.1f} MiB'.format(fasta, size / 1024 / 1024))
+        results: List[Tuple[int, int, str]] = []
+        for name, path, reader in readers:
+            start: float = time.perf_counter()
+            result: Tuple[int, int, str] = digest(reader(path))
+            elapsed: float = time.perf_counter() - start
+            results.append(result)
+            click.echo(
+                '{:<24} {:7.2f} s {:8.1f} MiB/s {:9.0f} records/s'.format(
+                    name, elapsed, size / 1024 / 1024 / elapsed,
+                    result[0] / elapsed))
+        if len(set(results)) > 1:
+            raise click.ClickException(
+                'Readers returned different records: {}'.format(results))
+        click.echo('{} records, {} nucleotides; all readers agree'.format(
+            results[0][0], results[0][1]))
+    finally:
+        shutil.rmtree(tmpdir)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,93 @@
+"""Peak memory of writing a JSON array of analysis results.
+
+Compares ``json.dump(list(results))``, which is what the ``fasta`` and
+``patterns`` commands did before, with the streaming ``JSONArrayWriter``.
+Results are generated on the fly, so the streaming writer should only
+hold about one result at a time regardless of ``--number``.
+
+Usage::
+
+    python benchmarks/bench_json_output.py -n 20000
+"""
+import os
+import json
+import time
+import tempfile
+import tracemalloc
+import click  # type: ignore
+from typing import Dict, Any, Iterator, Callable, Tuple
+
+from sierrapy.jsonstream import JSONArrayWriter
+
+
+def fake_results(number: int, size: int) -> Iterator[Dict[str, Any]]:
+    idx: int
+    for idx in range(number):
+        yield {
+            'inputSequence': {'header': 'seq{}'.format(idx)},
+            'alignedGeneSequences': [{
+                'gene': {'name': gene},
+                'mutations': [{
+                    'text': 'M{}V'.format(pos),
+                    'primaryType': 'Other',
+                    'comments': ['x' * 40]
+                } for pos in range(size)]
+            } for gene in ('PR', 'RT', 'IN')]
+        }
+
+
+def buffered(path: str, number: int, size: int, ugly: bool) -> None:
+    with open(path, 'w') as fp:
+        json.dump(list(fake_results(number, size)), fp,
+                  indent=None if ugly else 2)
+
+
+def streaming(path: str, number: int, size: int, ugly: bool) -> None:
+    result: Dict[str, Any]
+    with open(path, 'w') as fp, \
+            JSONArrayWriter(fp, indent=None if ugly else 2) as writer:
+        for result in fake_results(number, size):
+            writer.write(result)
+
+
+def measure(
+    func: Callable[[str, int, int, bool], None],
+    path: str,
+    number: int,
+    size: int,
+    ugly: bool
+) -> Tuple[float, int]:
+    tracemalloc.start()
+    start: float = time.perf_counter()
+    func(path, number, size, ugly)
+    elapsed: float = time.perf_counter() - start
+    peak: int = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return elapsed, peak
+
+
+@click.command()
+@click.option('-n', '--number', type=int, default=5000, show_default=True,
+              help='Number of results.')
+@click.option('--size', type=int, default=20, show_default=True,
+              help='Number of mutations per gene of each result.')
+@click.option('--ugly', is_flag=True, help='Output compressed JSON.')
+def main(number: int, size: int, ugly: bool) -> None:
+    outputs: Dict[str, str] = {}
+    with tempfile.TemporaryDirectory() as tmpdir:
+        for name, func in (('buffered', buffered),
+                           ('streaming', streaming)):
+            path: str = os.path.join(tmpdir, name + '.json')
+            elapsed, peak = measure(func, path, number, size, ugly)
+            click.echo('{:<10} {:8.2f} s  peak {:10.1f} MiB'.format(
+                name, elapsed, peak / 1024 / 1024))
+            with open(path) as fp:
+                outputs[name] = fp.read()
+    if outputs['buffered'] != outputs['streaming']:
+        raise click.ClickException('Outputs differ')
+    click.echo('Outputs are identical ({} bytes)'.format(
+        len(outputs['streaming'])))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,145 @@
+"""Throughput and peak memory of recipes on a synthetic result file.
+
+Each recipe runs in a subprocess on the first 10%, 50% and 100% of the
+records, so both the time per record and the peak RSS can be compared
+across input sizes. ``--baseline`` also runs the previous implementation,
+which loaded the whole file with ``json.load`` and validated the entire
+list before writing anything.
+
+Usage::
+
+    python benchmarks/bench_recipes.py -n 100000
+"""
+import os
+import sys
+import json
+import time
+import random
+import tempfile
+import subprocess
+import click  # type: ignore
+from typing import Dict, Any, List, Tuple
+
+GENES: Dict[str, int] = {'PR': 99, 'RT': 560, 'IN': 288}
+
+BASELINE: str = '''
+import csv, json, sys, importlib
+from voluptuous import Schema
+module = importlib.import_module('sierrapy.recipes.{recipe}')
+schema = module.schema
+sequences = json.load(open(sys.argv[1]))
+Schema([schema.schema], extra=schema.extra)(sequences)
+writer = csv.writer(open(sys.argv[2], 'w'), delimiter='\\t')
+for seq in sequences:
+    {write}
+'''
+
+BASELINE_WRITE: Dict[str, str] = {
+    'mutationtsv': 'writer.writerow(module.mutation_row(seq))',
+    'sequencetsv': 'writer.writerows(module.sequence_rows(seq))',
+    'alignment': "module.aligned_pol(seq, 'hxb2strip')"
+}
+
+
+def fake_record(idx: int, rand: random.Random) -> Dict[str, Any]:
+    genes: List[Dict[str, Any]] = []
+    for gene, size in GENES.items():
+        first_aa: int = rand.randint(1, 10)
+        last_aa: int = size - rand.randint(0, 10)
+        genes.append({
+            'gene': {'name': gene},
+            'firstAA': first_aa,
+            'lastAA': last_aa,
+            'alignedNAs': ''.join(
+                rand.choice('ACGT') for _ in range(
+                    (last_aa - first_aa + 1) * 3)),
+            'mutations': [{
+                'consensus': 'M',
+                'position': rand.randint(first_aa, last_aa),
+                'AAs': rand.choice(['L', 'V', 'I', '-'])
+            } for _ in range(rand.randint(0, 12))],
+            'prettyPairwise': {
+                'positionLine': [str(pos) for pos in range(1, 11)],
+                'alignedNAsLine': ['AAA'] * 10
+            }
+        })
+    return {
+        'inputSequence': {'header': 'seq{}'.format(idx)},
+        'alignedGeneSequences': genes
+    }
+
+
+def write_input(path: str, number: int, jsonl: bool) -> None:
+    idx: int
+    rand: random.Random = random.Random(number)
+    with open(path, 'w') as fp:
+        if not jsonl:
+            fp.write('[')
+        for idx in range(number):
+            if jsonl:
+                fp.write(json.dumps(fake_record(idx, rand)) + '\n')
+            else:
+                fp.write((', ' if idx else '') +
+                         json.dumps(fake_record(idx, rand)))
+        if not jsonl:
+            fp.write(']')
+
+
+def run(args: List[str]) -> Tuple[float, float]:
+    start: float = time.perf_counter()
+    proc: subprocess.Popen = subprocess.Popen(args)
+    _, status, rusage = os.wait4(proc.pid, 0)
+    elapsed: float = time.perf_counter() - start
+    proc.returncode = os.waitstatus_to_exitcode(status)
+    if proc.returncode:
+        raise click.ClickException('{} failed'.format(' '.join(args)))
+    # ru_maxrss is in KiB on Linux
+    return elapsed, rusage.ru_maxrss / 1024
+
+
+@click.command()
+@click.option('-n', '--number', type=int, default=100000, show_default=True,
+              help='Number of records of the largest input.')
+@click.option('--recipe', 'recipes', multiple=True,
+              type=click.Choice(list(BASELINE_WRITE)),
+              default=['mutationtsv', 'sequencetsv'], show_default=True,
+              help='Recipes to run.')
+@click.option('--jsonl', is_flag=True, help='Use JSON Lines input.')
+@click.option('--baseline', is_flag=True,
+              help='Also run the load-and-validate-everything approach.')
+def main(
+    number: int,
+    recipes: Tuple[str, ...],
+    jsonl: bool,
+    baseline: bool
+) -> None:
+    with tempfile.TemporaryDirectory() as tmpdir:
+        output: str = os.path.join(tmpdir, 'output')
+        for fraction in (10, 50, 100):
+            size: int = number * fraction // 100
+            path: str = os.path.join(tmpdir, 'input{}.json'.format(size))
+            write_input(path, size, jsonl)
+            for recipe in recipes:
+                commands: List[Tuple[str, List[str]]] = [(
+                    'streaming',
+                    [sys.executable, '-m', 'sierrapy.cmds', 'recipe',
+                     '--input', path, '--output', output, recipe]
+                )]
+                if baseline:
+                    commands.append((
+                        'baseline',
+                        [sys.executable, '-c', BASELINE.format(
+                            recipe=recipe, write=BASELINE_WRITE[recipe]),
+                         path, output]
+                    ))
+                for name, args in commands:
+                    elapsed, maxrss = run(args)
+                    click.echo(
+                        '{:<12} {:<10} {:>7} records {:7.2f} s '
+                        '{:8.0f} records/s  max RSS {:7.1f} MiB'.format(
+                            recipe, name, size, elapsed,
+                            size / elapsed, maxrss))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,113 @@
+"""Time of ``parse_seqreads`` on a large SARS-CoV-2 ORF1ab codfreq file.
+
+The synthetic file has the codon reads of every ORF1a and ORF1b position
+(this is how the SARS2 gene model splits ORF1ab), with gene labels written
+in several ways as produced by different pipelines. ``--baseline`` also
+parses it with the previous gene lookups, which matched every synonym
+pattern and scanned the target genes for each row. ``--numpy`` also
+parses it into columnar NumPy arrays.
+
+Usage::
+
+    python benchmarks/bench_seqreads_parse.py --copies 20
+"""
+import os
+import time
+import random
+import tempfile
+import click  # type: ignore
+from typing import Optional, Tuple, List, Callable
+
+from sierrapy import viruses
+from sierrapy.viruses import Virus
+from sierrapy.commands.seqreads import parse_seqreads
+from sierrapy.common_types import GeneDef, TargetGeneDef, SeqReads
+
+GENES: List[Tuple[str, int]] = [('ORF1a', 4401), ('ORF1b', 2695)]
+LABELS: List[str] = ['{}', '{} ', '{}_protein', '{}-protein']
+
+
+class BaselineVirus(Virus):
+    """The gene lookups before they were indexed."""
+
+    def gene_index(self, gene: str) -> int:
+        return self.ordered_genes.index(gene)
+
+    def synonym_to_gene_name(self, gene: str) -> Optional[str]:
+        if gene in self.gene_defs:
+            return gene
+
+        gene_def: GeneDef
+        for gene_def in self.gene_defs.values():
+            if gene_def['synonym_pattern'].match(gene):
+                return gene_def['name']
+        else:
+            return None
+
+    def source_gene_to_target_gene_position(
+        self, gene: str, pos: int
+    ) -> Tuple[Optional[str], Optional[int]]:
+        target_gene: TargetGeneDef
+        if gene in self.source_genes:
+            for target_gene in self.gene_defs[gene]['target_genes']:
+                pos_start, pos_end = target_gene['range']
+                if pos_start <= pos <= pos_end:
+                    return (target_gene['name'],
+                            pos + 1 - pos_start + target_gene['offset'])
+            return None, None
+        return gene, pos
+
+
+def write_codfreq(path: str, copies: int) -> int:
+    rows: int = 0
+    rand: random.Random = random.Random(0)
+    with open(path, 'w') as fp:
+        fp.write('gene\tposition\ttotal\tcodon\treads\n')
+        for copy in range(copies):
+            for gene, size in GENES:
+                label: str = LABELS[copy % len(LABELS)].format(gene.lower())
+                for pos in range(1, size + 1):
+                    for codon in rand.sample(['ATG', 'ATA', 'GTG', 'CTG'], 2):
+                        fp.write('{}\t{}\t1000\t{}\t{}\n'.format(
+                            label, pos, codon, rand.randint(1, 500)))
+                        rows += 1
+    return rows
+
+
+@click.command()
+@click.option('--copies', type=int, default=20, show_default=True,
+              help='Number of times each ORF1ab position is listed.')
+@click.option('--baseline', is_flag=True,
+              help='Also parse with the previous gene lookups.')
+@click.option('--numpy', 'use_numpy', is_flag=True,
+              help='Also parse into columnar NumPy arrays.')
+def main(copies: int, baseline: bool, use_numpy: bool) -> None:
+    sars2: Virus = viruses.SARS2
+    candidates: List[Tuple[str, Virus, Callable[..., SeqReads]]] = [
+        ('indexed', sars2, parse_seqreads)]
+    if baseline:
+        candidates.append(('baseline', BaselineVirus(
+            sars2.virus_name, sars2.strain_name, sars2.supported_commands,
+            sars2.default_url, list(sars2.gene_defs.values()),
+            sars2.default_queries), parse_seqreads))
+    if use_numpy:
+        from sierrapy.codfreqarrays import parse_seqreads_arrays
+        candidates.append(('numpy', sars2, parse_seqreads_arrays))
+    with tempfile.TemporaryDirectory() as tmpdir:
+        path: str = os.path.join(tmpdir, 'orf1ab.codfreq')
+        rows: int = write_codfreq(path, copies)
+        click.echo('{}: {} rows, {:.1f} MiB'.format(
+            path, rows, os.path.getsize(path) / 1024 / 1024))
+        results: List[object] = []
+        for name, virus, parse in candidates:
+            start: float = time.perf_counter()
+            results.append(parse(path, virus, .1, .0005, 1, 1))
+            elapsed: float = time.perf_counter() - start
+            click.echo('{:<10} {:7.2f} s {:10.0f} rows/s'.format(
+                name, elapsed, rows / elapsed))
+        if any(result != results[0] for result in results):
+            raise click.ClickException('Parsers returned different results')
+
+
+if __name__ == '__main__':
+    main()
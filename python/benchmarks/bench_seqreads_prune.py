@@ -0,0 +1,91 @@
+"""Payload bytes saved by ``seqreads --prune`` and a check of its reports.
+
+Parses each codfreq file, prunes it with each ``--min-codon-reads`` value
+and prints the JSON size of the payload before and after pruning, and the
+codons below the cutoff that were kept since no codon of their position
+passes it. Offline, the codon reads the server uses (those passing
+minCodonReads) are compared for both payloads. With ``--url``, both
+payloads are also analyzed by the server and the reports compared, which
+checks that pruning does not change the results of that server for the
+query.
+
+Usage::
+
+    python benchmarks/bench_seqreads_prune.py sample.codfreq -d 5 -d 50
+    python benchmarks/bench_seqreads_prune.py sample.codfreq -d 5 \\
+        --url https://hivdb.stanford.edu/graphql
+"""
+import json
+import time
+import click  # type: ignore
+from typing import Optional, Tuple, TextIO, List, Dict, Any
+
+from sierrapy import viruses
+from sierrapy.sierraclient import SierraClient
+from sierrapy.common_types import SeqReads
+from sierrapy.commands.seqreads import (
+    parse_seqreads, prune_codon_reads, filter_codon_reads
+)
+
+
+@click.command()
+@click.argument('codfreqs', nargs=-1, required=True,
+                type=click.Path(exists=True, dir_okay=False))
+@click.option('-d', '--min-codon-reads', type=int, multiple=True,
+              default=[5, 20, 100], show_default=True,
+              help='Minimal read depth of each codon.')
+@click.option('--url', help='Compare the reports of this GraphQL endpoint.')
+@click.option('-q', '--query', type=click.File('r'),
+              help=('Fragment on `SequenceReadsAnalysis`.  '
+                    '[default: the default fragment of the virus]'))
+@click.option('--virus', type=click.Choice(['HIV1', 'HIV2', 'SARS2']),
+              default='HIV1', show_default=True)
+def main(
+    codfreqs: Tuple[str, ...],
+    min_codon_reads: Tuple[int, ...],
+    url: Optional[str],
+    query: Optional[TextIO],
+    virus: str
+) -> None:
+    fn: str
+    min_reads: int
+    reports: List[Dict[str, Any]]
+    pruned: SeqReads
+    vir: viruses.Virus = getattr(viruses, virus)
+    client: Optional[SierraClient] = SierraClient(url) if url else None
+    query_text: str = (
+        query.read() if query else vir.get_default_query('seqreads'))
+    mismatches: int = 0
+    for fn in codfreqs:
+        for min_reads in min_codon_reads:
+            payload: SeqReads = parse_seqreads(
+                fn, vir, .1, .0005, min_reads, 1)
+            start: float = time.perf_counter()
+            pruned, dropped, retained, saved = prune_codon_reads(payload)
+            elapsed: float = time.perf_counter() - start
+            size: int = len(json.dumps(payload))
+            pruned_size: int = len(json.dumps(pruned))
+            click.echo(
+                '{} -d {}: {} codons dropped, {} kept below the cutoff, '
+                '{} -> {} bytes ({:.1%} saved, estimated {}) in {:.3f} s'
+                .format(
+                    fn, min_reads, dropped, retained, size, pruned_size,
+                    1 - pruned_size / size, saved, elapsed))
+            if filter_codon_reads(payload) != filter_codon_reads(pruned):
+                mismatches += 1
+                click.echo('  analyzed codon reads differ', err=True)
+            if client is None:
+                continue
+            reports = list(client.iter_sequence_reads_analysis(
+                [payload, pruned], query_text, 2))
+            if reports[0] != reports[1]:
+                mismatches += 1
+                click.echo('  reports differ', err=True)
+    if mismatches:
+        raise click.ClickException(
+            '{} pruned payloads changed the analyzed reads or the reports'
+            .format(mismatches))
+
+
+if __name__ == '__main__':
+    main()
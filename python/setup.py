@@ -37,6 +37,10 @@ setup_params = dict(
               'sierrapy/commands',
               'sierrapy/viruses'],
     install_requires=req('requirements.txt'),
+    extras_require={
+        'async': ['aiohttp'],
+        'numpy': ['numpy'],
+    },
     # tests_require=reqs('test-requirements.txt'),
     include_package_data=True,
     entry_points={'console_scripts': [
@@ -1,5 +1,6 @@
 from . import fastareader, fragments
 from .sierraclient import VERSION, SierraClient
+from .asyncclient import AsyncSierraClient
 
 __version__ = VERSION
-__all__ = ['fastareader', 'SierraClient', 'fragments']
+__all__ = ['fastareader', 'SierraClient', 'AsyncSierraClient', 'fragments']
@@ -0,0 +1,380 @@
+# -*- coding: utf-8 -*-
+
+import asyncio
+from collections import deque
+from typing import (
+    Optional,
+    Dict,
+    Any,
+    Union,
+    List,
+    Sequence as ListOrTuple,
+    AsyncGenerator,
+    AsyncIterable,
+    Awaitable,
+    Callable,
+    Iterable,
+    Tuple,
+    Deque,
+    Type,
+    TypeVar,
+    cast
+)
+from types import TracebackType
+from more_itertools import chunked
+
+from gql import Client
+from gql.client import AsyncClientSession
+from gql.transport.exceptions import TransportQueryError
+from graphql import (
+    GraphQLSchema,
+    IntrospectionQuery,
+    build_client_schema,
+    get_introspection_query,
+    parse
+)
+from graphql.language.ast import DocumentNode as gqlDocument
+
+from .common_types import Sequence, SeqReads, ServerVer
+from .schemacache import SchemaCache
+from .sierraclient import (
+    VERSION,
+    DEFAULT_URL,
+    UNKNOWN_VERSION,
+    build_document,
+    validate_document,
+    response_error,
+    pattern_analysis_variables
+)
+
+T = TypeVar('T')
+
+
+async def _achunked(
+    items: Union[Iterable[T], AsyncIterable[T]],
+    step: int
+) -> AsyncGenerator[List[T], None]:
+    partial: List[T]
+    if not isinstance(items, AsyncIterable):
+        for partial in chunked(items, step):
+            yield partial
+        return
+    partial = []
+    async for item in items:
+        partial.append(item)
+        if len(partial) >= step:
+            yield partial
+            partial = []
+    if partial:
+        yield partial
+
+
+class AsyncSierraClient:
+    """Asyncio client of Sierra GraphQL webservice.
+
+    All requests of one client are sent through a single aiohttp session,
+    which keeps a pool of keep-alive connections. The ``max_concurrency``
+    argument caps the number of requests in flight across all calls made
+    to this client; ``max_in_flight`` of each ``iter_*`` method caps the
+    batches of that call.
+
+    Usage::
+
+        async with AsyncSierraClient(url) as client:
+            async for result in client.iter_sequence_analysis(seqs, query):
+                ...
+
+    The schema is fetched, loaded from ``schema_cache`` or skipped with
+    ``fetch_schema`` like the schema of ``SierraClient``.
+
+    Requires the optional dependency ``aiohttp``.
+    """
+    url: str
+    max_concurrency: int
+    max_connections: int
+    schema_cache: Optional[SchemaCache]
+    fetch_schema: bool
+    _client: Optional[Client]
+    _session: Optional[AsyncClientSession]
+    _schema: Optional[GraphQLSchema]
+    _introspection: Optional[Dict[str, Any]]
+    _validated: Dict[int, gqlDocument]
+    _versions: Optional[Tuple[ServerVer, ServerVer]]
+    _semaphore: Optional[asyncio.Semaphore]
+    _connect_lock: Optional[asyncio.Lock]
+
+    def __init__(
+        self,
+        url: str = DEFAULT_URL,
+        max_concurrency: int = 100,
+        max_connections: int = 100,
+        schema_cache: Optional[SchemaCache] = None,
+        fetch_schema: bool = True
+    ):
+        self.url = url
+        self.max_concurrency = max_concurrency
+        self.max_connections = max_connections
+        self.schema_cache = schema_cache
+        self.fetch_schema = fetch_schema
+        self._client = None
+        self._session = None
+        self._schema = None
+        self._introspection = None
+        self._validated = {}
+        self._versions = None
+        self._semaphore = None
+        self._connect_lock = None
+
+    async def connect(self) -> None:
+        if self._connect_lock is None:
+            self._connect_lock = asyncio.Lock()
+        async with self._connect_lock:
+            if self._session is not None:
+                return
+            try:
+                import aiohttp
+                from gql.transport.aiohttp import AIOHTTPTransport
+            except ImportError as e:  # pragma: no cover
+                raise ImportError(
+                    'AsyncSierraClient requires aiohttp; install it with '
+                    '"pip install sierrapy[async]"'
+                ) from e
+            transport: AIOHTTPTransport = AIOHTTPTransport(
+                self.url,
+                headers={
+                    'User-Agent': 'sierra-client (python)/{}'.format(VERSION)
+                },
+                ssl=True,
+                timeout=300,
+                client_session_args={
+                    'connector': aiohttp.TCPConnector(
+                        limit=self.max_connections)
+                })
+            # gql doesn't hold the schema; each document is validated once
+            # in execute() instead of on every request
+            self._client = Client(transport=transport, execute_timeout=None)
+            self._session = await self._client.connect_async()  # type: ignore
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+            if self.fetch_schema and self._introspection is None:
+                try:
+                    await self._load_introspection()
+                except BaseException:
+                    # connect again on the next request, so that queries
+                    # are never sent without the schema validating them
+                    await self._disconnect()
+                    raise
+
+    async def _load_introspection(self) -> None:
+        introspection: Optional[Dict[str, Any]] = None
+        version: str = ''
+        if self.schema_cache:
+            # connect() holds the lock; server_versions() would wait for it
+            if self._versions is None:
+                self._versions = await self._current_version()
+            version = self._versions[1]['text']
+            introspection = self.schema_cache.load(self.url, version)
+        if introspection is None:
+            introspection = await self._execute(
+                parse(get_introspection_query()))
+            if self.schema_cache:
+                self.schema_cache.save(self.url, version, introspection)
+        self._introspection = introspection
+        self._schema = build_client_schema(
+            cast(IntrospectionQuery, introspection))
+
+    async def _disconnect(self) -> None:
+        if self._client is not None and self._session is not None:
+            await self._client.close_async()  # type: ignore
+        self._client = None
+        self._session = None
+        self._semaphore = None
+
+    async def close(self) -> None:
+        await self._disconnect()
+        # bound to the event loop it was created in, like the semaphore
+        self._connect_lock = None
+
+    async def __aenter__(self) -> 'AsyncSierraClient':
+        await self.connect()
+        return self
+
+    async def __aexit__(
+        self,
+        exc_type: Optional[Type[BaseException]],
+        exc: Optional[BaseException],
+        tb: Optional[TracebackType]
+    ) -> None:
+        await self.close()
+
+    async def execute(
+        self,
+        document: gqlDocument,
+        variable_values: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
+        await self.connect()
+        validate_document(self._schema, document, self._validated)
+        return await self._execute(document, variable_values)
+
+    async def _execute(
+        self,
+        document: gqlDocument,
+        variable_values: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
+        assert self._session is not None and self._semaphore is not None
+        async with self._semaphore:
+            try:
+                result: Dict[str, Any] = await self._session.execute(
+                    document, variable_values=variable_values)
+                return result
+            except TransportQueryError as e:
+                raise response_error(e.errors or [])
+
+    async def get_introspection(self) -> Dict[str, Any]:
+        await self.connect()
+        if self._introspection is None:
+            # schema fetching is disabled
+            return await self._execute(parse(get_introspection_query()))
+        return self._introspection
+
+    async def _sequence_analysis(
+        self,
+        sequences: List[Sequence],
+        query: str
+    ) -> List[Dict[str, Any]]:
+        result: Dict[str, Any] = await self.execute(
+            build_document('sequenceAnalysis', query),
+            variable_values={"sequences": sequences})
+        seqResults: List[Dict[str, Any]] = result['sequenceAnalysis']
+        return seqResults
+
+    async def _pattern_analysis(
+        self,
+        patterns: ListOrTuple[List[str]],
+        pattern_names: ListOrTuple[Optional[str]],
+        query: str,
+        **kw: Any
+    ) -> List[Dict[str, Any]]:
+        extraparams: str
+        variables: Dict[str, Any]
+        extraparams, variables = pattern_analysis_variables(
+            patterns, pattern_names, **kw)
+        result: Dict[str, Any] = await self.execute(
+            build_document('patternAnalysis', query, extraparams),
+            variable_values=variables)
+        patternResults: List[Dict[str, Any]] = result['patternAnalysis']
+        return patternResults
+
+    async def _sequence_reads_analysis(
+        self,
+        all_sequence_reads: List[SeqReads],
+        query: str
+    ) -> List[Dict[str, Any]]:
+        result: Dict[str, Any] = await self.execute(
+            build_document('sequenceReadsAnalysis', query),
+            variable_values={"allSequenceReads": all_sequence_reads})
+        seqReadsResults: List[Dict[str, Any]] = result['sequenceReadsAnalysis']
+        return seqReadsResults
+
+    async def _iter_batches(
+        self,
+        items: Union[Iterable[T], AsyncIterable[T]],
+        analyze: Callable[[List[T]], Awaitable[List[Dict[str, Any]]]],
+        step: int,
+        max_in_flight: int
+    ) -> AsyncGenerator[Dict[str, Any], None]:
+        """Send batches of items and yield the results in input order.
+
+        Up to max_in_flight batches of this call are sent concurrently.
+        """
+        partial: List[T]
+        task: 'asyncio.Task[List[Dict[str, Any]]]'
+        in_flight: Deque['asyncio.Task[List[Dict[str, Any]]]'] = deque()
+        try:
+            async for partial in _achunked(items, step):
+                if len(in_flight) >= max(max_in_flight, 1):
+                    for result in await in_flight.popleft():
+                        yield result
+                in_flight.append(asyncio.ensure_future(analyze(partial)))
+            while in_flight:
+                for result in await in_flight.popleft():
+                    yield result
+        finally:
+            for task in in_flight:
+                task.cancel()
+
+    def iter_sequence_analysis(
+        self,
+        sequences: Union[Iterable[Sequence], AsyncIterable[Sequence]],
+        query: str,
+        step: int = 20,
+        max_in_flight: int = 4
+    ) -> AsyncGenerator[Dict[str, Any], None]:
+        return self._iter_batches(
+            sequences,
+            lambda partial: self._sequence_analysis(partial, query),
+            step,
+            max_in_flight
+        )
+
+    def iter_pattern_analysis(
+        self,
+        patterns: Union[
+            Iterable[Tuple[str, List[str]]],
+            AsyncIterable[Tuple[str, List[str]]]
+        ],
+        query: str,
+        step: int = 20,
+        max_in_flight: int = 4,
+        **kw: Any
+    ) -> AsyncGenerator[Dict[str, Any], None]:
+
+        def analyze(
+            partial: List[Tuple[str, List[str]]]
+        ) -> Awaitable[List[Dict[str, Any]]]:
+            pats: Tuple[List[str], ...]
+            pat_names: Tuple[str, ...]
+            pat_names, pats = tuple(zip(*partial))
+            return self._pattern_analysis(pats, pat_names, query, **kw)
+
+        return self._iter_batches(patterns, analyze, step, max_in_flight)
+
+    def iter_sequence_reads_analysis(
+        self,
+        sequence_reads: Union[Iterable[SeqReads], AsyncIterable[SeqReads]],
+        query: str,
+        step: int = 20,
+        max_in_flight: int = 4
+    ) -> AsyncGenerator[Dict[str, Any], None]:
+        return self._iter_batches(
+            sequence_reads,
+            lambda partial: self._sequence_reads_analysis(partial, query),
+            step,
+            max_in_flight
+        )
+
+    async def mutations_analysis(
+        self,
+        mutations: List[str],
+        query: str
+    ) -> Dict[str, Any]:
+        result: Dict[str, Any] = await self.execute(
+            build_document('mutationsAnalysis', query),
+            variable_values={"mutations": mutations})
+        mutResults: Dict[str, Any] = result['mutationsAnalysis']
+        return mutResults
+
+    async def server_versions(self) -> Tuple[ServerVer, ServerVer]:
+        """Return current_version(), requested once per client."""
+        if self._versions is None:
+            self._versions = await self.current_version()
+        return self._versions
+
+    async def current_version(self) -> Tuple[ServerVer, ServerVer]:
+        await self.connect()
+        return await self._current_version()
+
+    async def _current_version(self) -> Tuple[ServerVer, ServerVer]:
+        # not validated; the schema cache is keyed by this result
+        result = await self._execute(build_document('currentVersion'))
+        return (result['currentVersion'],
+                result.get('currentProgramVersion', UNKNOWN_VERSION))
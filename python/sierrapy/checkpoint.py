@@ -0,0 +1,113 @@
+import os
+import json
+from collections import deque
+from typing import (
+    Optional,
+    Dict,
+    Any,
+    List,
+    Tuple,
+    Deque,
+    Iterable,
+    Iterator,
+    TypeVar
+)
+
+T = TypeVar('T')
+R = TypeVar('R')
+
+# (index of the input file, offset of the next unread record in that file)
+Position = Tuple[int, int]
+
+
+class CheckpointError(Exception):
+    pass
+
+
+class PositionTracker:
+    """Follow the input position behind the results being written.
+
+    ``track`` queues the position of each input item as the client reads
+    it; ``advance`` is called once per input item whose result is
+    consumed (or which failed), in input order.
+    """
+    positions: Deque[Position]
+    position: Optional[Position]
+    count: int
+
+    def __init__(self, count: int = 0):
+        self.positions = deque()
+        self.position = None
+        self.count = count
+
+    def track(self, items: Iterable[Tuple[T, Position]]) -> Iterator[T]:
+        item: T
+        pos: Position
+        for item, pos in items:
+            self.positions.append(pos)
+            yield item
+
+    def advance(self) -> None:
+        self.position = self.positions.popleft()
+        self.count += 1
+
+    def follow(self, results: Iterable[R]) -> Iterator[R]:
+        result: R
+        for result in results:
+            self.advance()
+            yield result
+
+
+class Checkpoint:
+    """Journal of completed output shards.
+
+    The journal is a JSON Lines file next to the output shards. The first
+    line records the input files; every following line is appended after
+    a shard is completely written and records the shard index, the number
+    of records written so far and the input position after the shard.
+    """
+    path: str
+    inputs: List[str]
+
+    def __init__(self, output: str, inputs: List[str]):
+        self.path = output + '.checkpoint'
+        self.inputs = inputs
+
+    def last(self) -> Optional[Dict[str, Any]]:
+        """Return the last completed shard of a previous run."""
+        entry: Optional[Dict[str, Any]] = None
+        try:
+            with open(self.path) as fp:
+                lines: List[str] = [line for line in fp if line.strip()]
+        except FileNotFoundError:
+            return None
+        if not lines:
+            return None
+        header: Dict[str, Any] = json.loads(lines[0])
+        if header.get('inputs') != self.inputs:
+            raise CheckpointError(
+                'Checkpoint {} was written for different input files: {}'
+                .format(self.path, ', '.join(header.get('inputs') or []))
+            )
+        for line in lines[1:]:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                # an incomplete line left by an interrupted write
+                break
+        return entry
+
+    def start(self) -> None:
+        """Start a new journal, discarding any previous one."""
+        with open(self.path, 'w') as fp:
+            fp.write(json.dumps({'inputs': self.inputs}) + '\n')
+
+    def record(self, shard: int, count: int, position: Position) -> None:
+        with open(self.path, 'a') as fp:
+            fp.write(json.dumps({
+                'shard': shard,
+                'count': count,
+                'position': list(position)
+            }) + '\n')
+            fp.flush()
+            os.fsync(fp.fileno())
@@ -0,0 +1,294 @@
+import numpy as np  # type: ignore
+from typing import List, Tuple, Optional, BinaryIO
+
+from . import viruses
+from .common_types import PosReads, SeqReads, UntransRegion
+from .fileio import BLOCK_SIZE, open_maybe_gzip
+from .commands.seqreads import parse_untrans_region, parse_seqreads
+
+UTF8_BOM: bytes = b'\xef\xbb\xbf'
+# longer numbers may not fit in 64 bits
+MAX_DIGITS: int = 18
+
+
+class UnusualInput(Exception):
+    """The file needs the csv parser, e.g. it has quoted fields."""
+
+
+class CodfreqColumns:
+    """Columns of the valid codon reads rows of a codfreq file.
+
+    Blocks of complete lines are fed in file order. Gene labels and
+    upper-cased codons are kept as fixed width byte strings.
+    """
+    delimiter: Optional[int]
+    utr_begin: bool
+    untrans_regions: List[UntransRegion]
+    labels: List[np.ndarray]
+    aapos: List[np.ndarray]
+    total_reads: List[np.ndarray]
+    codons: List[np.ndarray]
+    codon_reads: List[np.ndarray]
+
+    def __init__(self) -> None:
+        self.delimiter = None
+        self.utr_begin = False
+        self.untrans_regions = []
+        self.labels = []
+        self.aapos = []
+        self.total_reads = []
+        self.codons = []
+        self.codon_reads = []
+
+    def feed(self, buf: bytes) -> None:
+        line: int
+        arr: np.ndarray = np.frombuffer(buf, dtype=np.uint8)
+        if not len(arr):
+            return
+        if b'"' in buf or b'\0' in buf or arr.max() >= 0x80:
+            raise UnusualInput()
+        ends: np.ndarray = np.flatnonzero(arr == 0x0a)
+        if not len(ends) or ends[-1] != len(arr) - 1:
+            ends = np.append(ends, len(arr))
+        starts: np.ndarray = np.concatenate(([0], ends[:-1] + 1))
+        crs: np.ndarray = np.flatnonzero(arr == 0x0d)
+        # csv also ends a line at a lone carriage return
+        if len(crs) and (
+            crs[-1] == len(arr) - 1 or np.any(arr[crs + 1] != 0x0a)
+        ):
+            raise UnusualInput()
+        # lines with "#" are scanned for untranslated regions in order
+        for line in np.unique(np.searchsorted(
+                starts, np.flatnonzero(arr == 0x23), side='right') - 1):
+            self.utr_begin = parse_untrans_region(
+                buf[starts[line]:ends[line] + 1].decode('ASCII'),
+                self.utr_begin, self.untrans_regions)
+        if len(crs):
+            ends[arr[np.maximum(ends - 1, 0)] == 0x0d] -= 1
+        data: np.ndarray = arr[starts] != 0x23
+        starts, ends = starts[data], ends[data]
+        if not len(starts):
+            return
+        if self.delimiter is None:
+            self.delimiter = (
+                0x09 if b'\t' in buf[starts[0]:ends[0]] else 0x2c)
+        self.feed_rows(arr, starts, ends)
+
+    def feed_rows(
+        self,
+        arr: np.ndarray,
+        starts: np.ndarray,
+        ends: np.ndarray
+    ) -> None:
+        num: int
+        # the first five fields of each line; shorter lines are skipped
+        delims: np.ndarray = np.append(
+            np.flatnonzero(arr == self.delimiter), [len(arr) + 1] * 5)
+        first: np.ndarray = np.searchsorted(delims, starts)
+        valid: np.ndarray = delims[first + 3] < ends
+        field_starts: List[np.ndarray] = [starts]
+        field_ends: List[np.ndarray] = []
+        for num in range(4):
+            field_ends.append(delims[first + num])
+            field_starts.append(delims[first + num] + 1)
+        field_ends.append(np.minimum(delims[first + 4], ends))
+        aapos: np.ndarray = to_int(
+            arr, field_starts[1], field_ends[1], valid)
+        total_reads: np.ndarray = to_int(
+            arr, field_starts[2], field_ends[2], valid)
+        codon_reads: np.ndarray = to_int(
+            arr, field_starts[4], field_ends[4], valid)
+        valid &= field_ends[3] - field_starts[3] >= 3
+        valid &= (total_reads != 0) & (codon_reads != 0)
+        self.labels.append(
+            gather(arr, field_starts[0][valid], field_ends[0][valid]))
+        self.codons.append(gather(
+            arr, field_starts[3][valid], field_ends[3][valid], upper=True))
+        self.aapos.append(aapos[valid])
+        self.total_reads.append(total_reads[valid])
+        self.codon_reads.append(codon_reads[valid])
+
+
+def to_int(
+    arr: np.ndarray,
+    starts: np.ndarray,
+    ends: np.ndarray,
+    valid: np.ndarray
+) -> np.ndarray:
+    """Convert decimal fields to integers; mark other fields invalid."""
+    digit: int
+    lengths: np.ndarray = ends - starts
+    valid &= lengths > 0
+    if np.any(lengths[valid] > MAX_DIGITS):
+        raise UnusualInput()
+    result: np.ndarray = np.zeros(len(starts), dtype=np.int64)
+    for digit in range(int(lengths[valid].max(initial=0))):
+        present: np.ndarray = valid & (digit < lengths)
+        chars: np.ndarray = arr[
+            np.minimum(starts + digit, len(arr) - 1)].astype(np.int64)
+        valid &= ~present | ((chars >= 0x30) & (chars <= 0x39))
+        result = np.where(present, result * 10 + chars - 0x30, result)
+    return result
+
+
+def gather(
+    arr: np.ndarray,
+    starts: np.ndarray,
+    ends: np.ndarray,
+    upper: bool = False
+) -> np.ndarray:
+    """Return the fields as an array of fixed width byte strings."""
+    lengths: np.ndarray = ends - starts
+    width: int = max(int(lengths.max(initial=0)), 1)
+    offsets: np.ndarray = np.arange(width)
+    chars: np.ndarray = arr[
+        np.minimum(starts[:, None] + offsets, len(arr) - 1)]
+    chars[offsets >= lengths[:, None]] = 0
+    if upper:
+        chars[(chars >= 0x61) & (chars <= 0x7a)] -= 0x20
+    return chars.view('S{}'.format(width)).ravel()
+
+
+def read_columns(fp: BinaryIO) -> CodfreqColumns:
+    cut: int
+    columns: CodfreqColumns = CodfreqColumns()
+    buf: bytes = fp.read(BLOCK_SIZE)
+    if buf.startswith(UTF8_BOM):
+        buf = buf[len(UTF8_BOM):]
+    while True:
+        block: bytes = fp.read(BLOCK_SIZE)
+        if not block:
+            break
+        buf += block
+        cut = buf.rfind(b'\n') + 1
+        if cut:
+            columns.feed(buf[:cut])
+            buf = buf[cut:]
+    columns.feed(buf)
+    return columns
+
+
+def map_genes(
+    virus: viruses.Virus,
+    labels: np.ndarray,
+    aapos: np.ndarray
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Map gene labels and positions to target genes and positions.
+
+    Returns the index of each target gene in ``virus.ordered_genes``, or
+    -1 if a row maps to no gene, and the target positions.
+    """
+    label: bytes
+    name: Optional[str]
+    gene_idx: np.ndarray = np.full(len(labels), -1, dtype=np.int64)
+    positions: np.ndarray = aapos.copy()
+    uniques, inverse = np.unique(labels, return_inverse=True)
+    inverse = inverse.ravel()
+    for label_idx, label in enumerate(uniques.tolist()):
+        name = virus.synonym_to_gene_name(label.decode('ASCII'))
+        if not name:
+            continue
+        rows: np.ndarray = np.flatnonzero(inverse == label_idx)
+        if name not in virus.source_genes:
+            gene_idx[rows] = virus.gene_index(name)
+            continue
+        target_genes = virus.gene_defs[name]['target_genes']
+        # the target gene starting last at or before each position
+        starts: np.ndarray = np.array(
+            [target['range'][0] for target in target_genes])
+        order: np.ndarray = np.argsort(starts, kind='stable')
+        idx: np.ndarray = np.searchsorted(
+            starts[order], aapos[rows], side='right') - 1
+        found: np.ndarray = idx >= 0
+        target_idx: np.ndarray = order[np.maximum(idx, 0)]
+        ends: np.ndarray = np.array(
+            [target['range'][1] for target in target_genes])
+        found &= aapos[rows] <= ends[target_idx]
+        offsets: np.ndarray = np.array(
+            [1 - target['range'][0] + target['offset']
+             for target in target_genes])
+        targets: np.ndarray = np.array(
+            [virus.gene_index(target['name']) for target in target_genes])
+        gene_idx[rows[found]] = targets[target_idx[found]]
+        positions[rows[found]] += offsets[target_idx[found]]
+    return gene_idx, positions
+
+
+def group_reads(
+    virus: viruses.Virus,
+    columns: CodfreqColumns
+) -> List[PosReads]:
+    """Group the codon reads by target gene position."""
+    aapos: np.ndarray = np.concatenate(columns.aapos)
+    total_reads: np.ndarray = np.concatenate(columns.total_reads)
+    gene_idx, positions = map_genes(
+        virus, np.concatenate(columns.labels), aapos)
+
+    # sort by gene and position, keeping the rows in file order
+    rows: np.ndarray = np.flatnonzero(gene_idx >= 0)
+    rows = rows[np.lexsort((rows, positions[rows], gene_idx[rows]))]
+    if not len(rows):
+        return []
+    bounds: List[int] = (np.flatnonzero(
+        (np.diff(gene_idx[rows]) != 0) | (np.diff(positions[rows]) != 0)
+    ) + 1).tolist()
+    group_starts: List[int] = [0] + bounds
+    group_ends: List[int] = bounds + [len(rows)]
+    firsts: np.ndarray = rows[group_starts]
+    genes: List[str] = virus.ordered_genes
+    codons: List[str] = list(map(
+        bytes.decode, np.concatenate(columns.codons)[rows].tolist()))
+    reads: List[int] = np.concatenate(columns.codon_reads)[rows].tolist()
+    return [{
+        'allCodonReads': [
+            {'codon': codon, 'reads': count}
+            for codon, count in zip(codons[start:end], reads[start:end])
+        ],
+        'gene': genes[gene],
+        'position': position,
+        'totalReads': total
+    } for start, end, gene, position, total in zip(
+        group_starts,
+        group_ends,
+        gene_idx[firsts].tolist(),
+        positions[firsts].tolist(),
+        total_reads[firsts].tolist()
+    )]
+
+
+def parse_seqreads_arrays(
+    filename: str,
+    virus: viruses.Virus,
+    min_prevalence: float,
+    max_mixture_rate: float,
+    min_codon_reads: int,
+    min_position_reads: int
+) -> SeqReads:
+    """Parse a codfreq file into columnar NumPy arrays.
+
+    The result is the same as ``parse_seqreads``. The file is read in
+    large blocks which are split into fields, checked and converted
+    column by column; rows are mapped to target genes per distinct gene
+    label. A file the columnar parser does not read exactly like csv
+    (quoted fields, non-ASCII text, huge numbers, lone carriage returns)
+    is parsed by ``parse_seqreads`` instead.
+    """
+    fp: BinaryIO
+    columns: CodfreqColumns
+    try:
+        with open_maybe_gzip(filename) as fp:
+            columns = read_columns(fp)
+    except UnusualInput:
+        return parse_seqreads(
+            filename, virus, min_prevalence, max_mixture_rate,
+            min_codon_reads, min_position_reads)
+    return {
+        'name': filename,
+        'strain': virus.strain_name,
+        'allReads': group_reads(virus, columns) if columns.aapos else [],
+        'untranslatedRegions': columns.untrans_regions,
+        'minPrevalence': min_prevalence,
+        'maxMixtureRate': max_mixture_rate,
+        'minCodonReads': min_codon_reads,
+        'minPositionReads': min_position_reads
+    }
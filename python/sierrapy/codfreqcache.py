@@ -0,0 +1,184 @@
+import os
+import sys
+import json
+import struct
+import hashlib
+import tempfile
+from array import array
+from typing import Optional, List, Dict, Tuple, Any, BinaryIO
+
+from .sierraclient import VERSION
+from .common_types import PosReads, UntransRegion
+
+MAGIC: bytes = b'SPYCFQ01'
+# magic, size and mtime of the codfreq file, length of the JSON metadata
+HEADER: struct.Struct = struct.Struct('<8sqqI')
+# the columns of the parsed codon reads and their array type codes; "q"
+# columns are stored as "I" when their values fit
+COLUMNS: List[Tuple[str, str]] = [
+    ('gene', 'H'),
+    ('position', 'q'),
+    ('totalReads', 'q'),
+    ('numCodons', 'I'),
+    ('codon', 'I'),
+    ('reads', 'q')
+]
+
+ParsedCodfreq = Tuple[List[PosReads], List[UntransRegion]]
+
+
+class CodfreqCache:
+    """On-disk cache of parsed codfreq files.
+
+    Each entry holds the gene-remapped ``allReads`` and the
+    ``untranslatedRegions`` of a codfreq file parsed for a virus, as
+    binary arrays of the positions and codon reads. An entry is only used
+    while the file keeps the size and modification time it had when it
+    was parsed.
+    """
+    cache_dir: str
+
+    def __init__(self, cache_dir: str):
+        self.cache_dir = cache_dir
+
+    def path(self, filename: str, virus: str) -> str:
+        sha1 = hashlib.sha1()
+        sha1.update(os.path.abspath(filename).encode('UTF-8'))
+        sha1.update(b'\0')
+        sha1.update(virus.encode('UTF-8'))
+        return os.path.join(self.cache_dir, sha1.hexdigest() + '.bin')
+
+    def load(
+        self,
+        filename: str,
+        virus: str,
+        stat: os.stat_result
+    ) -> Optional[ParsedCodfreq]:
+        fp: BinaryIO
+        name: str
+        typecode: str
+        count: int
+        columns: Dict[str, array] = {}
+        try:
+            with open(self.path(filename, virus), 'rb') as fp:
+                magic, size, mtime, meta_size = HEADER.unpack(
+                    fp.read(HEADER.size))
+                if (
+                    magic != MAGIC or
+                    size != stat.st_size or
+                    mtime != stat.st_mtime_ns
+                ):
+                    return None
+                meta: Dict[str, Any] = json.loads(fp.read(meta_size))
+                if (
+                    meta['version'] != VERSION or
+                    meta['byteorder'] != sys.byteorder or
+                    meta['filename'] != os.path.abspath(filename) or
+                    meta['virus'] != virus
+                ):
+                    return None
+                for (name, _), typecode, count in zip(
+                        COLUMNS, meta['typecodes'], meta['counts']):
+                    columns[name] = array(typecode)
+                    columns[name].fromfile(fp, count)
+        except (OSError, EOFError, ValueError, KeyError, struct.error):
+            # missing, outdated or corrupt
+            return None
+        return unpack_reads(meta, columns), meta['untranslatedRegions']
+
+    def save(
+        self,
+        filename: str,
+        virus: str,
+        stat: os.stat_result,
+        all_reads: List[PosReads],
+        untrans_regions: List[UntransRegion]
+    ) -> None:
+        fp: BinaryIO
+        name: str
+        try:
+            meta, columns = pack_reads(all_reads)
+        except OverflowError:
+            # e.g. read counts beyond 64 bits
+            return
+        meta.update({
+            'version': VERSION,
+            'byteorder': sys.byteorder,
+            'filename': os.path.abspath(filename),
+            'virus': virus,
+            'untranslatedRegions': untrans_regions,
+            'typecodes': [columns[name].typecode for name, _ in COLUMNS],
+            'counts': [len(columns[name]) for name, _ in COLUMNS]
+        })
+        meta_text: bytes = json.dumps(meta).encode('UTF-8')
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir)
+            with os.fdopen(fd, 'wb') as fp:
+                fp.write(HEADER.pack(
+                    MAGIC, stat.st_size, stat.st_mtime_ns, len(meta_text)))
+                fp.write(meta_text)
+                for name, _ in COLUMNS:
+                    columns[name].tofile(fp)
+            os.replace(tmp_path, self.path(filename, virus))
+        except OSError:
+            # the cache is only an optimization
+            pass
+
+
+def pack_reads(
+    all_reads: List[PosReads]
+) -> Tuple[Dict[str, Any], Dict[str, array]]:
+    """Convert allReads to arrays, with gene and codon tables."""
+    pos_reads: PosReads
+    gene_idx: Dict[str, int] = {}
+    codon_idx: Dict[str, int] = {}
+    columns: Dict[str, array] = {
+        name: array(typecode) for name, typecode in COLUMNS}
+    for pos_reads in all_reads:
+        columns['gene'].append(
+            gene_idx.setdefault(pos_reads['gene'], len(gene_idx)))
+        columns['position'].append(pos_reads['position'])
+        columns['totalReads'].append(pos_reads['totalReads'])
+        columns['numCodons'].append(len(pos_reads['allCodonReads']))
+        for codon_reads in pos_reads['allCodonReads']:
+            columns['codon'].append(
+                codon_idx.setdefault(codon_reads['codon'], len(codon_idx)))
+            columns['reads'].append(codon_reads['reads'])
+    for name, typecode in COLUMNS:
+        if typecode == 'q' and 0 <= min(columns[name], default=0) and \
+                max(columns[name], default=0) < 1 << 32:
+            columns[name] = array('I', columns[name])
+    return {'genes': list(gene_idx), 'codons': list(codon_idx)}, columns
+
+
+def unpack_reads(
+    meta: Dict[str, Any],
+    columns: Dict[str, array]
+) -> List[PosReads]:
+    """Build allReads from the arrays of ``pack_reads``."""
+    genes: List[str] = meta['genes']
+    codons: List[str] = meta['codons']
+    codon_col: array = columns['codon']
+    reads_col: array = columns['reads']
+    all_reads: List[PosReads] = []
+    start: int = 0
+    for gene, position, total_reads, num_codons in zip(
+        columns['gene'],
+        columns['position'],
+        columns['totalReads'],
+        columns['numCodons']
+    ):
+        all_reads.append({
+            'allCodonReads': [
+                {'codon': codons[codon], 'reads': reads}
+                for codon, reads in zip(
+                    codon_col[start:start + num_codons],
+                    reads_col[start:start + num_codons])
+            ],
+            'gene': genes[gene],
+            'position': position,
+            'totalReads': total_reads
+        })
+        start += num_codons
+    return all_reads
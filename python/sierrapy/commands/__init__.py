@@ -1,5 +1,6 @@
 from .cli import cli
 from . import introspection  # noqa
 from . import recipe  # noqa
+from . import watch  # noqa
 
 __all__ = ['cli']
@@ -1,17 +1,98 @@
 import click  # type: ignore
+from contextlib import contextmanager
+from typing import Optional, Iterator
 
 from .. import viruses
-from ..sierraclient import SierraClient, VERSION
+from ..sierraclient import (
+    SierraClient, RetryPolicy, ResponseError, TRANSPORT_ERRORS, VERSION
+)
+from ..schemacache import SchemaCache
+from ..resultcache import ResultCache
 
 from .options import url_option, virus_option
 
 
+def get_client(ctx: click.Context, url: str) -> SierraClient:
+    """Create a client configured by the options of the ``cli`` group."""
+    schema_cache: Optional[SchemaCache] = None
+    if ctx.obj.get('SCHEMA_CACHE', True):
+        schema_cache = SchemaCache(ctx.obj.get('CACHE_DIR'))
+    result_cache: Optional[ResultCache] = None
+    if ctx.obj.get('RESULT_CACHE'):
+        result_cache = ResultCache(
+            ctx.obj.get('CACHE_DIR'),
+            ctx.obj['RESULT_CACHE_SIZE'] * 1024 * 1024)
+    client: SierraClient = SierraClient(
+        url,
+        schema_cache=schema_cache,
+        fetch_schema=ctx.obj.get('FETCH_SCHEMA', True),
+        retry_policy=RetryPolicy(
+            attempts=ctx.obj.get('RETRIES', 0) + 1,
+            backoff=ctx.obj.get('RETRY_BACKOFF', 1.)
+        ),
+        result_cache=result_cache,
+        memo_size=ctx.obj.get('MEMO_SIZE', 0)
+    )
+    ctx.call_on_close(client.close)
+    return client
+
+
+RESUME_HINT: str = (
+    'Run the same command again with --resume to continue after the last '
+    'completed shard.')
+
+
+@contextmanager
+def request_errors(client: SierraClient, hint: str = '') -> Iterator[None]:
+    """Turn errors ending the requests into a ClickException with hint.
+
+    These are the errors raised once the retries are exhausted and the
+    errors the server returns for every record alike.
+    """
+    message: str
+    try:
+        yield
+    except ResponseError as e:
+        message = str(e)
+    except TRANSPORT_ERRORS as e:
+        message = 'Request failed after {} attempt(s): {}'.format(
+            client.retry_policy.attempts, e)
+    else:
+        return
+    raise click.ClickException(
+        '{}\n{}'.format(message, hint) if hint else message)
+
+
 @click.group(
     context_settings={'max_content_width': 120},
     invoke_without_command=True
 )
 @url_option('--url')
 @virus_option('--virus')
+@click.option('--cache-dir', type=click.Path(file_okay=False),
+              help=('Directory to store cached data such as the GraphQL '
+                    'schema and results.  [default: ~/.cache/sierrapy]'))
+@click.option('--no-schema-cache', is_flag=True,
+              help='Always fetch the GraphQL schema from the server.')
+@click.option('--skip-schema-fetch', is_flag=True,
+              help=('Do not fetch the GraphQL schema; queries are only '
+                    'validated by the server.'))
+@click.option('--result-cache', is_flag=True,
+              help=('Cache sequence analysis results in the cache directory '
+                    'and only send sequences without a cached result.'))
+@click.option('--result-cache-size', type=int, default=1024,
+              show_default=True,
+              help=('Maximum size of the result cache in MiB; the least '
+                    'recently used results are evicted.'))
+@click.option('--memo-size', type=int, default=0, show_default=True,
+              help=('Keep the results of the last n distinct mutation sets '
+                    'of patterns in memory and send each set only once.'))
+@click.option('--retries', type=int, default=3, show_default=True,
+              help=('Retry a request n times on connection errors, '
+                    'timeouts and HTTP 408/429/502/503/504 responses.'))
+@click.option('--retry-backoff', type=float, default=1., show_default=True,
+              help=('Seconds to wait before the first retry; doubled for '
+                    'each following retry.'))
 @click.option('--version', is_flag=True,
               help='Show client and the HIVDB algorithm version.')
 @click.pass_context
@@ -19,6 +100,14 @@ def cli(
     ctx: click.Context,
     url: str,
     virus: viruses.Virus,
+    cache_dir: Optional[str],
+    no_schema_cache: bool,
+    skip_schema_fetch: bool,
+    result_cache: bool,
+    result_cache_size: int,
+    memo_size: int,
+    retries: int,
+    retry_backoff: float,
     version: bool
 ) -> None:
     """A Client of HIVDB Sierra GraphQL Web Service
@@ -30,8 +119,17 @@ def cli(
     - HIV2: https://hivdb.stanford.edu/hiv2/graphql
     - SARS2: https://covdb.stanford.edu/sierra-sars2/graphql
     """
-    client: SierraClient = SierraClient(url)
+    ctx.obj['CACHE_DIR'] = cache_dir
+    ctx.obj['SCHEMA_CACHE'] = not no_schema_cache
+    ctx.obj['FETCH_SCHEMA'] = not skip_schema_fetch
+    ctx.obj['RESULT_CACHE'] = result_cache
+    ctx.obj['RESULT_CACHE_SIZE'] = result_cache_size
+    ctx.obj['MEMO_SIZE'] = memo_size
+    ctx.obj['RETRIES'] = retries
+    ctx.obj['RETRY_BACKOFF'] = retry_backoff
+    client: SierraClient = get_client(ctx, url)
     client.toggle_progress(True)
+    ctx.obj['CLIENT'] = client
     if version:
         algv, progv = client.current_version()
         click.echo(
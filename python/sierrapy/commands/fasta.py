@@ -1,34 +1,81 @@
 import os
 import re
-import json
 import math
-import tqdm  # type: ignore
 import click  # type: ignore
-from itertools import chain
-from typing import Dict, TextIO, Any, Tuple, Iterator
-from more_itertools import chunked
+from typing import (
+    Dict, TextIO, Any, Tuple, Iterator, List, Optional
+)
 
-from .. import fastareader, viruses
-from ..sierraclient import SierraClient
+from .. import fastareader, fastaindex, viruses
+from ..sierraclient import (
+    SierraClient, ResponseError, AdaptiveBatching, DEDUP_WINDOW
+)
 from ..common_types import Sequence
+from ..fastaindex import FastaIndex
+from ..progress import Progress
+from ..checkpoint import (
+    Checkpoint, CheckpointError, Position, PositionTracker
+)
 
-from .cli import cli
-from .options import url_option, virus_option
+from .cli import cli, get_client, request_errors, RESUME_HINT
+from .options import url_option, virus_option, FASTA_PATTERN
+from .sharding import dump_json, dump_shards
 
-FASTA_PATTERN = re.compile(r'\.fa(?:s(?:ta)?)?$', re.I)
 
-
-def iter_fasta_files(
-    file_or_dir: Tuple[str, ...]
-) -> Iterator[TextIO]:
+def list_fasta_files(file_or_dir: Tuple[str, ...]) -> List[str]:
+    paths: List[str] = []
     for one in file_or_dir:
         if os.path.isfile(one):
-            yield open(one)
+            paths.append(one)
         else:
             for fn in os.listdir(one):
                 if not FASTA_PATTERN.search(fn):
                     continue
-                yield open(os.path.join(one, fn))
+                paths.append(os.path.join(one, fn))
+    return paths
+
+
+def iter_fasta_records(
+    paths: List[str],
+    start: Position = (0, 0),
+    stop: Optional[Position] = None
+) -> Iterator[Tuple[Sequence, Position]]:
+    """Yield sequences and their input positions from start until stop."""
+    idx: int
+    path: str
+    offset: int
+    end: Optional[int]
+    seq: Sequence
+    start_idx, start_offset = start
+    for idx, path in enumerate(paths[start_idx:], start_idx):
+        if stop and idx > stop[0]:
+            break
+        offset = start_offset if idx == start_idx else 0
+        end = stop[1] if stop and idx == stop[0] else None
+        for seq, offset in fastareader.iter_file_records(path, offset, end):
+            yield seq, (idx, offset)
+
+
+def count_sequences(path: str) -> int:
+    """Count the sequences of a FASTA file, from its index if saved."""
+    index: Optional[FastaIndex] = FastaIndex.load(path)
+    if index:
+        return index.count
+    return fastareader.count_records(path)
+
+
+def partition_option_callback(
+    ctx: click.Context,
+    param: click.Option,
+    value: Optional[str]
+) -> Optional[Tuple[int, int]]:
+    if value is None:
+        return None
+    match: Optional[re.Match] = re.match(r'^(\d+)/(\d+)$', value)
+    if not match or not 0 < int(match.group(1)) <= int(match.group(2)):
+        raise click.BadParameter(
+            'expected K/N where 1 <= K <= N, e.g. 1/4')
+    return int(match.group(1)), int(match.group(2))
 
 
 @cli.command()
@@ -46,19 +93,46 @@ def iter_fasta_files(
               type=click.Path(dir_okay=False),
               help='File path to store the JSON result.')
 @click.option('--sharding', type=int, default=100,
-              help='Save JSON result files per n sequences.')
+              help=('Save JSON result files per n sequences; results '
+                    'written to stdout are not sharded.'))
 @click.option('--no-sharding', is_flag=True,
               help='Save JSON result to a single file.')
 @click.option('--step', type=int, default=40,
               help='Send batch requests per n sequences.')
+@click.option('--max-in-flight', type=int, default=1, show_default=True,
+              help='Maximum number of batch requests sent concurrently.')
+@click.option('--latency-budget', type=float,
+              help=('Size batch requests by their payload so that each '
+                    'request takes about n seconds.'))
+@click.option('--dedup-window', type=int, default=DEDUP_WINDOW,
+              show_default=True,
+              help=('Send a sequence only once if it repeats one of the '
+                    'last n distinct sequences; 0 to disable.'))
 @click.option('--skip', type=int, default=0,
               help='Skip first n sequences.')
+@click.option('--index', is_flag=True,
+              help=('Index the FASTA files (saved as <file>.sidx) to count '
+                    'the sequences and to skip sequences without reading '
+                    'them.'))
+@click.option('--partition', callback=partition_option_callback,
+              metavar='K/N',
+              help=('Only analyze the K-th of N partitions of similar '
+                    'size, e.g. to run N processes in parallel; '
+                    'implies --index.'))
+@click.option('--resume', is_flag=True,
+              help=('Resume an interrupted run from the checkpoint '
+                    'saved next to the output shards.'))
 @click.option('--total', type=int, default=0,
               help=(
-                  'Total number of sequences; '
-                  'specify one to visualize a progress bar.'
+                  'Total number of sequences for the progress bar; '
+                  'counted from the FASTA files if not specified.'
               ))
+@click.option('--no-count', is_flag=True,
+              help=('Do not read the FASTA files in advance to count the '
+                    'sequences.'))
 @click.option('--ugly', is_flag=True, help='Output compressed JSON result.')
+@click.option('--jsonl', is_flag=True,
+              help='Output JSON Lines, one result per line.')
 @click.pass_context
 def fasta(
     ctx: click.Context,
@@ -70,49 +144,104 @@ def fasta(
     sharding: int,
     no_sharding: bool,
     step: int,
+    max_in_flight: int,
+    latency_budget: Optional[float],
+    dedup_window: int,
     skip: int,
+    index: bool,
+    partition: Optional[Tuple[int, int]],
+    resume: bool,
     total: int,
-    ugly: bool
+    no_count: bool,
+    ugly: bool,
+    jsonl: bool
 ) -> None:
     """
     Run alignment, drug resistance and other analysis for one or more
     FASTA-format files contained DNA sequences.
     """
-    ext: str
     query_text: str
-    client: SierraClient = SierraClient(url)
+    last: Optional[Dict[str, Any]] = None
+    client: SierraClient = get_client(ctx, url)
     client.toggle_progress(False)
 
-    fasta_fps: Iterator[TextIO] = iter_fasta_files(fasta)
-
-    sequences: Iterator[Sequence] = chain(*(
-        fastareader.load(fp) for fp in fasta_fps
-    ))
+    fasta_files: List[str] = list_fasta_files(fasta)
+    checkpoint: Checkpoint = Checkpoint(output, fasta_files)
+    start: Position = (0, 0)
+    stop: Optional[Position] = None
+    indexes: List[FastaIndex] = []
+    if index or partition:
+        indexes = [FastaIndex.get(path) for path in fasta_files]
+        first: int = 0
+        count: int = sum(one.count for one in indexes)
+        if partition:
+            first, count = fastaindex.partition(
+                indexes, partition[1])[partition[0] - 1]
+            stop = fastaindex.locate(indexes, first + count)
+        start = fastaindex.locate(indexes, first + skip)
+        total = total or count
+    elif not total and not no_count:
+        total = sum(count_sequences(path) for path in fasta_files)
+    initial: int = skip
     idx_offset: int = math.ceil(skip / sharding)
-    for _ in zip(range(skip), sequences):
-        pass
+    # results written to stdout are never sharded
+    if output == '-' and not no_sharding and (
+        ctx.get_parameter_source('sharding') ==
+        click.core.ParameterSource.COMMANDLINE
+    ):
+        click.echo('--sharding is ignored when writing to stdout; '
+                   'use -o to write shard files.', err=True)
+    no_sharding = no_sharding or output == '-'
+    if resume:
+        if no_sharding or skip:
+            raise click.UsageError(
+                '--resume can not be used with --no-sharding, --skip '
+                'or stdout output.')
+        try:
+            last = checkpoint.last()
+        except CheckpointError as e:
+            raise click.ClickException(str(e))
+    if last:
+        start = (last['position'][0], last['position'][1])
+        initial = last['count']
+        idx_offset = last['shard'] + 1
+    elif not no_sharding:
+        checkpoint.start()
+    tracker: PositionTracker = PositionTracker(initial)
+
+    sequences: Iterator[Sequence] = tracker.track(
+        iter_fasta_records(fasta_files, start, stop)
+    )
+    if not indexes:
+        for _ in zip(range(skip), sequences):
+            tracker.advance()
+
+    def on_error(seq: Sequence, error: ResponseError) -> None:
+        tracker.advance()
+        click.echo('Skipped sequence {!r}: {}'.format(
+            seq['header'], error), err=True)
 
     if query:
         query_text = query.read()
     else:
         query_text = virus.get_default_query('fasta')
 
-    result: Iterator[
-        Dict[str, Any]
-    ] = tqdm.tqdm(
-        client.iter_sequence_analysis(sequences, query_text, step),
-        total=total,
-        initial=skip
-    )
-    if no_sharding:
-        with open(output, 'w') as fp:
-            json.dump(list(result), fp, indent=None if ugly else 2)
-    else:
-        output, ext = os.path.splitext(output)
-        if not ext:
-            ext = 'json'
-        for idx, partial in enumerate(chunked(result, sharding)):
-            with open('{}.{}{}'.format(
-                output, idx + idx_offset, ext
-            ), 'w') as fp:
-                json.dump(partial, fp, indent=None if ugly else 2)
+    with request_errors(client, '' if no_sharding else RESUME_HINT), \
+            Progress(total, initial, 'seq', 'nt') as progress:
+        result: Iterator[
+            Dict[str, Any]
+        ] = client.iter_sequence_analysis(
+            sequences, query_text, step, max_in_flight, on_error,
+            AdaptiveBatching(latency_budget) if latency_budget else None,
+            progress, dedup_window
+        )
+        if no_sharding:
+            dump_json(result, output, ugly, jsonl)
+        else:
+            dump_shards(
+                result, output, sharding, idx_offset, ugly, jsonl,
+                checkpoint, tracker
+            )
+    if client.result_cache is not None:
+        click.echo(
+            'Result cache: {}'.format(client.result_cache.stats()), err=True)
@@ -5,7 +5,7 @@ from typing import List, Dict, TextIO, Any
 from .. import viruses
 from ..sierraclient import SierraClient
 
-from .cli import cli
+from .cli import cli, get_client
 from .options import url_option, virus_option
 
 
@@ -40,7 +40,7 @@ def mutations(
     of mutations in one request.
     """
     query_text: str
-    client: SierraClient = SierraClient(url)
+    client: SierraClient = get_client(ctx, url)
     client.toggle_progress(True)
     if query:
         query_text = query.read()
@@ -5,6 +5,9 @@ from typing import Any, Callable, List
 
 from .. import viruses
 
+FASTA_PATTERN = re.compile(r'\.fa(?:s(?:ta)?)?(?:\.b?gz)?$', re.I)
+CODFREQ_EXT_PATTERN = re.compile(r'\.codfreq(?:\.gz)?$', re.I)
+
 
 def url_option_callback(
     ctx: click.Context,
@@ -1,42 +1,73 @@
 # -*- coding: utf-8 -*-
-import os
 import re
-import json
 import math
-import tqdm  # type: ignore
 import click  # type: ignore
-from more_itertools import chunked
-from typing import List, Dict, Any, TextIO, Optional, Iterator, Tuple
+from typing import (
+    List, Dict, Any, TextIO, Optional, Iterator, Tuple
+)
 
 from .. import viruses
-from ..sierraclient import SierraClient
+from ..sierraclient import (
+    SierraClient, ResponseError, AdaptiveBatching, DEDUP_WINDOW
+)
+from ..progress import Progress
+from ..checkpoint import (
+    Checkpoint, CheckpointError, Position, PositionTracker
+)
 
-from .cli import cli
+from .cli import cli, get_client, request_errors, RESUME_HINT
 from .options import url_option, virus_option
+from .sharding import dump_json, dump_shards
 
 
-def iter_patterns(
-    pattern_files: List[TextIO]
-) -> Iterator[Tuple[str, List[str]]]:
+def is_pattern_line(line: str) -> bool:
+    """Tell if a stripped line is a pattern, not blank, a comment or name."""
+    return bool(line) and not line.startswith(('#', '>'))
+
+
+def iter_pattern_records(
+    pattern_files: List[TextIO],
+    start: Position = (0, 0)
+) -> Iterator[Tuple[Tuple[str, List[str]], Position]]:
+    """Yield patterns and their input positions from start onwards.
+
+    The offset of a position is a ``TextIO.tell()`` cookie; it is -1 if
+    the file (e.g. stdin) is not seekable.
+    """
+    idx: int
     fp: TextIO
     ptn_name: Optional[str]
-    for fp in pattern_files:
+    start_idx, start_offset = start
+    for idx, fp in enumerate(pattern_files[start_idx:], start_idx):
+        seekable: bool = fp.seekable()
+        if idx == start_idx and start_offset:
+            if not seekable:
+                raise click.UsageError(
+                    'Can not resume from {}: not seekable'.format(fp.name))
+            fp.seek(start_offset)
         ptn_name = None
-        for line in fp:
+        for line in iter(fp.readline, ''):
             ptn = line.strip()
-            if not ptn:
-                continue
-            if line.startswith('#'):
-                continue
-            if line.startswith('>'):
-                ptn_name = line[1:].strip()
+            if not is_pattern_line(ptn):
+                if ptn.startswith('>'):
+                    ptn_name = ptn[1:].strip()
                 continue
             elif ptn_name is None:
                 ptn_name = ptn
-            yield ptn_name, re.split(r'[,;+ \t]+', ptn)
+            yield (
+                (ptn_name, re.split(r'[,;+ \t]+', ptn)),
+                (idx, fp.tell() if seekable else -1)
+            )
             ptn_name = None
 
 
+def count_patterns(fp: TextIO) -> int:
+    """Count the patterns of a seekable file and rewind it."""
+    count: int = sum(1 for line in fp if is_pattern_line(line.strip()))
+    fp.seek(0)
+    return count
+
+
 @cli.command()
 @click.argument('patterns', nargs=-1, required=True, type=click.File('r'))
 @url_option('--url')
@@ -48,19 +79,37 @@ def iter_patterns(
               type=click.Path(dir_okay=False),
               help='File path to store the JSON result.')
 @click.option('--sharding', type=int, default=100,
-              help='Save JSON result files per n patterns.')
+              help=('Save JSON result files per n patterns; results '
+                    'written to stdout are not sharded.'))
 @click.option('--no-sharding', is_flag=True,
               help='Save JSON result to a single file.')
 @click.option('--step', type=int, default=40,
               help='Send batch requests per n patterns.')
+@click.option('--max-in-flight', type=int, default=1, show_default=True,
+              help='Maximum number of batch requests sent concurrently.')
+@click.option('--latency-budget', type=float,
+              help=('Size batch requests by their payload so that each '
+                    'request takes about n seconds.'))
+@click.option('--dedup-window', type=int, default=DEDUP_WINDOW,
+              show_default=True,
+              help=('Send a pattern only once if it repeats one of the '
+                    'last n distinct patterns; 0 to disable.'))
 @click.option('--skip', type=int, default=0,
               help='Skip first n patterns.')
+@click.option('--resume', is_flag=True,
+              help=('Resume an interrupted run from the checkpoint '
+                    'saved next to the output shards.'))
 @click.option('--total', type=int, default=0,
               help=(
-                  'Total number of patterns; '
-                  'specify one to visualize a progress bar.'
+                  'Total number of patterns for the progress bar; '
+                  'counted from the pattern files if not specified.'
               ))
+@click.option('--no-count', is_flag=True,
+              help=('Do not read the pattern files in advance to count the '
+                    'patterns.'))
 @click.option('--ugly', is_flag=True, help='Output compressed JSON result.')
+@click.option('--jsonl', is_flag=True,
+              help='Output JSON Lines, one result per line.')
 @click.pass_context
 def patterns(
     ctx: click.Context,
@@ -72,9 +121,15 @@ def patterns(
     sharding: int,
     no_sharding: bool,
     step: int,
+    max_in_flight: int,
+    latency_budget: Optional[float],
+    dedup_window: int,
     skip: int,
+    resume: bool,
     total: int,
-    ugly: bool
+    no_count: bool,
+    ugly: bool,
+    jsonl: bool
 ) -> None:
     """
     Run drug resistance and other analysis for one or more files contains
@@ -91,37 +146,74 @@ def patterns(
     semicolon(;), whitespaces and tabs. The consensus sequences can be
     retrieved from HIVDB website: <https://goo.gl/ZBthkt>.
     """
-    client: SierraClient = SierraClient(url)
+    client: SierraClient = get_client(ctx, url)
     client.toggle_progress(False)
 
-    fp: TextIO
     query_text: str
-    ptns: Iterator[Tuple[str, List[str]]] = iter_patterns(patterns)
+    last: Optional[Dict[str, Any]] = None
+    checkpoint: Checkpoint = Checkpoint(output, [fp.name for fp in patterns])
+    start: Position = (0, 0)
+    initial: int = skip
     idx_offset: int = math.ceil(skip / sharding)
+    # results written to stdout are never sharded
+    if output == '-' and not no_sharding and (
+        ctx.get_parameter_source('sharding') ==
+        click.core.ParameterSource.COMMANDLINE
+    ):
+        click.echo('--sharding is ignored when writing to stdout; '
+                   'use -o to write shard files.', err=True)
+    no_sharding = no_sharding or output == '-'
+    if resume:
+        if no_sharding or skip:
+            raise click.UsageError(
+                '--resume can not be used with --no-sharding, --skip '
+                'or stdout output.')
+        try:
+            last = checkpoint.last()
+        except CheckpointError as e:
+            raise click.ClickException(str(e))
+    if last:
+        start = (last['position'][0], last['position'][1])
+        initial = last['count']
+        idx_offset = last['shard'] + 1
+    elif not no_sharding:
+        checkpoint.start()
+    if not total and not no_count and all(
+            fp.seekable() for fp in patterns):
+        total = sum(count_patterns(fp) for fp in patterns)
+    tracker: PositionTracker = PositionTracker(initial)
+
+    ptns: Iterator[Tuple[str, List[str]]] = tracker.track(
+        iter_pattern_records(patterns, start)
+    )
     for _ in zip(range(skip), ptns):
-        pass
+        tracker.advance()
+
+    def on_error(ptn: Tuple[str, List[str]], error: ResponseError) -> None:
+        tracker.advance()
+        click.echo('Skipped pattern {!r}: {}'.format(ptn[0], error), err=True)
 
     if query:
         query_text = query.read()
     else:
         query_text = virus.get_default_query('patterns')
 
-    result: Iterator[
-        Dict[str, Any]
-    ] = tqdm.tqdm(
-        client.iter_pattern_analysis(ptns, query_text, step),
-        total=total,
-        initial=skip
-    )
-    if no_sharding:
-        with open(output, 'w') as fp:
-            json.dump(list(result), fp, indent=None if ugly else 2)
-    else:
-        output, ext = os.path.splitext(output)
-        if not ext:
-            ext = 'json'
-        for idx, partial in enumerate(chunked(result, sharding)):
-            with open('{}.{}{}'.format(
-                output, idx + idx_offset, ext
-            ), 'w') as fp:
-                json.dump(partial, fp, indent=None if ugly else 2)
+    with request_errors(client, '' if no_sharding else RESUME_HINT), \
+            Progress(total, initial, 'pattern', 'mut') as progress:
+        result: Iterator[
+            Dict[str, Any]
+        ] = client.iter_pattern_analysis(
+            ptns, query_text, step, max_in_flight, on_error,
+            AdaptiveBatching(latency_budget) if latency_budget else None,
+            progress=progress, dedup_window=dedup_window
+        )
+        if no_sharding:
+            dump_json(result, output, ugly, jsonl)
+        else:
+            dump_shards(
+                result, output, sharding, idx_offset, ugly, jsonl,
+                checkpoint, tracker
+            )
+    if client.result_cache is not None:
+        click.echo(
+            'Result cache: {}'.format(client.result_cache.stats()), err=True)
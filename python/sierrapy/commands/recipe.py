@@ -8,7 +8,7 @@ from .. import recipes
 
 @cli.group()
 @click.option('--input', default='-', type=click.File('r'),
-              help='JSON result from Sierra web service.')
+              help=('JSON or JSON Lines result from Sierra web service.'))
 @click.option('--output', default='-', type=click.File('w'),
               help='File path to store the result.')
 @click.pass_context
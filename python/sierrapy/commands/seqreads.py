@@ -1,28 +1,43 @@
 import click  # type: ignore
+import os
 import csv
 import re
 import json
 import gzip
+import itertools
+import functools
 
-from io import StringIO
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, Future
 from typing import (
+    Callable,
     Tuple,
     Optional,
     TextIO,
-    BinaryIO,
+    IO,
+    Iterable,
     List,
     Dict,
-    Iterable
+    Any,
+    Iterator,
+    Deque
 )
-from tqdm import tqdm  # type: ignore
-from more_itertools import chunked  # type: ignore
 
 from .. import viruses
-from ..sierraclient import SierraClient
-from ..common_types import PosReads, SeqReads, UntransRegion
+from ..sierraclient import SierraClient, ResponseError, AdaptiveBatching
+from ..common_types import PosReads, CodonReads, SeqReads, UntransRegion
+from ..jsonstream import get_writer
+from ..progress import Progress
+from ..schemacache import default_cache_dir
+from ..codfreqcache import CodfreqCache, ParsedCodfreq
+from ..resultcache import result_key
+from ..manifest import InputState, ReportManifest
+from ..fileio import is_gzipped
 
-from .cli import cli
-from .options import url_option, virus_option, file_or_dir_argument
+from .cli import cli, get_client, request_errors
+from .options import (
+    url_option, virus_option, file_or_dir_argument, CODFREQ_EXT_PATTERN
+)
 
 UTR_BEGIN: re.Pattern = re.compile(
     r'^# *--- *untranslated regions begin *---'
@@ -34,33 +49,59 @@ UTR_PATTERN: re.Pattern = re.compile(
     r'# *(?P<name>[\S]+) (?P<refStart>\d+)'
     r'\.\.(?P<refEnd>\d+): *(?P<consensus>[\S]+)'
 )
-CODFREQ_EXT_PATTERN = re.compile(r'\.codfreq(?:\.gz)?$', re.I)
+
+# minPrevalence, maxMixtureRate, minCodonReads and minPositionReads
+Cutoffs = Tuple[float, float, int, int]
+# JSON size of a CodonReads besides its codon and reads, with separator
+CODON_READS_JSON_SIZE: int = len('{"codon": "", "reads": }, ')
+
+
+def parse_untrans_region(
+    row: str,
+    begin: bool,
+    results: List[UntransRegion]
+) -> bool:
+    """Parse a comment row of an untranslated regions block.
+
+    ``begin`` tells if the row is inside the block; returns whether the
+    next row is. Regions are appended to results.
+    """
+    groupdict: Dict[str, str]
+    if UTR_END.search(row):
+        return False
+    elif begin:
+        match: Optional[re.Match] = UTR_PATTERN.search(row)
+        if match:
+            groupdict = match.groupdict()
+
+            results.append({
+                'name': groupdict['name'],
+                'refStart': int(groupdict['refStart']),
+                'refEnd': int(groupdict['refEnd']),
+                'consensus': groupdict['consensus']
+            })
+    elif UTR_BEGIN.search(row):
+        return True
+    return begin
 
 
 def parse_untrans_regions(fp: TextIO) -> List[UntransRegion]:
     row: str
-    groupdict: Dict[str, str]
     begin: bool = False
     results: List[UntransRegion] = []
     for row in fp:
-        if UTR_END.search(row):
-            begin = False
-        elif begin:
-            match: Optional[re.Match] = UTR_PATTERN.search(row)
-            if match:
-                groupdict = match.groupdict()
-
-                results.append({
-                    'name': groupdict['name'],
-                    'refStart': int(groupdict['refStart']),
-                    'refEnd': int(groupdict['refEnd']),
-                    'consensus': groupdict['consensus']
-                })
-        elif UTR_BEGIN.search(row):
-            begin = True
+        begin = parse_untrans_region(row, begin, results)
     return results
 
 
+def open_codfreq(filename: str) -> IO[str]:
+    """Open a plain or gzip compressed codfreq file as text."""
+    if is_gzipped(filename):
+        return gzip.open(  # type: ignore
+            filename, 'rt', encoding='UTF-8-sig', newline='')
+    return open(filename, encoding='UTF-8-sig', newline='')
+
+
 def parse_seqreads(
     filename: str,
     virus: viruses.Virus,
@@ -69,8 +110,15 @@ def parse_seqreads(
     min_codon_reads: int,
     min_position_reads: int
 ) -> SeqReads:
-    bin_fp: BinaryIO
-    fp: TextIO
+    """Parse a codfreq file in a single pass.
+
+    The file is decompressed and read line by line; comment lines are
+    scanned for untranslated regions while the other lines are parsed as
+    codon reads, tab- or comma-delimited as the first of them.
+    """
+    fp: IO[str]
+    row: List[str]
+    gene_text: str
     aapos_text: str
     total_reads_text: str
     codon_reads_text: str
@@ -80,89 +128,74 @@ def parse_seqreads(
     codon_reads: int
     codon: str
     gpkey: Tuple[str, int]
+    untrans_regions: List[UntransRegion] = []
+    gpmap: Dict[Tuple[str, int], PosReads] = {}
 
-    with open(filename, 'rb') as bin_fp:
-        gzip_decl: bytes = bin_fp.read(2)
-        bin_fp.seek(0)
-        if gzip_decl == b'\x1f\x8b':
-            fp = StringIO(
-                gzip.decompress(bin_fp.read()).decode('UTF-8-sig')
-            )
-        else:
-            fp = StringIO(bin_fp.read().decode('UTF-8-sig'))
-
-    untrans_regions: List[UntransRegion] = parse_untrans_regions(fp)
-    fp.seek(0)
-    while True:
-        firstrow = fp.readline()
-        if firstrow.startswith('#'):
-            continue
-        delimiter = ','
-        if '\t' in firstrow:
-            delimiter = '\t'
-        break
-    fp.seek(0)
+    def data_lines(lines: Iterable[str]) -> Iterator[str]:
+        line: str
+        begin: bool = False
+        for line in lines:
+            if '#' in line:
+                begin = parse_untrans_region(line, begin, untrans_regions)
+                if line.startswith('#'):
+                    continue
+            yield line
 
-    gpmap: Dict[Tuple[str, int], PosReads] = {}
-    for row in csv.reader(fp, delimiter=delimiter):
-        if row[0].startswith('#'):
-            continue
-        num_cols = len(row)
-        if num_cols >= 5:
-            (gene,
+    with open_codfreq(filename) as fp:
+        lines: Iterator[str] = data_lines(fp)
+        firstrow: str = next(lines, '')
+        delimiter: str = '\t' if '\t' in firstrow else ','
+        for row in csv.reader(
+            itertools.chain([firstrow], lines), delimiter=delimiter
+        ):
+            if len(row) < 5:
+                continue
+            (gene_text,
              aapos_text,
              total_reads_text,
              codon,
              codon_reads_text) = row[:5]
-        else:
-            continue
-        codon = codon.upper()
-        try:
-            aapos = int(aapos_text)
-        except (TypeError, ValueError):
-            continue
-        gene = virus.synonym_to_gene_name(gene)
-        # skip header and problem rows
-        if (
-            not gene or
-            not aapos_text.isdigit() or
-            not total_reads_text.isdigit() or
-            len(codon) < 3 or
-            not codon_reads_text.isdigit()
-        ):
-            continue
-        gene, aapos = virus.source_gene_to_target_gene_position(gene, aapos)
-        if gene is None or aapos is None:
-            continue
-        try:
-            total_reads = int(total_reads_text)
-        except (TypeError, ValueError):
-            continue
-        if total_reads == 0:
-            continue
-        try:
-            codon_reads = int(codon_reads_text)
-        except (TypeError, ValueError):
-            continue
-        if codon_reads == 0:
-            continue
-        # ## Leave to the backend to handle frameshift
-        # if codon.count('-') < 3:
-        #     codon = codon.replace('-', '')
-        # if len(codon) < 3:
-        #     continue
-        gpkey = (gene, aapos)
-        if gpkey not in gpmap:
-            gpmap[gpkey] = {
-                'allCodonReads': [],
-                'gene': gene,
-                'position': aapos,
-                'totalReads': total_reads
-            }
-        gpmap[gpkey]['allCodonReads'].append(
-            {'codon': codon, 'reads': codon_reads})
+            # skip header and problem rows
+            if (
+                not aapos_text.isdigit() or
+                not total_reads_text.isdigit() or
+                len(codon) < 3 or
+                not codon_reads_text.isdigit()
+            ):
+                continue
+            try:
+                aapos = int(aapos_text)
+                total_reads = int(total_reads_text)
+                codon_reads = int(codon_reads_text)
+            except ValueError:
+                continue
+            if total_reads == 0 or codon_reads == 0:
+                continue
+            gene = virus.synonym_to_gene_name(gene_text)
+            if not gene:
+                continue
+            gene, aapos = virus.source_gene_to_target_gene_position(
+                gene, aapos)
+            if gene is None or aapos is None:
+                continue
+            codon = codon.upper()
+            # ## Leave to the backend to handle frameshift
+            # if codon.count('-') < 3:
+            #     codon = codon.replace('-', '')
+            # if len(codon) < 3:
+            #     continue
+            gpkey = (gene, aapos)
+            if gpkey not in gpmap:
+                gpmap[gpkey] = {
+                    'allCodonReads': [],
+                    'gene': gene,
+                    'position': aapos,
+                    'totalReads': total_reads
+                }
+            gpmap[gpkey]['allCodonReads'].append(
+                {'codon': codon, 'reads': codon_reads})
     return {
-        'name': bin_fp.name,
+        'name': filename,
         'strain': virus.strain_name,
         'allReads': sorted(
             gpmap.values(),
@@ -176,6 +209,184 @@ def parse_seqreads(
     }
 
 
+def parse_seqreads_cached(
+    parse: Callable[..., SeqReads],
+    cache: CodfreqCache,
+    filename: str,
+    virus: viruses.Virus,
+    min_prevalence: float,
+    max_mixture_rate: float,
+    min_codon_reads: int,
+    min_position_reads: int
+) -> SeqReads:
+    """Parse a codfreq file with parse unless it is cached."""
+    parsed: SeqReads
+    stat: os.stat_result = os.stat(filename)
+    cached: Optional[ParsedCodfreq] = cache.load(
+        filename, virus.virus_name, stat)
+    if cached is None:
+        parsed = parse(
+            filename, virus, min_prevalence, max_mixture_rate,
+            min_codon_reads, min_position_reads)
+        cache.save(
+            filename, virus.virus_name, stat,
+            parsed['allReads'], parsed['untranslatedRegions'])
+        return parsed
+    all_reads, untrans_regions = cached
+    return {
+        'name': filename,
+        'strain': virus.strain_name,
+        'allReads': all_reads,
+        'untranslatedRegions': untrans_regions,
+        'minPrevalence': min_prevalence,
+        'maxMixtureRate': max_mixture_rate,
+        'minCodonReads': min_codon_reads,
+        'minPositionReads': min_position_reads
+    }
+
+
+def with_cutoffs(payload: SeqReads, cutoffs: Cutoffs) -> SeqReads:
+    """Return a copy of payload with other cutoffs, sharing its reads."""
+    variant: SeqReads = payload.copy()
+    (variant['minPrevalence'],
+     variant['maxMixtureRate'],
+     variant['minCodonReads'],
+     variant['minPositionReads']) = cutoffs
+    return variant
+
+
+def prune_codon_reads(
+    payload: SeqReads
+) -> Tuple[SeqReads, int, int, int]:
+    """Drop the codon reads below the minCodonReads of payload.
+
+    The server ignores these codons, so the reports stay the same. Codons
+    below other cutoffs are kept: e.g. the actual minimal prevalence and
+    the mixture rate depend on codons below minPrevalence. Positions are
+    kept as well for the read depth statistics.
+
+    A position without any codon passing the cutoff is kept unpruned: an
+    empty ``allCodonReads`` is not the same input to the server as codons
+    it filters out itself, and the reports are only known to stay the same
+    for the latter. Such positions have a low read depth, so they rarely
+    hold many codons.
+
+    Returns the pruned payload, the number of dropped codons, the number
+    of codons below the cutoff kept at such positions, and the JSON size
+    of the dropped codons in bytes.
+    """
+    pos_reads: PosReads
+    codon_reads: CodonReads
+    kept: List[CodonReads]
+    all_reads: List[PosReads] = []
+    min_reads: int = payload['minCodonReads']
+    dropped: int = 0
+    retained: int = 0
+    saved: int = 0
+    for pos_reads in payload['allReads']:
+        kept = [
+            codon_reads for codon_reads in pos_reads['allCodonReads']
+            if codon_reads['reads'] >= min_reads
+        ]
+        if not kept:
+            retained += len(pos_reads['allCodonReads'])
+        if not kept or len(kept) == len(pos_reads['allCodonReads']):
+            all_reads.append(pos_reads)
+            continue
+        for codon_reads in pos_reads['allCodonReads']:
+            if codon_reads['reads'] < min_reads:
+                dropped += 1
+                saved += (
+                    CODON_READS_JSON_SIZE + len(codon_reads['codon']) +
+                    len(str(codon_reads['reads'])))
+        all_reads.append({
+            'allCodonReads': kept,
+            'gene': pos_reads['gene'],
+            'position': pos_reads['position'],
+            'totalReads': pos_reads['totalReads']
+        })
+    pruned: SeqReads = payload.copy()
+    pruned['allReads'] = all_reads
+    return pruned, dropped, retained, saved
+
+
+def filter_codon_reads(payload: SeqReads) -> SeqReads:
+    """Return a copy of payload with only the codon reads the server uses.
+
+    That is, the codon reads of at least minCodonReads reads; everything
+    else is kept. Pruning must not change this view of a payload, which
+    allows checking it offline.
+    """
+    filtered: SeqReads = payload.copy()
+    min_reads: int = payload['minCodonReads']
+    filtered['allReads'] = [{
+        'allCodonReads': [
+            codon_reads for codon_reads in pos_reads['allCodonReads']
+            if codon_reads['reads'] >= min_reads
+        ],
+        'gene': pos_reads['gene'],
+        'position': pos_reads['position'],
+        'totalReads': pos_reads['totalReads']
+    } for pos_reads in payload['allReads']]
+    return filtered
+
+
+def report_filename(filename: str, cutoffs: Optional[Cutoffs]) -> str:
+    """Name the report of a codfreq file, with the cutoffs of a sweep."""
+    if cutoffs is None:
+        return CODFREQ_EXT_PATTERN.sub('.report.json', filename)
+    return CODFREQ_EXT_PATTERN.sub(
+        '.p{:g}-m{:g}-d{}-D{}.report.json'.format(*cutoffs), filename)
+
+
+def describe(filename: str, cutoffs: Optional[Cutoffs]) -> str:
+    """Name a codfreq file, with the cutoffs of a sweep, in messages."""
+    if cutoffs is None:
+        return filename
+    return '{} (-p {:g} -m {:g} -d {} -D {})'.format(filename, *cutoffs)
+
+
+def iter_parsed_seqreads(
+    filenames: List[str],
+    workers: int,
+    prefetch: int,
+    *args: Any,
+    parse: Callable[..., SeqReads] = parse_seqreads
+) -> Iterator[Tuple[str, SeqReads]]:
+    """Parse codfreq files with ``parse(filename, *args)``.
+
+    Files are parsed by a pool of worker processes while the caller
+    consumes earlier results, at most prefetch files ahead; ``parse``
+    must therefore be a module-level function. The pool has at most one
+    process per file and is not started for a single file. Yields the
+    file names and the parsed results in input order.
+    """
+    fn: str
+    workers = min(workers, len(filenames))
+    if workers < 2:
+        for fn in filenames:
+            yield fn, parse(fn, *args)
+        return
+    parsing: Deque[Tuple[str, Future]] = deque()
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        try:
+            for fn in filenames:
+                if len(parsing) >= max(prefetch, 1):
+                    yield parsing[0][0], parsing.popleft()[1].result()
+                parsing.append(
+                    (fn, executor.submit(parse, fn, *args)))
+            while parsing:
+                yield parsing[0][0], parsing.popleft()[1].result()
+        finally:
+            for _, future in parsing:
+                future.cancel()
+
+
+INCREMENTAL_HINT: str = (
+    'Run the same command again to analyze only the files without an '
+    'up-to-date report.')
+
+
 @cli.command()
 @url_option('--url')
 @virus_option('--virus')
@@ -184,67 +395,246 @@ def parse_seqreads(
     pattern=CODFREQ_EXT_PATTERN
 )
 @click.option('-p', '--pcnt-cutoff',
-              type=float, default=0.1, show_default=True,
+              type=float, default=[0.1], show_default=True, multiple=True,
               help=('Minimal prevalence cutoff for this sequence reads '
                     '(range: 0-1.0)'))
 @click.option('-m', '--mixture-cutoff',
-              type=float, default=0.0005, show_default=True,
+              type=float, default=[0.0005], show_default=True, multiple=True,
               help=('Maximum mixture rate for this sequence reads '
                     '(range: 0-1.0)'))
-@click.option('-d', '--min-codon-reads', type=int, default=1,
-              show_default=True,
+@click.option('-d', '--min-codon-reads', type=int, default=[1],
+              show_default=True, multiple=True,
               help=('Minimal read depth applied to '
                     'each codon of this sequence'))
-@click.option('-D', '--min-position-reads', type=int, default=1,
-              show_default=True,
+@click.option('-D', '--min-position-reads', type=int, default=[1],
+              show_default=True, multiple=True,
               help=('Minimal read depth applied to '
                     'each position of this sequence'))
 @click.option('-q', '--query', type=click.File('r'), show_default=True,
               help=('A file contains GraphQL fragment definition '
                     'on `SequenceAnalysis`'))
+@click.option('--files-per-request', type=int, default=2, show_default=True,
+              help='Send batch requests per n files.')
+@click.option('--max-in-flight', type=int, default=1, show_default=True,
+              help='Maximum number of batch requests sent concurrently.')
+@click.option('--parse-workers', type=int, default=os.cpu_count() or 1,
+              show_default='number of CPUs',
+              help=('Number of processes parsing the files, at most one per '
+                    'file; 1 to parse them in the main process.'))
+@click.option('--prefetch', type=int,
+              help=('Maximum number of files parsed ahead of the requests.  '
+                    '[default: twice the files of the requests in flight '
+                    'or the parse workers, whichever is larger]'))
+@click.option('--numpy', 'use_numpy', is_flag=True,
+              help=('Parse the files into columnar NumPy arrays, which is '
+                    'faster for large files; requires numpy.'))
+@click.option('--codfreq-cache', is_flag=True,
+              help=('Cache the parsed files and only parse files changed '
+                    'since they were cached.'))
+@click.option('--codfreq-cache-dir', type=click.Path(file_okay=False),
+              help=('Directory of the parsed files cache; implies '
+                    '--codfreq-cache.  [default: "codfreq" in the cache '
+                    'directory]'))
+@click.option('--prune', is_flag=True,
+              help=('Drop codon reads below --min-codon-reads before sending '
+                    'the files, and report the bytes each file saved.'))
+@click.option('--incremental', is_flag=True,
+              help=('Only analyze files whose report is missing, or was '
+                    'written from another version of the file or with other '
+                    'cutoffs, query or server version.'))
+@click.option('--manifest', type=click.Path(dir_okay=False),
+              help=('Manifest of the written reports used by --incremental, '
+                    'which it implies.  [default: '
+                    '"seqreads-manifest.jsonl" in the cache directory]'))
+@click.option('--latency-budget', type=float,
+              help=('Size batch requests by their payload so that each '
+                    'request takes about n seconds.'))
+@click.option('-o', '--output', type=click.Path(dir_okay=False),
+              help=('Store all reports in a single file ("-" for stdout) '
+                    'instead of a ".report.json" file next to each input.'))
 @click.option('--ugly', is_flag=True, help='Output compressed JSON result')
+@click.option('--jsonl', is_flag=True,
+              help=('Output JSON Lines, one report per line; implies '
+                    '"-o -" unless --output is specified.'))
 @click.pass_context
 def seqreads(
     ctx: click.Context,
     url: str,
     virus: viruses.Virus,
     seqreads: List[str],
-    pcnt_cutoff: float,
-    mixture_cutoff: float,
-    min_codon_reads: int,
-    min_position_reads: int,
+    pcnt_cutoff: Tuple[float, ...],
+    mixture_cutoff: Tuple[float, ...],
+    min_codon_reads: Tuple[int, ...],
+    min_position_reads: Tuple[int, ...],
     query: TextIO,
-    ugly: bool
+    files_per_request: int,
+    max_in_flight: int,
+    parse_workers: int,
+    prefetch: Optional[int],
+    use_numpy: bool,
+    codfreq_cache: bool,
+    codfreq_cache_dir: Optional[str],
+    prune: bool,
+    incremental: bool,
+    manifest: Optional[str],
+    latency_budget: Optional[float],
+    output: Optional[str],
+    ugly: bool,
+    jsonl: bool
 ) -> None:
     """
     Run alignment, drug resistance and other analysis for one or more
     tab-delimited text files contained codon reads of HIV-1 pol DNA sequences.
+
+    Repeat the cutoff options to sweep all their combinations; each file is
+    parsed once and analyzed with each combination.
     """
-    idx: int
-    fns: Iterable[str]
     fn: str
-    partial_result: str
+    cutoffs: Cutoffs
+    report_cutoffs: Optional[Cutoffs]
+    report: Dict[str, Any]
     query_text: str
-    output: TextIO
-    client: SierraClient = SierraClient(url)
+    fp: IO[str]
+    parse: Callable[..., SeqReads] = parse_seqreads
+    if use_numpy:
+        try:
+            from ..codfreqarrays import parse_seqreads_arrays
+        except ImportError as e:
+            raise click.ClickException(
+                '--numpy requires numpy; install it with '
+                '"pip install sierrapy[numpy]"'
+            ) from e
+        parse = parse_seqreads_arrays
+    if codfreq_cache or codfreq_cache_dir:
+        parse = functools.partial(
+            parse_seqreads_cached,
+            parse,
+            CodfreqCache(codfreq_cache_dir or os.path.join(
+                ctx.obj.get('CACHE_DIR') or default_cache_dir(), 'codfreq'))
+        )
+    if (incremental or manifest) and (output or jsonl):
+        raise click.UsageError(
+            '--incremental writes a report next to each input; it can not '
+            'be used with --output or --jsonl.')
+    client: SierraClient = get_client(ctx, url)
     if query:
         query_text = query.read()
     else:
         query_text = virus.get_default_query('seqreads')
 
-    seqreads = tqdm(seqreads)
-    for fns in chunked(seqreads, 2):
-        payload: List[SeqReads] = [parse_seqreads(
-            fn,
+    # the files and sweep cutoffs of the payloads without report yet
+    pending: Deque[Tuple[str, Optional[Cutoffs]]] = deque()
+    grid: List[Cutoffs] = list(itertools.product(
+        pcnt_cutoff, mixture_cutoff, min_codon_reads, min_position_reads))
+    sweep: bool = len(grid) > 1
+    # the cutoffs to analyze each file with
+    file_grids: Dict[str, List[Cutoffs]] = {fn: grid for fn in seqreads}
+
+    report_manifest: Optional[ReportManifest] = None
+    sources: Dict[str, InputState] = {}
+    params: Dict[Cutoffs, str] = {}
+    if incremental or manifest:
+        report_manifest = ReportManifest(manifest or os.path.join(
+            ctx.obj.get('CACHE_DIR') or default_cache_dir(),
+            'seqreads-manifest.jsonl'))
+        report_manifest.load()
+        versions: str = json.dumps(client.server_versions(), sort_keys=True)
+        for cutoffs in grid:
+            params[cutoffs] = result_key(
+                'seqreads', client.url, versions, virus.virus_name,
+                query_text, json.dumps(cutoffs), 'prune' if prune else '')
+        for fn in seqreads:
+            sources[fn] = InputState(fn)
+            file_grids[fn] = [
+                cutoffs for cutoffs in grid
+                if not report_manifest.is_current(
+                    report_filename(fn, cutoffs if sweep else None),
+                    sources[fn], params[cutoffs])
+            ]
+            if file_grids[fn]:
+                # hash the file as it is before it is parsed
+                sources[fn].sha256()
+        seqreads = [fn for fn in seqreads if file_grids[fn]]
+        click.echo('{} reports are up to date; analyzing {} files'.format(
+            len(file_grids) * len(grid) - sum(map(len, file_grids.values())),
+            len(seqreads)), err=True)
+
+    parse_workers = min(parse_workers, len(seqreads))
+    if prefetch is None:
+        prefetch = 2 * max(files_per_request * max_in_flight, parse_workers)
+
+    def pruned(
+        fn: str,
+        cutoffs: Optional[Cutoffs],
+        payload: SeqReads
+    ) -> SeqReads:
+        dropped: int
+        retained: int
+        saved: int
+        if not prune:
+            return payload
+        payload, dropped, retained, saved = prune_codon_reads(payload)
+        click.echo(
+            'Pruned {}: {} codon reads below {} reads dropped, {:.1f} KiB '
+            'saved; {} kept at positions without a codon reaching it'
+            .format(describe(fn, cutoffs), dropped,
+                    payload['minCodonReads'], saved / 1024, retained),
+            err=True)
+        return payload
+
+    def iter_payloads() -> Iterator[SeqReads]:
+        payload: SeqReads
+        cutoffs: Cutoffs
+        for fn, payload in iter_parsed_seqreads(
+            seqreads,
+            parse_workers,
+            prefetch or 0,
             virus,
-            pcnt_cutoff,
-            mixture_cutoff,
-            min_codon_reads,
-            min_position_reads
-        ) for fn in fns]
-        for [fn, report] in zip(
-            fns, client._sequence_reads_analysis(payload, query_text)
+            *grid[0],
+            parse=parse
         ):
-            output_filename: str = CODFREQ_EXT_PATTERN.sub('.report.json', fn)
-            with open(output_filename, 'w') as output:
-                json.dump(report, output, indent=None if ugly else 2)
+            if not sweep:
+                pending.append((fn, None))
+                yield pruned(fn, None, payload)
+                continue
+            for cutoffs in file_grids[fn]:
+                pending.append((fn, cutoffs))
+                yield pruned(fn, cutoffs, with_cutoffs(payload, cutoffs))
+
+    def on_error(payload: SeqReads, error: ResponseError) -> None:
+        fn, cutoffs = pending.popleft()
+        click.echo(
+            'Skipped {}: {}'.format(describe(fn, cutoffs), error), err=True)
+
+    if jsonl and not output:
+        output = '-'
+    with request_errors(client, INCREMENTAL_HINT if incremental else ''), \
+            Progress(
+                sum(len(file_grids[fn]) for fn in seqreads), 0,
+                'report' if sweep else 'file', 'codon'
+            ) as progress:
+        reports: Iterator[
+            Dict[str, Any]
+        ] = client.iter_sequence_reads_analysis(
+            iter_payloads(), query_text, files_per_request, max_in_flight,
+            on_error,
+            AdaptiveBatching(latency_budget) if latency_budget else None,
+            progress
+        )
+        if output:
+            with click.open_file(output, 'w') as fp, \
+                    get_writer(fp, ugly, jsonl) as writer:
+                for report in reports:
+                    pending.popleft()
+                    writer.write(report)
+            return
+
+        for report in reports:
+            fn, report_cutoffs = pending.popleft()
+            output_filename: str = report_filename(fn, report_cutoffs)
+            with open(output_filename, 'w') as fp:
+                json.dump(report, fp, indent=None if ugly else 2)
+            if report_manifest is not None:
+                report_manifest.record(
+                    output_filename, sources[fn],
+                    params[report_cutoffs or grid[0]])
@@ -0,0 +1,57 @@
+import os
+import click  # type: ignore
+from itertools import islice
+from typing import Dict, Any, Iterable, Iterator
+
+from ..checkpoint import Checkpoint, PositionTracker
+from ..jsonstream import get_writer
+
+
+def dump_json(
+    result: Iterable[Dict[str, Any]],
+    output: str,
+    ugly: bool,
+    jsonl: bool
+) -> None:
+    """Save all results to a single file (or stdout) as they arrive."""
+    item: Dict[str, Any]
+    with click.open_file(output, 'w') as fp, \
+            get_writer(fp, ugly, jsonl) as writer:
+        for item in result:
+            writer.write(item)
+
+
+def dump_shards(
+    result: Iterator[Dict[str, Any]],
+    output: str,
+    sharding: int,
+    idx_offset: int,
+    ugly: bool,
+    jsonl: bool,
+    checkpoint: Checkpoint,
+    tracker: PositionTracker
+) -> None:
+    """Save results per n records and journal each completed shard.
+
+    Each result is written as soon as it arrives. A shard is written to a
+    temporary file and renamed when completed, so an interrupted run never
+    leaves a partial shard behind.
+    """
+    idx: int
+    ext: str
+    first: Dict[str, Any]
+    item: Dict[str, Any]
+    output, ext = os.path.splitext(output)
+    if not ext:
+        ext = 'jsonl' if jsonl else 'json'
+    results: Iterator[Dict[str, Any]] = tracker.follow(result)
+    for idx, first in enumerate(results, idx_offset):
+        path: str = '{}.{}{}'.format(output, idx, ext)
+        with open(path + '.tmp', 'w') as fp, \
+                get_writer(fp, ugly, jsonl) as writer:
+            writer.write(first)
+            for item in islice(results, sharding - 1):
+                writer.write(item)
+        os.replace(path + '.tmp', path)
+        assert tracker.position is not None
+        checkpoint.record(idx, tracker.count, tracker.position)
@@ -0,0 +1,377 @@
+import os
+import re
+import json
+import time
+import signal
+import threading
+import click  # type: ignore
+from collections import deque
+from typing import (
+    Any, Dict, Tuple, List, Optional, Iterator, Deque, TextIO
+)
+
+from .. import fastareader, viruses
+from ..sierraclient import SierraClient, ResponseError
+from ..common_types import Sequence, SeqReads
+from ..jsonstream import get_writer
+from ..manifest import InputState, ReportManifest
+from ..resultcache import result_key
+from ..schemacache import default_cache_dir
+
+from .cli import cli, get_client
+from .options import (
+    url_option, virus_option, FASTA_PATTERN, CODFREQ_EXT_PATTERN
+)
+
+POLL_INTERVAL: float = 2.
+BATCH_WINDOW: float = 10.
+
+
+def fasta_output(path: str) -> str:
+    # the full name is kept, so "x.fa" and "x.fasta" get their own outputs;
+    # a codfreq file of the same sample is reported as <name>.report.json
+    return path + '.report.json'
+
+
+def codfreq_output(path: str) -> str:
+    return CODFREQ_EXT_PATTERN.sub('.report.json', path)
+
+
+class DirectoryScanner:
+    """Find the files of directories which stopped changing.
+
+    A file is settled once its size and modification time did not change
+    between two polls; each settled version of a file is returned once.
+    """
+    dirs: List[str]
+    patterns: List[re.Pattern]
+    _seen: Dict[str, Tuple[int, int]]
+    _returned: Dict[str, Tuple[int, int]]
+
+    def __init__(self, dirs: List[str], patterns: List[re.Pattern]):
+        self.dirs = dirs
+        self.patterns = patterns
+        self._seen = {}
+        self._returned = {}
+
+    def forget(self, states: List[InputState]) -> None:
+        """Return the files again from the next poll, e.g. to retry them."""
+        state: InputState
+        for state in states:
+            self._returned.pop(state.path, None)
+
+    def poll(self) -> List[InputState]:
+        path: str
+        settled: List[InputState] = []
+        seen: Dict[str, Tuple[int, int]] = {}
+        for path in self.list_files():
+            try:
+                state: InputState = InputState(path)
+            except OSError:
+                # removed meanwhile
+                continue
+            key: Tuple[int, int] = (state.size, state.mtime)
+            seen[state.path] = key
+            if (
+                state.size and
+                self._seen.get(state.path) == key and
+                self._returned.get(state.path) != key
+            ):
+                self._returned[state.path] = key
+                settled.append(state)
+        self._seen = seen
+        return settled
+
+    def list_files(self) -> List[str]:
+        paths: List[str] = []
+        for one in self.dirs:
+            try:
+                names: List[str] = sorted(os.listdir(one))
+            except OSError:
+                continue
+            for fn in names:
+                if any(pattern.search(fn) for pattern in self.patterns):
+                    paths.append(os.path.join(one, fn))
+        return paths
+
+
+def replace_json(path: str, data: Any, ugly: bool) -> None:
+    """Write JSON to path through a temporary file."""
+    with open(path + '.tmp', 'w') as fp:
+        json.dump(data, fp, indent=None if ugly else 2)
+    os.replace(path + '.tmp', path)
+
+
+def analyze_fasta_files(
+    client: SierraClient,
+    states: List[InputState],
+    query: str,
+    step: int,
+    max_in_flight: int,
+    ugly: bool
+) -> Iterator[Tuple[InputState, str]]:
+    """Analyze the sequences of FASTA files in shared batch requests.
+
+    The results of each file are written to its output as soon as they
+    are complete. Yields each file with its output.
+    """
+    idx: int
+    result: Dict[str, Any]
+    # the index of the file of each sequence sent
+    owners: Deque[int] = deque()
+    results: List[Dict[str, Any]] = []
+    written: int = 0
+
+    def iter_sequences() -> Iterator[Sequence]:
+        for idx, state in enumerate(states):
+            for seq in fastareader.load_file(state.path):
+                owners.append(idx)
+                yield seq
+
+    def on_error(seq: Sequence, error: ResponseError) -> None:
+        owners.popleft()
+        click.echo('Skipped sequence {!r}: {}'.format(
+            seq['header'], error), err=True)
+
+    def write(state: InputState) -> str:
+        output: str = fasta_output(state.path)
+        with open(output + '.tmp', 'w') as fp, \
+                get_writer(fp, ugly, False) as writer:
+            for result in results:
+                writer.write(result)
+        os.replace(output + '.tmp', output)
+        results.clear()
+        return output
+
+    for result in client.iter_sequence_analysis(
+        iter_sequences(), query, step, max_in_flight, on_error
+    ):
+        idx = owners.popleft()
+        while written < idx:
+            yield states[written], write(states[written])
+            written += 1
+        results.append(result)
+    while written < len(states):
+        yield states[written], write(states[written])
+        written += 1
+
+
+def analyze_codfreq_files(
+    client: SierraClient,
+    states: List[InputState],
+    virus: viruses.Virus,
+    cutoffs: Tuple[float, float, int, int],
+    query: str,
+    files_per_request: int,
+    max_in_flight: int,
+    ugly: bool
+) -> Iterator[Tuple[InputState, str]]:
+    """Analyze codfreq files in shared batch requests.
+
+    Yields each file whose report was written, with the report.
+    """
+    # imported here as it registers the seqreads command
+    from .seqreads import parse_seqreads
+    state: InputState
+    report: Dict[str, Any]
+    pending: Deque[InputState] = deque()
+
+    def iter_payloads() -> Iterator[SeqReads]:
+        for state in states:
+            pending.append(state)
+            yield parse_seqreads(state.path, virus, *cutoffs)
+
+    def on_error(payload: SeqReads, error: ResponseError) -> None:
+        click.echo('Skipped {}: {}'.format(
+            pending.popleft().path, error), err=True)
+
+    for report in client.iter_sequence_reads_analysis(
+        iter_payloads(), query, files_per_request, max_in_flight, on_error
+    ):
+        state = pending.popleft()
+        output: str = codfreq_output(state.path)
+        replace_json(output, report, ugly)
+        yield state, output
+
+
+@cli.command()
+@click.argument(
+    'directories',
+    nargs=-1,
+    type=click.Path(exists=True, file_okay=False),
+    required=True)
+@url_option('--url')
+@virus_option('--virus')
+@click.option('--interval', type=float, default=POLL_INTERVAL,
+              show_default=True,
+              help='Seconds between two scans of the directories.')
+@click.option('--window', type=float, default=BATCH_WINDOW,
+              show_default=True,
+              help=('Seconds to wait for more files after a file arrived, '
+                    'to analyze them in shared batch requests.'))
+@click.option('--fasta-query', type=click.File('r'),
+              help=('A file contains GraphQL fragment definition '
+                    'on `SequenceAnalysis`.'))
+@click.option('--seqreads-query', type=click.File('r'),
+              help=('A file contains GraphQL fragment definition '
+                    'on `SequenceReadsAnalysis`.'))
+@click.option('-p', '--pcnt-cutoff',
+              type=float, default=0.1, show_default=True,
+              help=('Minimal prevalence cutoff for sequence reads '
+                    '(range: 0-1.0)'))
+@click.option('-m', '--mixture-cutoff',
+              type=float, default=0.0005, show_default=True,
+              help=('Maximum mixture rate for sequence reads '
+                    '(range: 0-1.0)'))
+@click.option('-d', '--min-codon-reads', type=int, default=1,
+              show_default=True,
+              help='Minimal read depth applied to each codon')
+@click.option('-D', '--min-position-reads', type=int, default=1,
+              show_default=True,
+              help='Minimal read depth applied to each position')
+@click.option('--step', type=int, default=40, show_default=True,
+              help='Send batch requests per n sequences.')
+@click.option('--files-per-request', type=int, default=2, show_default=True,
+              help='Send batch requests per n codfreq files.')
+@click.option('--max-in-flight', type=int, default=1, show_default=True,
+              help='Maximum number of batch requests sent concurrently.')
+@click.option('--manifest', type=click.Path(dir_okay=False),
+              help=('Manifest of the written outputs, which tells the files '
+                    'to analyze after a restart.  [default: '
+                    '"watch-manifest.jsonl" in the cache directory]'))
+@click.option('--ugly', is_flag=True, help='Output compressed JSON result')
+@click.pass_context
+def watch(
+    ctx: click.Context,
+    directories: Tuple[str, ...],
+    url: str,
+    virus: viruses.Virus,
+    interval: float,
+    window: float,
+    fasta_query: Optional[TextIO],
+    seqreads_query: Optional[TextIO],
+    pcnt_cutoff: float,
+    mixture_cutoff: float,
+    min_codon_reads: int,
+    min_position_reads: int,
+    step: int,
+    files_per_request: int,
+    max_in_flight: int,
+    manifest: Optional[str],
+    ugly: bool
+) -> None:
+    """
+    Watch directories and analyze arriving FASTA and CodFreq files.
+
+    Files are analyzed once they stopped changing. The results are written
+    next to each file, as "<file name>.report.json" for FASTA files (e.g.
+    "x.fa.report.json") and as "<name>.report.json" for CodFreq files.
+    Files without an up-to-date output, e.g. files arrived while not
+    watching, are analyzed as well.
+    Stop with Ctrl-C or SIGTERM; the files being analyzed are finished
+    first.
+    """
+    state: InputState
+    client: SierraClient = get_client(ctx, url)
+    client.toggle_progress(False)
+    cutoffs: Tuple[float, float, int, int] = (
+        pcnt_cutoff, mixture_cutoff, min_codon_reads, min_position_reads)
+    queries: Dict[str, str] = {}
+    patterns: List[re.Pattern] = []
+    if 'fasta' in virus.supported_commands:
+        queries['fasta'] = (
+            fasta_query.read() if fasta_query
+            else virus.get_default_query('fasta'))
+        patterns.append(FASTA_PATTERN)
+    if 'seqreads' in virus.supported_commands:
+        queries['seqreads'] = (
+            seqreads_query.read() if seqreads_query
+            else virus.get_default_query('seqreads'))
+        patterns.append(CODFREQ_EXT_PATTERN)
+    report_manifest: ReportManifest = ReportManifest(manifest or os.path.join(
+        ctx.obj.get('CACHE_DIR') or default_cache_dir(),
+        'watch-manifest.jsonl'))
+    report_manifest.load()
+    scanner: DirectoryScanner = DirectoryScanner(list(directories), patterns)
+
+    stopping: threading.Event = threading.Event()
+
+    def stop(signum: int, frame: Any) -> None:
+        if stopping.is_set():
+            raise KeyboardInterrupt()
+        stopping.set()
+        click.echo('Stopping after the files being analyzed; '
+                   'press Ctrl-C again to stop now.', err=True)
+
+    signal.signal(signal.SIGINT, stop)
+    signal.signal(signal.SIGTERM, stop)
+
+    def get_params() -> Dict[str, str]:
+        """Return the parameters of the outputs, for the current server."""
+        # requested for each batch, so a server upgrade is picked up
+        versions: str = json.dumps(client.refresh_versions(), sort_keys=True)
+        params: Dict[str, str] = {}
+        if 'fasta' in queries:
+            params['fasta'] = result_key(
+                'fasta', client.url, versions, virus.virus_name,
+                queries['fasta'])
+        if 'seqreads' in queries:
+            params['seqreads'] = result_key(
+                'seqreads', client.url, versions, virus.virus_name,
+                queries['seqreads'], json.dumps(cutoffs), '')
+        return params
+
+    def analyze(batch: List[InputState]) -> None:
+        output: str
+        params: Dict[str, str] = get_params()
+        fasta_states: List[InputState] = [
+            state for state in batch
+            if FASTA_PATTERN.search(state.path) and
+            not report_manifest.is_current(
+                fasta_output(state.path), state, params['fasta'])]
+        codfreq_states: List[InputState] = [
+            state for state in batch
+            if CODFREQ_EXT_PATTERN.search(state.path) and
+            not report_manifest.is_current(
+                codfreq_output(state.path), state, params['seqreads'])]
+        if fasta_states:
+            for state, output in analyze_fasta_files(
+                client, fasta_states, queries['fasta'],
+                step, max_in_flight, ugly
+            ):
+                report_manifest.record(output, state, params['fasta'])
+                click.echo('{} -> {}'.format(state.path, output), err=True)
+        if codfreq_states:
+            for state, output in analyze_codfreq_files(
+                client, codfreq_states, virus, cutoffs,
+                queries['seqreads'], files_per_request, max_in_flight, ugly
+            ):
+                report_manifest.record(output, state, params['seqreads'])
+                click.echo('{} -> {}'.format(state.path, output), err=True)
+
+    click.echo('Watching {}'.format(', '.join(directories)), err=True)
+    batch: List[InputState] = []
+    batch_start: float = 0.
+    with client:
+        while not stopping.is_set():
+            for state in scanner.poll():
+                # whether the output is current is checked by analyze(),
+                # which requests the server versions
+                if not batch:
+                    batch_start = time.monotonic()
+                batch.append(state)
+            if batch and time.monotonic() - batch_start >= window:
+                try:
+                    analyze(batch)
+                except Exception as e:
+                    # keep watching, e.g. while the server is unreachable
+                    click.echo(
+                        'Failed to analyze {} files, retrying later: {}'
+                        .format(len(batch), e), err=True)
+                    scanner.forget(batch)
+                batch = []
+                continue
+            stopping.wait(interval)
+    if batch:
+        click.echo('{} files left for the next run'.format(len(batch)),
+                   err=True)
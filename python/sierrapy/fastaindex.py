@@ -0,0 +1,131 @@
+import os
+import bisect
+from array import array
+from typing import Optional, List, Tuple, TextIO
+
+from . import fastareader
+from .checkpoint import Position
+from .common_types import Sequence
+
+INDEX_SUFFIX: str = '.sidx'
+INDEX_MAGIC: str = '#sierrapy-fasta-index v1'
+
+
+class FastaIndex:
+    """Offsets and sequence lengths of the records of a FASTA file.
+
+    The index is saved in a sidecar file ``<fasta>.sidx``: a header line
+    with the size and mtime of the FASTA file, then one tab-delimited line
+    ``offset length header`` per record. ``offset`` is where reading the
+    record begins (for a compressed file, in the decompressed content);
+    ``length`` is the number of nucleotides.
+    """
+    path: str
+    offsets: 'array[int]'
+    lengths: 'array[int]'
+
+    def __init__(self, path: str):
+        self.path = path
+        self.offsets = array('q')
+        self.lengths = array('q')
+
+    @property
+    def count(self) -> int:
+        return len(self.offsets)
+
+    @staticmethod
+    def index_path(path: str) -> str:
+        return path + INDEX_SUFFIX
+
+    @staticmethod
+    def _stamp(path: str) -> str:
+        stat: os.stat_result = os.stat(path)
+        return 'size={} mtime_ns={}'.format(stat.st_size, stat.st_mtime_ns)
+
+    @classmethod
+    def build(cls, path: str) -> 'FastaIndex':
+        """Scan a FASTA file and save its index; return the index."""
+        fp: Optional[TextIO]
+        seq: Sequence
+        end: int
+        offset: int = 0
+        index: FastaIndex = cls(path)
+        index_path: str = cls.index_path(path)
+        try:
+            fp = open(index_path + '.tmp', 'w')
+            fp.write('{} {}\n'.format(INDEX_MAGIC, cls._stamp(path)))
+        except OSError:
+            # e.g. a read-only directory; the index is kept in memory
+            fp = None
+        try:
+            for seq, end in fastareader.iter_file_records(path):
+                if fp:
+                    fp.write('{}\t{}\t{}\n'.format(
+                        offset, len(seq['sequence']), seq['header']))
+                index.offsets.append(offset)
+                index.lengths.append(len(seq['sequence']))
+                offset = end
+        finally:
+            if fp:
+                fp.close()
+        if fp:
+            os.replace(index_path + '.tmp', index_path)
+        return index
+
+    @classmethod
+    def load(cls, path: str) -> Optional['FastaIndex']:
+        """Load the saved index; None if it is missing or outdated."""
+        line: str
+        index: FastaIndex = cls(path)
+        try:
+            with open(cls.index_path(path)) as fp:
+                if fp.readline().rstrip('\n') != '{} {}'.format(
+                        INDEX_MAGIC, cls._stamp(path)):
+                    return None
+                for line in fp:
+                    offset, length, _ = line.split('\t', 2)
+                    index.offsets.append(int(offset))
+                    index.lengths.append(int(length))
+        except (OSError, ValueError):
+            return None
+        return index
+
+    @classmethod
+    def get(cls, path: str) -> 'FastaIndex':
+        """Load the saved index, or build it if missing or outdated."""
+        return cls.load(path) or cls.build(path)
+
+
+def locate(indexes: List[FastaIndex], idx: int) -> Position:
+    """Return the position of the idx-th record of several files."""
+    file_idx: int
+    index: FastaIndex
+    for file_idx, index in enumerate(indexes):
+        if idx < index.count:
+            return file_idx, index.offsets[idx]
+        idx -= index.count
+    return len(indexes), 0
+
+
+def partition(indexes: List[FastaIndex], num: int) -> List[Tuple[int, int]]:
+    """Split the records of several files into num contiguous partitions.
+
+    Partitions hold about the same number of nucleotides. Returns the
+    index of the first record and the number of records of each partition.
+    """
+    part: int
+    length: int
+    index: FastaIndex
+    total: int = 0
+    cumulative: 'array[int]' = array('q')
+    for index in indexes:
+        for length in index.lengths:
+            total += length
+            cumulative.append(total)
+    bounds: List[int] = [0]
+    for part in range(1, num):
+        # records ending within the share of previous partitions
+        bounds.append(bisect.bisect_right(cumulative, total * part / num))
+    bounds.append(len(cumulative))
+    return [(bounds[part], bounds[part + 1] - bounds[part])
+            for part in range(num)]
@@ -1,5 +1,11 @@
-from typing import TextIO, Generator, Optional
+import mmap
+from typing import (
+    TextIO, BinaryIO, Generator, Optional, Tuple, Union
+)
 from .common_types import Sequence
+from .fileio import BLOCK_SIZE, is_gzipped, open_maybe_gzip
+
+Buffer = Union[bytes, bytearray, mmap.mmap]
 
 
 def load(fp: TextIO) -> Generator[Sequence, None, None]:
@@ -26,3 +32,185 @@ def load(fp: TextIO) -> Generator[Sequence, None, None]:
             'header': header,
             'sequence': curseq.upper().decode('U8')
         }
+
+
+NON_ASCII: bytes = bytes(range(128, 256))
+LINE_BREAKS_AND_NON_ASCII: bytes = b'\r\n' + NON_ASCII
+TO_UPPER: bytes = bytes.maketrans(
+    b'abcdefghijklmnopqrstuvwxyz', b'ABCDEFGHIJKLMNOPQRSTUVWXYZ')
+
+
+def find_header(buf: Buffer, start: int, end: int) -> int:
+    """Return the index of the next ``>`` starting a line after start."""
+    # a single byte search is much faster than searching for "\\n>"
+    pos: int = buf.find(b'>', start + 1, end)
+    while pos > 0 and buf[pos - 1] != 0x0a:  # not after a line break
+        pos = buf.find(b'>', pos + 1, end)
+    return pos
+
+
+def parse_record(record: Union[bytes, bytearray]) -> Optional[Sequence]:
+    """Parse one FASTA record, starting with its ``>`` header line.
+
+    Returns None for a record without header or sequence.
+    """
+    sequence: Union[bytes, bytearray]
+    header_line, _, body = record.partition(b'\n')
+    header: Union[bytes, bytearray] = header_line[1:].strip()
+    if not header:
+        return None
+    # fast path: upper-case and drop line breaks in a single pass
+    sequence = body.translate(TO_UPPER, LINE_BREAKS_AND_NON_ASCII)
+    if (
+        b' ' in body or b'\t' in body or
+        b'\x0b' in body or b'\x0c' in body or
+        (b'#' in body and (body.startswith(b'#') or b'\n#' in body)) or
+        (b'\r' in body and (
+            # a carriage return inside a line
+            body.count(b'\r') !=
+            body.count(b'\r\n') + body.endswith(b'\r')
+        ))
+    ):
+        # uncommon input: only strip each line and skip comment lines
+        sequence = b''.join([
+            line.strip().translate(TO_UPPER, NON_ASCII)
+            for line in body.split(b'\n')
+            if not line.startswith(b'#')
+        ])
+    if not sequence:
+        return None
+    return {
+        'header': header.decode('U8'),
+        'sequence': sequence.decode('ASCII')
+    }
+
+
+def iter_buffer(
+    buf: Buffer,
+    start: int = 0,
+    end: Optional[int] = None,
+    base: int = 0
+) -> Generator[Tuple[Sequence, int], None, None]:
+    """Parse the FASTA records of ``buf[start:end]``.
+
+    The range must end at a record boundary. Yields each record with the
+    offset where the next record begins; offsets are relative to ``base``
+    (the offset of ``buf[0]``).
+    """
+    pos: int
+    seq: Optional[Sequence]
+    if end is None:
+        end = len(buf)
+    pos = start
+    if buf[pos:pos + 1] != b'>' or (pos and buf[pos - 1] != 0x0a):
+        # skip anything before the first header
+        pos = find_header(buf, pos, end)
+        if pos < 0:
+            return
+    while pos < end:
+        nxt: int = find_header(buf, pos, end)
+        if nxt < 0:
+            nxt = end
+        seq = parse_record(buf[pos:nxt])
+        if seq:
+            yield seq, base + nxt
+        pos = nxt
+
+
+def iter_records(
+    fp: BinaryIO,
+    offset: int = 0,
+    block_size: int = BLOCK_SIZE
+) -> Generator[Tuple[Sequence, int], None, None]:
+    """Read FASTA records from a binary file.
+
+    The file is read in large blocks. Yields each record with the offset
+    where the next record begins, so reading can later be resumed with
+    ``fp.seek(end_offset)``. ``offset`` is the current position of ``fp``.
+    """
+    cut: int
+    searched: int = 0
+    buf: bytearray = bytearray()
+    while True:
+        block: bytes = fp.read(block_size)
+        if not block:
+            break
+        buf.extend(block)
+        # records are complete up to the last header found so far
+        cut = buf.rfind(b'\n>', max(searched - 1, 0))
+        searched = len(buf)
+        if cut < 0:
+            continue
+        cut += 1
+        yield from iter_buffer(buf, 0, cut, offset)
+        del buf[:cut]
+        offset += cut
+        searched -= cut
+    yield from iter_buffer(buf, 0, len(buf), offset)
+
+
+def open_fasta(path: str) -> BinaryIO:
+    """Open a plain, gzip or bgzip compressed FASTA file for reading."""
+    return open_maybe_gzip(path)
+
+
+def iter_file_records(
+    path: str,
+    offset: int = 0,
+    end: Optional[int] = None
+) -> Generator[Tuple[Sequence, int], None, None]:
+    """Read FASTA records of a file from ``offset`` onwards.
+
+    An uncompressed file is memory-mapped; a gzip or bgzip compressed file
+    is decompressed in blocks and its offsets refer to the decompressed
+    content. Yields the same ``(record, end_offset)`` pairs as
+    ``iter_records``. If given, ``end`` must be the offset of a record;
+    reading stops there.
+    """
+    fp: BinaryIO
+    mm: mmap.mmap
+    seq: Sequence
+    next_offset: int
+    if is_gzipped(path):
+        with open_fasta(path) as fp:
+            fp.seek(offset)
+            for seq, next_offset in iter_records(fp, offset):
+                if end is not None and offset >= end:
+                    break
+                yield seq, next_offset
+                offset = next_offset
+        return
+    with open(path, 'rb') as fp:
+        if not fp.seek(0, 2):
+            # an empty file can not be memory-mapped
+            return
+        with mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            yield from iter_buffer(mm, offset, end)
+
+
+def count_records(path: str) -> int:
+    """Count the headers of a FASTA file without parsing its records.
+
+    Records without sequence are counted too, so this is an upper bound
+    of the number of records read by ``iter_file_records``.
+    """
+    fp: BinaryIO
+    count: int = 0
+    last: bytes = b'\n'
+    with open_fasta(path) as fp:
+        while True:
+            block: bytes = fp.read(BLOCK_SIZE)
+            if not block:
+                break
+            count += block.count(b'\n>')
+            if last == b'\n' and block.startswith(b'>'):
+                count += 1
+            last = block[-1:]
+    return count
+
+
+def load_file(path: str) -> Generator[Sequence, None, None]:
+    """Read all FASTA records of a plain or compressed file."""
+    seq: Sequence
+    for seq, _ in iter_file_records(path):
+        yield seq
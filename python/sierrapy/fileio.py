@@ -0,0 +1,19 @@
+import gzip
+from typing import BinaryIO
+
+GZIP_MAGIC: bytes = b'\x1f\x8b'
+BLOCK_SIZE: int = 1 << 22
+
+
+def is_gzipped(path: str) -> bool:
+    fp: BinaryIO
+    with open(path, 'rb') as fp:
+        return fp.read(2) == GZIP_MAGIC
+
+
+def open_maybe_gzip(path: str) -> BinaryIO:
+    """Open a plain, gzip or bgzip compressed file for binary reading."""
+    if is_gzipped(path):
+        # bgzip files are multi-member gzip files
+        return gzip.open(path, 'rb')  # type: ignore
+    return open(path, 'rb')
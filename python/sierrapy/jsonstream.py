@@ -0,0 +1,182 @@
+import json
+from types import TracebackType
+from typing import Optional, Any, IO, TextIO, Type, Iterator
+
+JSON_WHITESPACE = ' \t\n\r'
+
+
+class JSONWriter:
+    """Base class of writers emitting JSON records one at a time."""
+    fp: IO[str]
+    count: int
+
+    def __init__(self, fp: IO[str]):
+        self.fp = fp
+        self.count = 0
+
+    def write(self, item: Any) -> None:
+        raise NotImplementedError
+
+    def close(self) -> None:
+        pass
+
+    def __enter__(self) -> 'JSONWriter':
+        return self
+
+    def __exit__(
+        self,
+        exc_type: Optional[Type[BaseException]],
+        exc: Optional[BaseException],
+        tb: Optional[TracebackType]
+    ) -> None:
+        self.close()
+
+
+class JSONArrayWriter(JSONWriter):
+    """Write a JSON array to a file one element at a time.
+
+    The output is identical to ``json.dump(items, fp, indent=indent)``
+    but only the element being written is held in memory.
+
+    Usage::
+
+        with JSONArrayWriter(fp, indent=2) as writer:
+            for item in items:
+                writer.write(item)
+    """
+    indent: Optional[int]
+    _separator: str
+    _closed: bool
+
+    def __init__(self, fp: IO[str], indent: Optional[int] = None):
+        super().__init__(fp)
+        self.indent = indent
+        self._closed = False
+        if indent is None:
+            self._separator = ', '
+        else:
+            self._separator = ',\n' + ' ' * indent
+
+    def write(self, item: Any) -> None:
+        text: str = json.dumps(item, indent=self.indent)
+        if self.indent is not None:
+            # JSON strings never contain a literal newline, so every
+            # newline in text is a line break of the nested structure
+            text = text.replace('\n', '\n' + ' ' * self.indent)
+        if self.count:
+            self.fp.write(self._separator)
+        elif self.indent is None:
+            self.fp.write('[')
+        else:
+            self.fp.write('[\n' + ' ' * self.indent)
+        self.fp.write(text)
+        self.count += 1
+
+    def close(self) -> None:
+        if self._closed:
+            return
+        self._closed = True
+        if not self.count:
+            self.fp.write('[]')
+        elif self.indent is None:
+            self.fp.write(']')
+        else:
+            self.fp.write('\n]')
+
+
+class JSONLinesWriter(JSONWriter):
+    """Write JSON Lines: one compact JSON document per line."""
+
+    def write(self, item: Any) -> None:
+        self.fp.write(json.dumps(item) + '\n')
+        self.fp.flush()
+        self.count += 1
+
+
+def get_writer(fp: IO[str], ugly: bool, jsonl: bool) -> JSONWriter:
+    if jsonl:
+        return JSONLinesWriter(fp)
+    return JSONArrayWriter(fp, indent=None if ugly else 2)
+
+
+def iter_json_records(
+    fp: TextIO,
+    chunk_size: int = 65536
+) -> Iterator[Any]:
+    """Yield the records of a JSON array or a JSON Lines file.
+
+    A JSON array is decoded incrementally, one element at a time, so only
+    the element being decoded is held in memory. Any other input is read
+    as JSON Lines of objects.
+    """
+    line: str
+    first: str = ''
+    while True:
+        first = fp.read(1)
+        if not first or first not in JSON_WHITESPACE:
+            break
+    if not first:
+        return
+    if first != '[':
+        line = first + fp.readline()
+        while line:
+            if line.strip():
+                yield json.loads(line)
+            line = fp.readline()
+        return
+
+    decoder: json.JSONDecoder = json.JSONDecoder()
+    buf: str = ''
+    pos: int = 0
+    eof: bool = False
+    expect_value: bool = True
+    started: bool = False
+    item: Any
+    end: int
+    nxt: int
+    while True:
+        while pos < len(buf) and buf[pos] in JSON_WHITESPACE:
+            pos += 1
+        if pos == len(buf):
+            if eof:
+                raise ValueError('Unexpected end of JSON array')
+            buf = fp.read(chunk_size)
+            pos = 0
+            eof = not buf
+            continue
+        if not expect_value:
+            if buf[pos] == ']':
+                return
+            if buf[pos] != ',':
+                raise ValueError(
+                    'Expecting "," or "]" in JSON array, got {!r}'
+                    .format(buf[pos]))
+            pos += 1
+            expect_value = True
+            continue
+        if buf[pos] == ']' and not started:
+            # an empty array
+            return
+        try:
+            item, end = decoder.raw_decode(buf, pos)
+        except json.JSONDecodeError:
+            if eof:
+                raise
+            end = len(buf)
+        nxt = end
+        while nxt < len(buf) and buf[nxt] in JSON_WHITESPACE:
+            nxt += 1
+        if not eof and (nxt == len(buf) or buf[nxt] not in ',]'):
+            # the element may continue in the next chunk (a number can
+            # be decoded from its prefix); read at least as much as
+            # buffered so that a large element is decoded in amortized
+            # linear time
+            more: str = fp.read(max(chunk_size, len(buf) - pos))
+            buf = buf[pos:] + more
+            pos = 0
+            eof = not more
+            continue
+        yield item
+        pos = end
+        started = True
+        expect_value = False
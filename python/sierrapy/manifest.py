@@ -0,0 +1,128 @@
+import os
+import json
+import hashlib
+import tempfile
+from typing import Optional, Dict, Any, BinaryIO
+
+from .fileio import BLOCK_SIZE
+
+
+def file_sha256(path: str) -> str:
+    fp: BinaryIO
+    sha256 = hashlib.sha256()
+    with open(path, 'rb') as fp:
+        while True:
+            block: bytes = fp.read(BLOCK_SIZE)
+            if not block:
+                break
+            sha256.update(block)
+    return sha256.hexdigest()
+
+
+class InputState:
+    """Size, modification time and lazily computed hash of an input."""
+    path: str
+    size: int
+    mtime: int
+    _sha256: Optional[str]
+
+    def __init__(self, path: str):
+        stat: os.stat_result = os.stat(path)
+        self.path = os.path.abspath(path)
+        self.size = stat.st_size
+        self.mtime = stat.st_mtime_ns
+        self._sha256 = None
+
+    def sha256(self) -> str:
+        if self._sha256 is None:
+            self._sha256 = file_sha256(self.path)
+        return self._sha256
+
+
+class ReportManifest:
+    """Journal of the reports written from input files.
+
+    The manifest is a JSON Lines file; a line is appended after each
+    report is written and records the input's size, modification time and
+    SHA-256 with a hash of the analysis parameters (cutoffs, query, server
+    versions, ...). A later line of a report supersedes earlier ones.
+    """
+    path: str
+    entries: Dict[str, Dict[str, Any]]
+
+    def __init__(self, path: str):
+        self.path = path
+        self.entries = {}
+
+    def load(self) -> None:
+        """Read the manifest and compact it to one line per report."""
+        line: str
+        entry: Dict[str, Any]
+        lines: int = 0
+        try:
+            with open(self.path) as fp:
+                for line in fp:
+                    try:
+                        entry = json.loads(line)
+                        self.entries[entry['report']] = entry
+                    except (ValueError, KeyError, TypeError):
+                        # an incomplete line left by an interrupted write
+                        continue
+                    lines += 1
+        except FileNotFoundError:
+            return
+        if lines > len(self.entries):
+            self.save()
+
+    def save(self) -> None:
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)),
+                    exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(
+            dir=os.path.dirname(os.path.abspath(self.path)))
+        with os.fdopen(fd, 'w') as fp:
+            for entry in self.entries.values():
+                fp.write(json.dumps(entry) + '\n')
+        os.replace(tmp_path, self.path)
+
+    def is_current(
+        self,
+        report: str,
+        source: InputState,
+        params: str
+    ) -> bool:
+        """Tell if report was written from source with the same params.
+
+        An input whose modification time changed is hashed; if its content
+        is unchanged the report is still current.
+        """
+        report = os.path.abspath(report)
+        entry: Optional[Dict[str, Any]] = self.entries.get(report)
+        if (
+            entry is None or
+            entry['input'] != source.path or
+            entry['params'] != params or
+            entry['size'] != source.size or
+            not os.path.exists(report)
+        ):
+            return False
+        if entry['mtime'] == source.mtime:
+            return True
+        if entry['sha256'] != source.sha256():
+            return False
+        self.record(report, source, params)
+        return True
+
+    def record(self, report: str, source: InputState, params: str) -> None:
+        entry: Dict[str, Any] = {
+            'report': os.path.abspath(report),
+            'input': source.path,
+            'size': source.size,
+            'mtime': source.mtime,
+            'sha256': source.sha256(),
+            'params': params
+        }
+        self.entries[entry['report']] = entry
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)),
+                    exist_ok=True)
+        with open(self.path, 'a') as fp:
+            fp.write(json.dumps(entry) + '\n')
@@ -0,0 +1,97 @@
+import time
+import threading
+from collections import deque
+from types import TracebackType
+from typing import Optional, Deque, Tuple, List, Type
+from tqdm import tqdm  # type: ignore
+
+
+def format_rate(rate: float) -> str:
+    if rate >= 1e6:
+        return '{:.1f}M'.format(rate / 1e6)
+    if rate >= 1e3:
+        return '{:.1f}k'.format(rate / 1e3)
+    return '{:.0f}'.format(rate)
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of sorted values."""
+    return values[min(int(len(values) * pct / 100), len(values) - 1)]
+
+
+class Progress:
+    """Progress bar of a batch analysis.
+
+    Besides the item rate and ETA shown by tqdm, it shows the payload rate
+    (e.g. nucleotides per second) and the latency percentiles of the most
+    recent ``window`` requests, so a slowdown is visible while it happens.
+
+    ``observe`` may be called from worker threads when a request completes;
+    ``update`` is called as the results are consumed.
+    """
+    bar: tqdm
+    weight_unit: Optional[str]
+    _lock: threading.Lock
+    _requests: Deque[Tuple[float, float, float]]
+
+    def __init__(
+        self,
+        total: Optional[int] = None,
+        initial: int = 0,
+        unit: str = 'it',
+        weight_unit: Optional[str] = None,
+        window: int = 100
+    ):
+        self.bar = tqdm(
+            total=total or None, initial=initial, unit=unit,
+            dynamic_ncols=True)
+        self.weight_unit = weight_unit
+        self._lock = threading.Lock()
+        # (completed at, weight, latency) of recent requests
+        self._requests = deque(maxlen=window)
+
+    def observe(self, weight: float, latency: float) -> None:
+        with self._lock:
+            self._requests.append((time.monotonic(), weight, latency))
+
+    def postfix(self) -> str:
+        requests: List[Tuple[float, float, float]]
+        with self._lock:
+            requests = list(self._requests)
+        if not requests:
+            return ''
+        parts: List[str] = []
+        if self.weight_unit:
+            # the weight completed within the window, over its duration
+            first_done, _, first_latency = requests[0]
+            span: float = requests[-1][0] - first_done + first_latency
+            parts.append('{} {}/s'.format(
+                format_rate(
+                    sum(weight for _, weight, _ in requests) /
+                    max(span, 1e-3)),
+                self.weight_unit))
+        latencies: List[float] = sorted(
+            latency for _, _, latency in requests)
+        parts.append('latency p50={:.2f}s p95={:.2f}s p99={:.2f}s'.format(
+            percentile(latencies, 50),
+            percentile(latencies, 95),
+            percentile(latencies, 99)))
+        return ', '.join(parts)
+
+    def update(self, num: int) -> None:
+        self.bar.set_postfix_str(self.postfix(), refresh=False)
+        self.bar.update(num)
+
+    def close(self) -> None:
+        self.bar.close()
+
+    def __enter__(self) -> 'Progress':
+        return self
+
+    def __exit__(
+        self,
+        exc_type: Optional[Type[BaseException]],
+        exc: Optional[BaseException],
+        tb: Optional[TracebackType]
+    ) -> None:
+        self.close()
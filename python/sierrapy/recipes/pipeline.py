@@ -0,0 +1,44 @@
+import click  # type: ignore
+from typing import Any, Optional, Iterator
+
+from voluptuous import Schema, MultipleInvalid  # type: ignore
+
+from ..common_types import SequenceResult
+from ..jsonstream import iter_json_records
+
+
+def record_header(record: Any) -> Optional[str]:
+    """Return the sequence header of a (possibly invalid) record."""
+    if not isinstance(record, dict):
+        return None
+    input_sequence: Any = record.get('inputSequence')
+    if not isinstance(input_sequence, dict):
+        return None
+    header: Any = input_sequence.get('header')
+    return header if isinstance(header, str) else None
+
+
+def iter_records(
+    ctx: click.Context,
+    schema: Schema
+) -> Iterator[SequenceResult]:
+    """Read, validate and yield the input records one at a time.
+
+    Invalid records are reported with their index and header and skipped;
+    the recipe fails after the remaining records are processed.
+    """
+    idx: int
+    record: Any
+    invalid: int = 0
+    for idx, record in enumerate(iter_json_records(ctx.obj['INPUT'])):
+        try:
+            schema(record)
+        except MultipleInvalid as e:
+            invalid += 1
+            click.echo('Invalid record #{} ({!r}): {}'.format(
+                idx, record_header(record), e), err=True)
+            continue
+        yield record
+    if invalid:
+        raise click.ClickException(
+            '{} invalid record(s) skipped'.format(invalid))
@@ -1,14 +1,16 @@
 import csv
 import _csv
-import json
 import click  # type: ignore
 from collections import OrderedDict
-from typing import OrderedDict as tOrderedDict, TextIO, List, Dict, Optional
+from typing import (
+    OrderedDict as tOrderedDict, TextIO, List, Dict, Optional, Iterator, Any
+)
 from voluptuous import (  # type: ignore
-    Schema, Required, MultipleInvalid, ALLOW_EXTRA
+    Schema, Required, ALLOW_EXTRA
 )
 
 from ..common_types import SequenceResult, AlignedGeneSeq
+from .pipeline import iter_records
 
 GENES: tOrderedDict = OrderedDict([
     ('PR', 99),
@@ -17,7 +19,7 @@ GENES: tOrderedDict = OrderedDict([
 ])
 
 
-schema: Schema = Schema([{
+schema: Schema = Schema({
     Required('inputSequence'): {
         Required('header'): str
     },
@@ -29,36 +31,30 @@ schema: Schema = Schema([{
         Required('lastAA'): int,
         Required('alignedNAs'): str
     }]
-}], extra=ALLOW_EXTRA)
+}, extra=ALLOW_EXTRA)
+
+
+def sequence_rows(seq: SequenceResult) -> Iterator[List[Any]]:
+    """Yield a row for each aligned gene of one sequence result."""
+    gene: str
+    geneseq: Optional[AlignedGeneSeq]
+    seqheader: str = seq['inputSequence']['header']
+    geneseqs: Dict[str, AlignedGeneSeq] = {
+        gs['gene']['name']: gs for gs in seq['alignedGeneSequences']}
+    for gene, _ in GENES.items():
+        geneseq = geneseqs.get(gene)
+        if not geneseq:
+            continue
+        yield [seqheader, gene, geneseq['firstAA'],
+               geneseq['lastAA'], geneseq['alignedNAs']]
 
 
 @click.pass_context
 def sequencetsv(ctx: click.Context) -> None:
     """Export mutation set of each sequences from Sierra result."""
     seq: SequenceResult
-    seqheader: str
-    geneseqs: Dict[str, AlignedGeneSeq]
-    geneseq: Optional[AlignedGeneSeq]
-    first_aa: int
-    last_aa: int
-    aligned_nas: str
     output: TextIO = ctx.obj['OUTPUT']
-    sequences: List[SequenceResult] = json.load(ctx.obj['INPUT'])
-    try:
-        schema(sequences)
-    except MultipleInvalid as e:
-        raise click.ClickException(str(e))
     writer: _csv._writer = csv.writer(output, delimiter='\t')
     writer.writerow(['Header', 'Gene', 'FirstAA', 'LastAA', 'AlignedNAs'])
-    for seq in sequences:
-        seqheader = seq['inputSequence']['header']
-        geneseqs = {gs['gene']['name']: gs
-                    for gs in seq['alignedGeneSequences']}
-        for gene, _ in GENES.items():
-            geneseq = geneseqs.get(gene)
-            if not geneseq:
-                continue
-            first_aa = geneseq['firstAA']
-            last_aa = geneseq['lastAA']
-            aligned_nas = geneseq['alignedNAs']
-            writer.writerow([seqheader, gene, first_aa, last_aa, aligned_nas])
+    for seq in iter_records(ctx, schema):
+        writer.writerows(sequence_rows(seq))
@@ -0,0 +1,166 @@
+import os
+import json
+import time
+import sqlite3
+import hashlib
+from typing import Optional, Dict, Any, List, Tuple
+from more_itertools import chunked
+
+from .schemacache import default_cache_dir
+
+DEFAULT_MAX_SIZE: int = 1 << 30
+
+
+def result_key(*parts: str) -> str:
+    """Hash the parts identifying an analysis result."""
+    sha256 = hashlib.sha256()
+    for part in parts:
+        sha256.update(part.encode('UTF-8'))
+        sha256.update(b'\0')
+    return sha256.hexdigest()
+
+
+class ResultCache:
+    """On-disk cache of analysis results in a SQLite database.
+
+    Results are keyed by ``result_key`` of the normalized input, the query
+    fragment, the endpoint URL and the server's versions; a server upgrade
+    therefore never serves an outdated result. When the cached results
+    take more than ``max_size`` bytes, the least recently used ones are
+    evicted. ``hits``, ``misses`` and ``evictions`` count the lookups and
+    evictions of this instance.
+    """
+    path: str
+    max_size: int
+    hits: int
+    misses: int
+    evictions: int
+    _db: Optional[sqlite3.Connection]
+    _size: int
+
+    def __init__(
+        self,
+        cache_dir: Optional[str] = None,
+        max_size: int = DEFAULT_MAX_SIZE
+    ):
+        self.path = os.path.join(
+            cache_dir or default_cache_dir(), 'results.sqlite3')
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._db = None
+        self._size = 0
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._db is None:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            db: sqlite3.Connection = sqlite3.connect(self.path, timeout=30)
+            # several processes (e.g. partitions) may share the cache
+            db.execute('PRAGMA journal_mode=WAL')
+            db.execute('PRAGMA synchronous=NORMAL')
+            db.execute(
+                'CREATE TABLE IF NOT EXISTS results ('
+                'key TEXT PRIMARY KEY, result TEXT NOT NULL, '
+                'size INTEGER NOT NULL, accessed INTEGER NOT NULL)')
+            db.execute(
+                'CREATE INDEX IF NOT EXISTS results_accessed '
+                'ON results (accessed)')
+            db.commit()
+            self._size = db.execute(
+                'SELECT COALESCE(SUM(size), 0) FROM results').fetchone()[0]
+            self._db = db
+        return self._db
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        result: Dict[str, Any]
+        try:
+            db: sqlite3.Connection = self._connect()
+            row: Optional[Any] = db.execute(
+                'SELECT result FROM results WHERE key = ?', (key,)
+            ).fetchone()
+            if row is not None:
+                with db:
+                    db.execute(
+                        'UPDATE results SET accessed = ? WHERE key = ?',
+                        (time.time_ns(), key))
+        except (OSError, sqlite3.Error):
+            # the cache is only an optimization
+            row = None
+        if row is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        result = json.loads(row[0])
+        return result
+
+    def put(self, key: str, result: Dict[str, Any]) -> None:
+        self.put_many([(key, result)])
+
+    def put_many(self, items: List[Tuple[str, Dict[str, Any]]]) -> None:
+        """Store results in a single transaction."""
+        key: str
+        result: Dict[str, Any]
+        rows: Dict[str, str] = {}
+        for key, result in items:
+            rows[key] = json.dumps(result)
+        if not rows:
+            return
+        accessed: int = time.time_ns()
+        try:
+            db: sqlite3.Connection = self._connect()
+            with db:
+                # replaced results no longer count toward the size
+                replaced: int = sum(
+                    db.execute(
+                        'SELECT COALESCE(SUM(size), 0) FROM results '
+                        'WHERE key IN ({})'.format(
+                            ', '.join('?' * len(partial))),
+                        partial
+                    ).fetchone()[0]
+                    for partial in chunked(list(rows), 500)
+                )
+                db.executemany(
+                    'INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?)',
+                    [(key, text, len(text), accessed)
+                     for key, text in rows.items()])
+            self._size += sum(len(text) for text in rows.values()) - replaced
+            if self._size > self.max_size:
+                self.evict()
+        except (OSError, sqlite3.Error):
+            pass
+
+    def evict(self) -> None:
+        """Evict the least recently used results down to 90% of max_size."""
+        key: str
+        size: int
+        freed: int = 0
+        keys: List[Tuple[str]] = []
+        db: sqlite3.Connection = self._connect()
+        with db:
+            # other processes may have added or evicted results
+            self._size = db.execute(
+                'SELECT COALESCE(SUM(size), 0) FROM results').fetchone()[0]
+            excess: int = self._size - self.max_size * 9 // 10
+            if excess <= 0:
+                return
+            for key, size in db.execute(
+                    'SELECT key, size FROM results ORDER BY accessed'):
+                if freed >= excess:
+                    break
+                keys.append((key,))
+                freed += size
+            db.executemany('DELETE FROM results WHERE key = ?', keys)
+        self._size -= freed
+        self.evictions += len(keys)
+
+    def stats(self) -> str:
+        lookups: int = self.hits + self.misses
+        return '{} hits, {} misses ({:.0%} hit rate), {} evicted'.format(
+            self.hits, self.misses,
+            self.hits / lookups if lookups else 0, self.evictions)
+
+    def close(self) -> None:
+        if self._db is not None:
+            self._db.close()
+            self._db = None
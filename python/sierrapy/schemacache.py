@@ -0,0 +1,62 @@
+import os
+import re
+import json
+import hashlib
+import tempfile
+from typing import Optional, Dict, Any
+
+
+def default_cache_dir() -> str:
+    cache_home: str = (
+        os.environ.get('XDG_CACHE_HOME') or
+        os.path.join(os.path.expanduser('~'), '.cache')
+    )
+    return os.environ.get(
+        'SIERRAPY_CACHE_DIR',
+        os.path.join(cache_home, 'sierrapy')
+    )
+
+
+class SchemaCache:
+    """On-disk cache of GraphQL introspection results.
+
+    Each entry is keyed by the endpoint URL and the server's
+    ``currentProgramVersion``, so a server upgrade invalidates the entry.
+    """
+    cache_dir: str
+
+    def __init__(self, cache_dir: Optional[str] = None):
+        self.cache_dir = os.path.join(
+            cache_dir or default_cache_dir(), 'schemas')
+
+    def path(self, url: str, version: str) -> str:
+        url_hash: str = hashlib.sha1(url.encode('UTF-8')).hexdigest()[:16]
+        version = re.sub(r'[^\w.-]+', '_', version)
+        return os.path.join(
+            self.cache_dir, '{}-{}.json'.format(url_hash, version))
+
+    def load(self, url: str, version: str) -> Optional[Dict[str, Any]]:
+        introspection: Dict[str, Any]
+        try:
+            with open(self.path(url, version)) as fp:
+                introspection = json.load(fp)
+        except (OSError, ValueError):
+            return None
+        return introspection
+
+    def save(
+        self,
+        url: str,
+        version: str,
+        introspection: Dict[str, Any]
+    ) -> None:
+        path: str = self.path(url, version)
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir)
+            with os.fdopen(fd, 'w') as fp:
+                json.dump(introspection, fp)
+            os.replace(tmp_path, path)
+        except OSError:
+            # the cache is only an optimization
+            pass
@@ -1,6 +1,13 @@
 # -*- coding: utf-8 -*-
 
 import json
+import time
+import random
+import logging
+import threading
+from functools import lru_cache
+from collections import deque, OrderedDict
+from concurrent.futures import ThreadPoolExecutor, Future
 from typing import (
     Optional,
     Dict,
@@ -10,35 +17,531 @@ from typing import (
     Sequence as ListOrTuple,
     Generator,
     Tuple,
-    Iterator
+    Iterator,
+    Iterable,
+    Callable,
+    Deque,
+    TypeVar,
+    Generic,
+    Hashable,
+    FrozenSet,
+    Type,
+    cast
 )
 from more_itertools import chunked
 
-from tqdm import tqdm  # type: ignore
+import requests  # type: ignore
+from requests.adapters import HTTPAdapter  # type: ignore
 from gql import gql, Client
 from gql.transport.requests import RequestsHTTPTransport
-from requests.exceptions import HTTPError  # type: ignore
+from gql.transport.exceptions import (
+    TransportProtocolError,
+    TransportQueryError,
+    TransportServerError
+)
+from requests.exceptions import (  # type: ignore
+    HTTPError,
+    ConnectionError as RequestsConnectionError,
+    Timeout
+)
+from graphql import (
+    ExecutionResult,
+    GraphQLSchema,
+    IntrospectionQuery,
+    build_client_schema,
+    get_introspection_query,
+    parse,
+    validate
+)
 from graphql.language.ast import DocumentNode as gqlDocument
 
 from .common_types import Sequence, SeqReads, ServerVer
+from .schemacache import SchemaCache
+from .resultcache import ResultCache, result_key
+from .progress import Progress
 
 
 VERSION = '0.4.3'
 DEFAULT_URL = 'https://hivdb.stanford.edu/graphql'
 
+T = TypeVar('T')
+
+LOGGER: logging.Logger = logging.getLogger(__name__)
+
+# default --dedup-window of the commands
+DEDUP_WINDOW: int = 1000
+POOL_SIZE: int = 10
+
+SEQUENCE_ANALYSIS_QUERY = """
+    query sierrapy($sequences:[UnalignedSequenceInput]!) {{
+        sequenceAnalysis(sequences:$sequences) {{
+            ...F0
+        }}
+    }}
+    fragment F0 on SequenceAnalysis {{
+        {query}
+    }}
+"""
+
+PATTERN_ANALYSIS_QUERY = """
+    query sierrapy(
+        $patterns:[[String]!]!
+        $patternNames:[String]
+        {extraparams}
+    ) {{
+        patternAnalysis(
+            patterns:$patterns
+            patternNames:$patternNames
+            {extraargs}
+        ) {{
+            ...F0
+        }}
+    }}
+    fragment F0 on MutationsAnalysis {{
+        {query}
+    }}
+"""
+
+SEQUENCE_READS_ANALYSIS_QUERY = """
+    query sierrapy($allSequenceReads:[SequenceReadsInput]!) {{
+        sequenceReadsAnalysis(
+            sequenceReads:$allSequenceReads
+        ) {{
+            ...F0
+        }}
+    }}
+    fragment F0 on SequenceReadsAnalysis {{
+        {query}
+    }}
+"""
+
+MUTATIONS_ANALYSIS_QUERY = """
+    query sierrapy($mutations:[String]!) {{
+        mutationsAnalysis(mutations:$mutations) {{
+            ...F0
+        }}
+    }}
+    fragment F0 on MutationsAnalysis {{
+        {query}
+    }}
+"""
+
+CURRENT_VERSION_QUERY = """
+    query sierrapy {
+        currentVersion { text, publishDate }
+        currentProgramVersion { text, publishDate }
+    }
+"""
+
+HIVALG_EXTRAPARAMS = (
+    '$algorithms:[ASIAlgorithm] '
+    '$customAlgorithms:[CustomASIAlgorithm]'
+)
+
+HIVALG_EXTRAARGS = (
+    'algorithms:$algorithms '
+    'customAlgorithms:$customAlgorithms'
+)
+
+QUERY_TEMPLATES: Dict[str, str] = {
+    'sequenceAnalysis': SEQUENCE_ANALYSIS_QUERY,
+    'patternAnalysis': PATTERN_ANALYSIS_QUERY,
+    'sequenceReadsAnalysis': SEQUENCE_READS_ANALYSIS_QUERY,
+    'mutationsAnalysis': MUTATIONS_ANALYSIS_QUERY,
+    'currentVersion': CURRENT_VERSION_QUERY
+}
+
+UNKNOWN_VERSION: ServerVer = {
+    'text': 'Unknown',
+    'publishDate': 'Unknown'
+}
+
 
 class ResponseError(Exception):
     pass
 
 
+# failures of a request which are raised once retries are exhausted
+TRANSPORT_ERRORS: Tuple[Type[Exception], ...] = (
+    TransportServerError,
+    TransportProtocolError,
+    RequestsConnectionError,
+    Timeout
+)
+
+
+class RetryPolicy:
+    """How to retry a request after a transient failure.
+
+    A request is retried when the connection fails, times out or the
+    server replies with one of ``statuses``. The n-th retry waits
+    ``backoff * 2 ** (n - 1)`` seconds (at most ``max_backoff``), shifted
+    randomly by up to ``jitter`` of the delay.
+    """
+    attempts: int
+    backoff: float
+    max_backoff: float
+    jitter: float
+    statuses: FrozenSet[int]
+
+    def __init__(
+        self,
+        attempts: int = 1,
+        backoff: float = 1.,
+        max_backoff: float = 60.,
+        jitter: float = .5,
+        statuses: Iterable[int] = (408, 429, 502, 503, 504)
+    ):
+        self.attempts = attempts
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.jitter = jitter
+        self.statuses = frozenset(statuses)
+
+    def is_transient(self, error: Exception) -> bool:
+        if isinstance(error, (RequestsConnectionError, Timeout)):
+            return True
+        if isinstance(error, TransportServerError):
+            return error.code in self.statuses
+        return False
+
+    def delay(self, retry: int) -> float:
+        delay: float = min(self.backoff * 2 ** (retry - 1), self.max_backoff)
+        return delay * (1 + random.uniform(-self.jitter, self.jitter))
+
+
+class AdaptiveBatching:
+    """Size batches by payload weight and tune them to a latency budget.
+
+    A batch is closed once the summed weight of its items (e.g.
+    nucleotides of the sequences) reaches ``target``. After each request
+    the observed throughput (weight per second) is used to move
+    ``target`` toward the weight that takes ``latency_budget`` seconds.
+    Until the first request completes, batches hold ``step`` items unless
+    ``initial_target`` is given.
+    """
+    latency_budget: float
+    target: Optional[float]
+    min_target: float
+    max_target: float
+    max_items: int
+    smoothing: float
+    _lock: threading.Lock
+
+    def __init__(
+        self,
+        latency_budget: float = 30.,
+        initial_target: Optional[float] = None,
+        min_target: float = 1.,
+        max_target: float = 5e7,
+        max_items: int = 1000,
+        smoothing: float = .5
+    ):
+        self.latency_budget = latency_budget
+        self.target = initial_target
+        self.min_target = min_target
+        self.max_target = max_target
+        self.max_items = max_items
+        self.smoothing = smoothing
+        self._lock = threading.Lock()
+
+    def batches(
+        self,
+        items: Iterable[T],
+        weigh: Callable[[T], float],
+        step: int
+    ) -> Generator[List[T], None, None]:
+        partial: List[T] = []
+        weight: float = 0.
+        for item in items:
+            partial.append(item)
+            weight += weigh(item)
+            if (
+                len(partial) >= self.max_items or
+                (self.target is None and len(partial) >= step) or
+                (self.target is not None and weight >= self.target)
+            ):
+                yield partial
+                partial = []
+                weight = 0.
+        if partial:
+            yield partial
+
+    def observe(self, weight: float, latency: float) -> None:
+        ideal: float = weight / max(latency, 1e-3) * self.latency_budget
+        with self._lock:
+            target: float = ideal
+            if self.target is not None:
+                target = (
+                    self.target * (1 - self.smoothing) +
+                    ideal * self.smoothing
+                )
+            self.target = min(max(target, self.min_target), self.max_target)
+
+
+def sequence_weight(sequence: Sequence) -> float:
+    return len(sequence['sequence'])
+
+
+def pattern_weight(pattern: Tuple[str, List[str]]) -> float:
+    return len(pattern[1]) + 1
+
+
+def normalize_sequence(sequence: str) -> str:
+    return ''.join(sequence.split()).upper()
+
+
+def with_header(result: Dict[str, Any], header: str) -> Dict[str, Any]:
+    """Return a result of the same sequence under another header."""
+    input_sequence: Any = result.get('inputSequence')
+    if isinstance(input_sequence, dict) and 'header' in input_sequence:
+        result = dict(result)
+        result['inputSequence'] = dict(input_sequence, header=header)
+    return result
+
+
+def sequence_key(sequence: Sequence) -> Hashable:
+    return normalize_sequence(sequence['sequence'])
+
+
+def sequence_rebind(
+    sequence: Sequence,
+    result: Dict[str, Any]
+) -> Dict[str, Any]:
+    return with_header(result, sequence['header'])
+
+
+def canonical_mutations(mutations: Iterable[str]) -> Tuple[str, ...]:
+    """Return a mutation set as a sorted tuple of distinct mutations."""
+    return tuple(sorted({
+        mut.strip() for mut in mutations if mut.strip()
+    }))
+
+
+def pattern_key(pattern: Tuple[str, List[str]]) -> Hashable:
+    return canonical_mutations(pattern[1])
+
+
+def pattern_rebind(
+    pattern: Tuple[str, List[str]],
+    result: Dict[str, Any]
+) -> Dict[str, Any]:
+    """Return a result of the same mutations under another pattern name."""
+    if 'name' in result:
+        result = dict(result, name=pattern[0])
+    return result
+
+
+def sequence_reads_weight(sequence_reads: SeqReads) -> float:
+    return sum(
+        len(pos_reads['allCodonReads'])
+        for pos_reads in sequence_reads['allReads']
+    ) + 1
+
+
+class Resolver(Generic[T]):
+    """How items are resolved without sending them to the server.
+
+    Items with the same ``key`` as one of the last ``window`` distinct
+    items are sent only once; ``rebind`` adapts the result to each
+    duplicate (e.g. its header). ``lookup`` returns a stored result of an
+    item, or None; the results of sent items are passed to ``store``, and
+    ``flush`` is called after the results of each batch are stored.
+    """
+    key: Optional[Callable[[T], Hashable]]
+    rebind: Callable[[T, Dict[str, Any]], Dict[str, Any]]
+    window: int
+    lookup: Optional[Callable[[T], Optional[Dict[str, Any]]]]
+    store: Optional[Callable[[T, Dict[str, Any]], None]]
+    flush: Optional[Callable[[], None]]
+
+    def __init__(
+        self,
+        key: Optional[Callable[[T], Hashable]] = None,
+        rebind: Callable[
+            [T, Dict[str, Any]], Dict[str, Any]
+        ] = lambda item, result: result,
+        window: int = 0,
+        lookup: Optional[Callable[[T], Optional[Dict[str, Any]]]] = None,
+        store: Optional[Callable[[T, Dict[str, Any]], None]] = None,
+        flush: Optional[Callable[[], None]] = None
+    ):
+        self.key = key if window > 0 else None
+        self.rebind = rebind
+        self.window = window
+        self.lookup = lookup
+        self.store = store
+        self.flush = flush
+
+    @property
+    def enabled(self) -> bool:
+        return self.key is not None or self.lookup is not None
+
+
+class FailedItem:
+    """An input item the server failed to analyze."""
+    item: Any
+    error: 'ResponseError'
+
+    def __init__(self, item: Any, error: 'ResponseError'):
+        self.item = item
+        self.error = error
+
+
+@lru_cache(maxsize=None)
+def build_document(
+    kind: str,
+    query: str = '',
+    extraparams: str = ''
+) -> gqlDocument:
+    """Parse the GraphQL document of an operation kind and a fragment.
+
+    Documents are cached, so a fragment is parsed only once per process
+    no matter how many batches are sent with it.
+    """
+    template: str = QUERY_TEMPLATES[kind]
+    if kind == 'currentVersion':
+        return gql(template)
+    return gql(template.format(
+        query=query,
+        extraparams=extraparams,
+        extraargs=HIVALG_EXTRAARGS if extraparams else ''
+    ))
+
+
+def validate_document(
+    schema: Optional[GraphQLSchema],
+    document: gqlDocument,
+    validated: Dict[int, gqlDocument]
+) -> None:
+    """Validate a document against the schema once.
+
+    ``validated`` maps ``id(document)`` to the document; the reference
+    keeps the id from being reused by another document.
+    """
+    if schema is None or id(document) in validated:
+        return
+    errors = validate(schema, document)
+    if errors:
+        raise errors[0]
+    validated[id(document)] = document
+
+
+def response_error(errors: List[Dict[str, Any]]) -> ResponseError:
+    messages: List[str] = [
+        e['exception']['detailMessage']
+        if 'detailMessage' in e['exception']
+        else 'Unknown server error'
+        for e in errors
+        if 'exception' in e]
+    return ResponseError(
+        'Sierra GraphQL webservice returned errors:\n - ' +
+        json.dumps(messages, indent=4))
+
+
+def server_error(error: TransportServerError) -> ResponseError:
+    """Convert an HTTP error response without GraphQL result.
+
+    Error responses with a GraphQL result are returned by the transport
+    as results with errors; other error responses (e.g. an HTML error
+    page) are raised as TransportServerError, caused by the HTTPError.
+    """
+    text: str = ''
+    cause: Optional[BaseException] = error.__cause__
+    if isinstance(cause, HTTPError) and cause.response is not None:
+        text = cause.response.text
+    LOGGER.debug('Error response: %s', text)
+    return ResponseError(
+        'Sierra GraphQL webservice returned {}: {}'.format(error, text[:500]))
+
+
+def pattern_analysis_variables(
+    patterns: ListOrTuple[List[str]],
+    pattern_names: ListOrTuple[Optional[str]],
+    **kw: Any
+) -> Tuple[str, Dict[str, Any]]:
+    enable_hivalg: bool = 'algorithms' in kw or 'custom_algorithms' in kw
+    extraparams: str = ''
+    if enable_hivalg:
+        extraparams = HIVALG_EXTRAPARAMS
+    variables: Dict[str, Any] = {
+        "patterns": patterns,
+        "patternNames": pattern_names
+    }
+    if enable_hivalg:
+        variables['algorithms'] = kw.get('algorithms')
+        variables['customAlgorithms'] = kw.get('custom_algorithms')
+    return extraparams, variables
+
+
 class SierraClient:
     url: str
+    schema_cache: Optional[SchemaCache]
+    result_cache: Optional[ResultCache]
+    fetch_schema: bool
     _client: Optional[Client]
+    _session: Optional[requests.Session]
+    _pool_size: int
+    _session_lock: threading.Lock
+    _local: threading.local
+    _schema_lock: threading.Lock
+    _schema_loaded: bool
+    _schema: Optional[GraphQLSchema]
+    _introspection: Optional[Dict[str, Any]]
+    _validated: Dict[int, gqlDocument]
+    _versions: Optional[Tuple[ServerVer, ServerVer]]
+    memo_size: int
+    _memo: 'OrderedDict[str, str]'
+    _memo_lock: threading.Lock
+    retry_policy: RetryPolicy
     _progress: bool
 
-    def __init__(self, url: str = DEFAULT_URL):
+    def __init__(
+        self,
+        url: str = DEFAULT_URL,
+        schema_cache: Optional[SchemaCache] = None,
+        fetch_schema: bool = True,
+        retry_policy: Optional[RetryPolicy] = None,
+        result_cache: Optional[ResultCache] = None,
+        memo_size: int = 0
+    ):
+        """Client of Sierra GraphQL webservice.
+
+        The schema is used to validate queries before they are sent. It is
+        fetched from the server on the first request, or loaded from
+        ``schema_cache`` if the cache has an entry of the server's current
+        program version. Set ``fetch_schema`` to False to skip the schema
+        entirely and let the server validate the queries.
+
+        Requests failed by transient errors are retried following
+        ``retry_policy``. By default they are not retried.
+
+        With ``result_cache``, sequence analysis results are cached and
+        only sequences without a cached result are sent to the server.
+
+        With ``memo_size``, mutations and pattern analysis results of the
+        last ``memo_size`` distinct mutation sets are kept in memory. With
+        ``result_cache``, they are also saved to the cache.
+        """
         self.url = url
+        self.schema_cache = schema_cache
+        self.fetch_schema = fetch_schema
         self._client = None
+        self._session = None
+        self._pool_size = POOL_SIZE
+        self._session_lock = threading.Lock()
+        self._local = threading.local()
+        self._schema_lock = threading.Lock()
+        self._schema_loaded = False
+        self._schema = None
+        self._introspection = None
+        self._validated = {}
+        self._versions = None
+        self.result_cache = result_cache
+        self.memo_size = memo_size
+        self._memo = OrderedDict()
+        self._memo_lock = threading.Lock()
+        self.retry_policy = retry_policy or RetryPolicy()
         self._progress = False
 
     def toggle_progress(self, flag: Union[bool, str] = 'auto') -> None:
@@ -49,41 +552,169 @@ class SierraClient:
 
     @property
     def client(self) -> Client:
+        """A gql client of the endpoint.
+
+        The client opens and closes its own connection on every request;
+        the analysis methods send their requests through ``session``
+        instead.
+        """
         if self._client is None:
             transport: RequestsHTTPTransport = \
                 RequestsHTTPTransport(self.url, use_json=True, timeout=300)
             transport.headers = {
                 'User-Agent': 'sierra-client (python)/{}'.format(VERSION)
             }
-            self._client = Client(
-                transport=transport,
-                fetch_schema_from_transport=True)
+            self._client = Client(transport=transport)
         return self._client
 
+    @property
+    def session(self) -> requests.Session:
+        """The HTTP session shared by all threads.
+
+        Its connection pool keeps the connections to the server open
+        between requests, so they are only set up once per client and
+        concurrent thread.
+        """
+        with self._session_lock:
+            if self._session is None:
+                self._session = requests.Session()
+                self._session.headers['User-Agent'] = \
+                    'sierra-client (python)/{}'.format(VERSION)
+                self._mount_adapter()
+            return self._session
+
+    def _mount_adapter(self) -> None:
+        assert self._session is not None
+        adapter: HTTPAdapter = HTTPAdapter(
+            pool_connections=1, pool_maxsize=self._pool_size)
+        self._session.mount('http://', adapter)
+        self._session.mount('https://', adapter)
+
+    def reserve_connections(self, count: int) -> None:
+        """Let the session pool keep at least count open connections."""
+        with self._session_lock:
+            if count <= self._pool_size:
+                return
+            self._pool_size = count
+            if self._session is not None:
+                self._mount_adapter()
+
+    @property
+    def transport(self) -> RequestsHTTPTransport:
+        """The gql transport of the current thread, on the shared session.
+
+        A transport records the headers of its last response, so each
+        thread gets its own.
+        """
+        session: requests.Session = self.session
+        transport: Optional[RequestsHTTPTransport] = \
+            getattr(self._local, 'transport', None)
+        if transport is None or transport.session is not session:
+            transport = RequestsHTTPTransport(
+                self.url, use_json=True, timeout=300)
+            transport.session = session  # type: ignore
+            self._local.transport = transport
+        return transport
+
+    def close(self) -> None:
+        """Close the connections of the session."""
+        with self._session_lock:
+            if self._session is not None:
+                self._session.close()
+                self._session = None
+
+    def __enter__(self) -> 'SierraClient':
+        return self
+
+    def __exit__(self, *args: Any) -> None:
+        self.close()
+
+    def _fetch_introspection(self) -> Dict[str, Any]:
+        introspection: Dict[str, Any] = self._execute(
+            parse(get_introspection_query()))
+        return introspection
+
+    def _load_schema(self) -> None:
+        if self._schema_loaded:
+            return
+        with self._schema_lock:
+            # another thread may have loaded it while we were waiting
+            if not self._schema_loaded:
+                if self.fetch_schema:
+                    self._load_introspection()
+                self._schema_loaded = True
+
+    def _load_introspection(self) -> None:
+        introspection: Optional[Dict[str, Any]] = None
+        version: str = ''
+        if self.schema_cache:
+            version = self.server_versions()[1]['text']
+            introspection = self.schema_cache.load(self.url, version)
+        if introspection is None:
+            introspection = self._fetch_introspection()
+            if self.schema_cache:
+                self.schema_cache.save(self.url, version, introspection)
+        self._introspection = introspection
+        self._schema = build_client_schema(
+            cast(IntrospectionQuery, introspection))
+
+    def _execute(
+        self,
+        document: gqlDocument,
+        variable_values: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
+        retry: int = 0
+        while True:
+            try:
+                result: ExecutionResult = self.transport.execute(
+                    document, variable_values=variable_values)
+                if result.errors:
+                    raise TransportQueryError(
+                        str(result.errors[0]),
+                        errors=result.errors,
+                        data=result.data)
+                assert result.data is not None
+                return result.data
+            except TransportQueryError as e:
+                raise response_error(e.errors or [])
+            except TransportServerError as e:
+                if self._should_retry(e, retry):
+                    retry += 1
+                    continue
+                if self.retry_policy.is_transient(e):
+                    raise
+                # a rejected request, e.g. by a record the server fails on
+                raise server_error(e)
+            except (RequestsConnectionError, Timeout) as e:
+                if self._should_retry(e, retry):
+                    retry += 1
+                    continue
+                raise
+
+    def _should_retry(self, error: Exception, retry: int) -> bool:
+        if (
+            retry + 1 >= self.retry_policy.attempts or
+            not self.retry_policy.is_transient(error)
+        ):
+            return False
+        time.sleep(self.retry_policy.delay(retry + 1))
+        return True
+
     def execute(
         self,
         document: gqlDocument,
         variable_values: Optional[Dict[str, Any]] = None
     ) -> Dict[str, Any]:
-        try:
-            result: Dict[str, Any] = self.client.execute(
-                document, variable_values=variable_values)
-            return result
-        except HTTPError as e:
-            print(e.response.text)
-            errors = [
-                e['exception']['detailMessage']
-                if 'detailMessage' in e['exception']
-                else 'Unknown server error'
-                for e in e.response.json()['errors']
-                if 'exception' in e]
-            raise ResponseError(
-                'Sierra GraphQL webservice returned errors:\n - ' +
-                json.dumps(errors, indent=4))
+        self._load_schema()
+        validate_document(self._schema, document, self._validated)
+        return self._execute(document, variable_values)
 
     def get_introspection(self) -> Dict[str, Any]:
-        result: Dict[str, Any] = self.client.introspection
-        return result
+        self._load_schema()
+        if self._introspection is None:
+            # schema fetching is disabled
+            return self._fetch_introspection()
+        return self._introspection
 
     def _sequence_analysis(
         self,
@@ -91,16 +722,7 @@ class SierraClient:
         query: str
     ) -> List[Dict[str, Any]]:
         result: Dict[str, Any] = self.execute(
-            gql("""
-                query sierrapy($sequences:[UnalignedSequenceInput]!) {{
-                    sequenceAnalysis(sequences:$sequences) {{
-                        ...F0
-                    }}
-                }}
-                fragment F0 on SequenceAnalysis {{
-                    {query}
-                }}
-                """.format(query=query)),
+            build_document('sequenceAnalysis', query),
             variable_values={"sequences": sequences})
         seqResults: List[Dict[str, Any]] = result['sequenceAnalysis']
         return seqResults
@@ -112,36 +734,12 @@ class SierraClient:
         query: str,
         **kw: Any
     ) -> List[Dict[str, Any]]:
-        enable_hivalg: bool = 'algorithms' in kw or 'customAlgorithms' in kw
-        extraparams: str = ''
-        if enable_hivalg:
-            extraparams = ('$algorithms:[ASIAlgorithm] '
-                           '$customAlgorithms:[CustomASIAlgorithm]')
-        variables: Dict[str, Any] = {
-            "patterns": patterns,
-            "patternNames": pattern_names
-        }
-        if enable_hivalg:
-            variables['algorithms'] = kw.get('algorithms')
-            variables['customAlgorithms'] = kw.get('custom_algorithms')
+        extraparams: str
+        variables: Dict[str, Any]
+        extraparams, variables = pattern_analysis_variables(
+            patterns, pattern_names, **kw)
         result: Dict[str, Any] = self.execute(
-            gql("""
-                query sierrapy(
-                    $patterns:[[String]!]!
-                    $patternNames:[String]
-                    {extraparams}
-                ) {{
-                    patternAnalysis(
-                        patterns:$patterns
-                        patternNames:$patternNames
-                    ) {{
-                        ...F0
-                    }}
-                }}
-                fragment F0 on MutationsAnalysis {{
-                    {query}
-                }}
-                """.format(query=query, extraparams=extraparams)),
+            build_document('patternAnalysis', query, extraparams),
             variable_values=variables)
         patternResults: List[Dict[str, Any]] = result['patternAnalysis']
         return patternResults
@@ -152,98 +750,479 @@ class SierraClient:
         query: str
     ) -> List[Dict[str, Any]]:
         result: Dict[str, Any] = self.execute(
-            gql("""
-                query sierrapy($allSequenceReads:[SequenceReadsInput]!) {{
-                    sequenceReadsAnalysis(
-                        sequenceReads:$allSequenceReads
-
-                    ) {{
-                        ...F0
-                    }}
-                }}
-                fragment F0 on SequenceReadsAnalysis {{
-                    {query}
-                }}
-                """.format(query=query)),
+            build_document('sequenceReadsAnalysis', query),
             variable_values={"allSequenceReads": all_sequence_reads})
         seqReadsResults: List[Dict[str, Any]] = result['sequenceReadsAnalysis']
         return seqReadsResults
 
+    def _analyze_isolating(
+        self,
+        analyze: Callable[[List[T]], List[Dict[str, Any]]],
+        partial: List[T]
+    ) -> List[Union[Dict[str, Any], FailedItem]]:
+        """Analyze a batch; isolate the items the server rejects.
+
+        When the batch is rejected, a request without any item is sent
+        first: if the server rejects it too, the error is not caused by an
+        item (e.g. an invalid query or a server failure) and is raised.
+        Otherwise the batch is bisected down to the rejected items.
+        """
+        try:
+            return list(analyze(partial))
+        except ResponseError as e:
+            error: ResponseError = e
+        # raises the error of a request without items
+        analyze([])
+        return self._bisect(analyze, partial, error)
+
+    def _bisect(
+        self,
+        analyze: Callable[[List[T]], List[Dict[str, Any]]],
+        partial: List[T],
+        error: ResponseError
+    ) -> List[Union[Dict[str, Any], FailedItem]]:
+        """Isolate the items of a rejected batch as FailedItems.
+
+        The halves of the batch are sent again recursively, down to the
+        single items rejected with their error.
+        """
+        half: List[T]
+        if len(partial) == 1:
+            return [FailedItem(partial[0], error)]
+        mid: int = len(partial) // 2
+        results: List[Union[Dict[str, Any], FailedItem]] = []
+        for half in (partial[:mid], partial[mid:]):
+            try:
+                results.extend(analyze(half))
+            except ResponseError as e:
+                results.extend(self._bisect(analyze, half, e))
+        return results
+
+    def _iter_batches(
+        self,
+        items: Iterable[T],
+        analyze: Callable[[List[T]], List[Dict[str, Any]]],
+        step: int,
+        max_in_flight: int,
+        on_error: Optional[Callable[[T, ResponseError], None]] = None,
+        batching: Optional[AdaptiveBatching] = None,
+        weigh: Optional[Callable[[T], float]] = None,
+        total: Optional[int] = None,
+        progress: Optional[Progress] = None,
+        resolver: Optional[Resolver[T]] = None,
+        on_batch: Optional[Callable[[], None]] = None
+    ) -> Generator[Dict[str, Any], None, None]:
+        """Send batches of items and yield the results in input order.
+
+        When max_in_flight is greater than 1, up to max_in_flight batches
+        are sent concurrently from a thread pool. Results of a batch are
+        yielded only after all the batches before it are yielded.
+
+        Without on_error, a batch rejected by the server raises
+        ResponseError. With on_error, the batch is bisected to isolate the
+        rejected items; on_error is called with each of them, in input
+        order, in place of yielding its result. An error rejecting every
+        item alike is raised even with on_error.
+
+        With batching, batches are sized by the summed weight of their
+        items instead of step.
+
+        Progress is reported to progress; without it, a progress bar is
+        shown if it is turned on by toggle_progress.
+
+        Duplicate or stored items are resolved by resolver instead of
+        being sent. on_batch is called once the results of a batch are
+        consumed.
+        """
+        partial: List[T]
+        batches: Iterator[List[T]]
+        if progress is None and self._progress:
+            progress = Progress(total)
+        if resolver is not None and resolver.enabled:
+            yield from self._iter_resolved(
+                items,
+                resolver,
+                lambda misses, failed: self._iter_batches(
+                    misses, analyze, step, max_in_flight, failed,
+                    batching, weigh, progress=progress,
+                    on_batch=resolver.flush),
+                on_error,
+                progress
+            )
+            return
+
+        def send(partial: List[T]) -> List[Any]:
+            results: List[Any]
+            weight: float
+            latency: float
+            started: float = time.monotonic()
+            if on_error is None:
+                results = analyze(partial)
+            else:
+                results = self._analyze_isolating(analyze, partial)
+            if weigh is not None and (
+                batching is not None or progress is not None
+            ):
+                weight = sum(weigh(item) for item in partial)
+                latency = time.monotonic() - started
+                if batching is not None:
+                    batching.observe(weight, latency)
+                if progress is not None:
+                    progress.observe(weight, latency)
+            return results
+
+        def outcomes(
+            results: List[Any]
+        ) -> Generator[Dict[str, Any], None, None]:
+            for result in results:
+                if isinstance(result, FailedItem):
+                    assert on_error is not None
+                    on_error(result.item, result.error)
+                else:
+                    yield result
+
+        if batching is not None and weigh is not None:
+            batches = batching.batches(items, weigh, step)
+        else:
+            batches = chunked(items, step)
+        if max_in_flight < 2:
+            for partial in batches:
+                yield from outcomes(send(partial))
+                if on_batch is not None:
+                    on_batch()
+                if progress is not None:
+                    progress.update(len(partial))
+            return
+
+        self._load_schema()
+        self.reserve_connections(max_in_flight)
+        in_flight: Deque[Tuple[int, Future]] = deque()
+        with ThreadPoolExecutor(max_workers=max_in_flight) as executor:
+            try:
+                for partial in batches:
+                    if len(in_flight) >= max_in_flight:
+                        size, future = in_flight.popleft()
+                        yield from outcomes(future.result())
+                        if on_batch is not None:
+                            on_batch()
+                        if progress is not None:
+                            progress.update(size)
+                    in_flight.append(
+                        (len(partial), executor.submit(send, partial))
+                    )
+                while in_flight:
+                    size, future = in_flight.popleft()
+                    yield from outcomes(future.result())
+                    if on_batch is not None:
+                        on_batch()
+                    if progress is not None:
+                        progress.update(size)
+            finally:
+                for _, future in in_flight:
+                    future.cancel()
+
+    def _iter_resolved(
+        self,
+        items: Iterable[T],
+        resolver: Resolver[T],
+        iterate: Callable[
+            [Iterator[T], Optional[Callable[[T, ResponseError], None]]],
+            Iterator[Dict[str, Any]]
+        ],
+        on_error: Optional[Callable[[T, ResponseError], None]],
+        progress: Optional[Progress],
+        max_pending: int = 10000
+    ) -> Generator[Dict[str, Any], None, None]:
+        """Yield the results of items in input order, sending only misses.
+
+        Items resolved by resolver are not sent; the others are sent by
+        ``iterate(misses, on_error)``. Once max_pending items are waiting
+        for the results of earlier ones, the batches in flight are
+        completed before reading more items.
+        """
+        result: Dict[str, Any]
+        source: Iterator[T] = iter(items)
+        # [item, result, error, is_local, original] of each item not
+        # yielded yet; a duplicate takes the outcome of its original
+        pending: Deque[List[Any]] = deque()
+        sent: Deque[List[Any]] = deque()
+        recent: 'OrderedDict[Hashable, List[Any]]' = OrderedDict()
+        exhausted: bool = False
+
+        def misses() -> Generator[T, None, None]:
+            nonlocal exhausted
+            item: T
+            key: Optional[Hashable]
+            found: Optional[Dict[str, Any]]
+            entry: List[Any]
+            for item in source:
+                key = None
+                if resolver.key is not None:
+                    key = resolver.key(item)
+                if key is not None and key in recent:
+                    recent.move_to_end(key)
+                    entry = [item, None, None, True, recent[key]]
+                else:
+                    found = None
+                    if resolver.lookup is not None:
+                        found = resolver.lookup(item)
+                    entry = [item, found, None, found is not None, None]
+                    if key is not None:
+                        recent[key] = entry
+                        if len(recent) > resolver.window:
+                            recent.popitem(last=False)
+                pending.append(entry)
+                if entry[1] is None and entry[4] is None:
+                    sent.append(entry)
+                    yield item
+                elif len(pending) >= max_pending:
+                    return
+            exhausted = True
+
+        def failed(item: T, error: ResponseError) -> None:
+            sent.popleft()[2] = error
+
+        def settled() -> Generator[Dict[str, Any], None, None]:
+            entry: List[Any]
+            local: int = 0
+            while pending:
+                entry = pending[0]
+                original: Optional[List[Any]] = entry[4]
+                if original is not None:
+                    # the original precedes its duplicates
+                    if original[1] is not None:
+                        entry[1] = resolver.rebind(entry[0], original[1])
+                    entry[2] = original[2]
+                    entry[4] = None
+                if entry[1] is None and entry[2] is None:
+                    break
+                pending.popleft()
+                local += entry[3]
+                if entry[2] is not None:
+                    assert on_error is not None
+                    on_error(entry[0], entry[2])
+                else:
+                    yield entry[1]
+            if progress is not None and local:
+                progress.update(local)
+
+        try:
+            while not exhausted:
+                for result in iterate(
+                    misses(), failed if on_error else None
+                ):
+                    entry: List[Any] = sent.popleft()
+                    entry[1] = result
+                    if resolver.store is not None:
+                        resolver.store(entry[0], result)
+                    yield from settled()
+                yield from settled()
+        finally:
+            if resolver.flush is not None:
+                # results of a batch not completely consumed
+                resolver.flush()
+
     def iter_sequence_analysis(
         self,
         sequences: Union[List[Sequence], Iterator[Sequence]],
         query: str,
-        step: int = 20
+        step: int = 20,
+        max_in_flight: int = 1,
+        on_error: Optional[Callable[[Sequence, ResponseError], None]] = None,
+        batching: Optional[AdaptiveBatching] = None,
+        progress: Optional[Progress] = None,
+        dedup_window: int = 0
     ) -> Generator[Dict[str, Any], None, None]:
-        pbar: Optional[tqdm] = None
-        if self._progress:
-            pbar = tqdm()
-        for partial in chunked(sequences, step):
-            yield from self._sequence_analysis(partial, query)
-            pbar and pbar.update(len(partial))
+        """Analyze sequences and yield the results in input order.
+
+        With dedup_window, a sequence identical to one of the last
+        dedup_window distinct sequences is not sent again; it gets the
+        result of the first one under its own header. Only the header is
+        rebound, so leave it off if the query selects other fields derived
+        from the input.
+        """
+        resolver: Resolver[Sequence] = Resolver(
+            sequence_key, sequence_rebind, dedup_window)
+        if self.result_cache is not None:
+            resolver.lookup, resolver.store, resolver.flush = \
+                self._sequence_result_cache(self.result_cache, query)
+        yield from self._iter_batches(
+            sequences,
+            lambda partial: self._sequence_analysis(partial, query),
+            step,
+            max_in_flight,
+            on_error,
+            batching,
+            sequence_weight,
+            total=len(sequences) if isinstance(sequences, list) else None,
+            progress=progress,
+            resolver=resolver
+        )
+
+    def _sequence_result_cache(
+        self,
+        cache: ResultCache,
+        query: str
+    ) -> Tuple[
+        Callable[[Sequence], Optional[Dict[str, Any]]],
+        Callable[[Sequence, Dict[str, Any]], None],
+        Callable[[], None]
+    ]:
+        """Return lookup, store and flush functions of cached results.
+
+        Results are keyed by the normalized sequence, so a result cached
+        under another header is returned with the header of the input.
+        Stored results are saved by flush in a single transaction.
+        """
+        algv, progv = self.server_versions()
+        stored: List[Tuple[str, Dict[str, Any]]] = []
+
+        def key(sequence: Sequence) -> str:
+            return result_key(
+                'sequenceAnalysis', self.url, algv['text'], progv['text'],
+                query, normalize_sequence(sequence['sequence']))
+
+        def lookup(sequence: Sequence) -> Optional[Dict[str, Any]]:
+            result: Optional[Dict[str, Any]] = cache.get(key(sequence))
+            if result is None:
+                return None
+            return sequence_rebind(sequence, result)
+
+        def store(sequence: Sequence, result: Dict[str, Any]) -> None:
+            stored.append((key(sequence), result))
+
+        def flush() -> None:
+            cache.put_many(stored)
+            stored.clear()
+
+        return lookup, store, flush
 
     def iter_pattern_analysis(
         self,
         patterns: Iterator[Tuple[str, List[str]]],
         query: str,
         step: int = 20,
+        max_in_flight: int = 1,
+        on_error: Optional[
+            Callable[[Tuple[str, List[str]], ResponseError], None]
+        ] = None,
+        batching: Optional[AdaptiveBatching] = None,
+        progress: Optional[Progress] = None,
+        dedup_window: int = 0,
         **kw: Any
     ) -> Generator[Dict[str, Any], None, None]:
-        pbar: Optional[tqdm] = None
-        pats: Tuple[List[str], ...]
-        pat_names: Tuple[str, ...]
-        if self._progress:
-            pbar = tqdm()
-        for partial in chunked(patterns, step):
-            pat_names, pats = tuple(zip(*partial))
-            yield from self._pattern_analysis(
-                pats, pat_names, query, **kw
-            )
-            pbar and pbar.update(step)
+        """Analyze patterns and yield the results in input order.
+
+        With dedup_window, a pattern with the same mutations as one of the
+        last dedup_window distinct patterns is not sent again; it gets the
+        result of the first one under its own name. Results of mutation
+        sets analyzed before with the same query and algorithms are not
+        sent either.
+        """
+        stored: List[Tuple[str, Dict[str, Any]]] = []
+
+        def analyze(
+            partial: List[Tuple[str, List[str]]]
+        ) -> List[Dict[str, Any]]:
+            # also without patterns, the request probing the server
+            pats: List[List[str]] = [pat for _, pat in partial]
+            pat_names: List[str] = [name for name, _ in partial]
+            return self._pattern_analysis(pats, pat_names, query, **kw)
+
+        def key(pattern: Tuple[str, List[str]]) -> str:
+            return self._memo_key(
+                'patternAnalysis', query, pattern[1],
+                json.dumps([
+                    kw.get('algorithms'), kw.get('custom_algorithms')
+                ], sort_keys=True))
+
+        def lookup(
+            pattern: Tuple[str, List[str]]
+        ) -> Optional[Dict[str, Any]]:
+            result: Optional[Dict[str, Any]] = self._memo_get(key(pattern))
+            if result is None:
+                return None
+            return pattern_rebind(pattern, result)
+
+        def store(
+            pattern: Tuple[str, List[str]],
+            result: Dict[str, Any]
+        ) -> None:
+            memo_key: str = key(pattern)
+            self._memo_put(memo_key, result, persist=False)
+            stored.append((memo_key, result))
+
+        def flush() -> None:
+            if self.result_cache is not None:
+                self.result_cache.put_many(stored)
+            stored.clear()
+
+        resolver: Resolver[Tuple[str, List[str]]] = Resolver(
+            pattern_key, pattern_rebind, dedup_window)
+        if self._memoizing:
+            resolver.lookup, resolver.store, resolver.flush = \
+                lookup, store, flush
+        yield from self._iter_batches(
+            patterns, analyze, step, max_in_flight, on_error,
+            batching, pattern_weight, progress=progress, resolver=resolver)
 
     def iter_sequence_reads_analysis(
         self,
-        sequence_reads: List[SeqReads],
+        sequence_reads: Union[List[SeqReads], Iterator[SeqReads]],
         query: str,
-        step: int = 20
+        step: int = 20,
+        max_in_flight: int = 1,
+        on_error: Optional[Callable[[SeqReads, ResponseError], None]] = None,
+        batching: Optional[AdaptiveBatching] = None,
+        progress: Optional[Progress] = None
     ) -> Generator[Dict[str, Any], None, None]:
-        pbar: Optional[tqdm]
-        if self._progress:
-            pbar = tqdm(total=len(sequence_reads))
-        while sequence_reads:
-            yield from self._sequence_reads_analysis(
-                sequence_reads[:step], query
-            )
-            sequence_reads = sequence_reads[step:]
-            pbar and pbar.update(step)
+        yield from self._iter_batches(
+            sequence_reads,
+            lambda partial: self._sequence_reads_analysis(partial, query),
+            step,
+            max_in_flight,
+            on_error,
+            batching,
+            sequence_reads_weight,
+            total=(
+                len(sequence_reads)
+                if isinstance(sequence_reads, list) else None
+            ),
+            progress=progress
+        )
 
     def sequence_analysis(
         self,
         sequences: List[Sequence],
         query: str,
-        step: int = 20
+        step: int = 20,
+        max_in_flight: int = 1
     ) -> List[Dict[str, Any]]:
-        return list(self.iter_sequence_analysis(sequences, query, step))
+        return list(self.iter_sequence_analysis(
+            sequences, query, step, max_in_flight
+        ))
 
     def pattern_analysis(
         self,
         patterns: Iterator[Tuple[str, List[str]]],
         query: str,
         step: int = 20,
+        max_in_flight: int = 1,
         **kw: Any
     ) -> List[Dict[str, Any]]:
         return list(self.iter_pattern_analysis(
-            patterns, query, step, **kw
+            patterns, query, step, max_in_flight, **kw
         ))
 
     def sequence_reads_analysis(
         self,
         sequence_reads: List[SeqReads],
         query: str,
-        step: int = 20
+        step: int = 20,
+        max_in_flight: int = 1
     ) -> List[Dict[str, Any]]:
         return list(self.iter_sequence_reads_analysis(
-            sequence_reads, query, step
+            sequence_reads, query, step, max_in_flight
         ))
 
     def mutations_analysis(
@@ -251,31 +1230,101 @@ class SierraClient:
         mutations: List[str],
         query: str
     ) -> Dict[str, Any]:
+        key: str = ''
+        if self._memoizing:
+            key = self._memo_key('mutationsAnalysis', query, mutations)
+            memoized: Optional[Dict[str, Any]] = self._memo_get(key)
+            if memoized is not None:
+                return memoized
         result: Dict[str, Any] = self.execute(
-            gql("""
-                query sierrapy($mutations:[String]!) {{
-                    mutationsAnalysis(mutations:$mutations) {{
-                        ...F0
-                    }}
-                }}
-                fragment F0 on MutationsAnalysis {{
-                    {query}
-                }}
-                """.format(query=query)),
+            build_document('mutationsAnalysis', query),
             variable_values={"mutations": mutations})
         mutResults: Dict[str, Any] = result['mutationsAnalysis']
+        if self._memoizing:
+            self._memo_put(key, mutResults)
         return mutResults
 
+    @property
+    def _memoizing(self) -> bool:
+        return self.memo_size > 0 or self.result_cache is not None
+
+    def _memo_key(
+        self,
+        kind: str,
+        query: str,
+        mutations: Iterable[str],
+        params: str = ''
+    ) -> str:
+        """Return the memo key of the result of a mutation set.
+
+        Server versions are part of the key only when results are also
+        saved to the result cache.
+        """
+        versions: Tuple[str, str] = ('', '')
+        if self.result_cache is not None:
+            algv, progv = self.server_versions()
+            versions = (algv['text'], progv['text'])
+        return result_key(
+            kind, self.url, *versions, query, params,
+            *canonical_mutations(mutations))
+
+    def _memo_get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Return a copy of a memoized result, or None."""
+        text: Optional[str]
+        result: Optional[Dict[str, Any]] = None
+        with self._memo_lock:
+            text = self._memo.get(key)
+            if text is not None:
+                self._memo.move_to_end(key)
+        if text is not None:
+            result = json.loads(text)
+        elif self.result_cache is not None:
+            result = self.result_cache.get(key)
+            if result is not None:
+                self._memo_put(key, result, persist=False)
+        return result
+
+    def _memo_put(
+        self,
+        key: str,
+        result: Dict[str, Any],
+        persist: bool = True
+    ) -> None:
+        if self.memo_size > 0:
+            with self._memo_lock:
+                self._memo[key] = json.dumps(result)
+                self._memo.move_to_end(key)
+                if len(self._memo) > self.memo_size:
+                    self._memo.popitem(last=False)
+        if persist and self.result_cache is not None:
+            self.result_cache.put(key, result)
+
+    def server_versions(self) -> Tuple[ServerVer, ServerVer]:
+        """Return current_version(), requested once per client."""
+        if self._versions is None:
+            self._versions = self.current_version()
+        return self._versions
+
+    def refresh_versions(self) -> Tuple[ServerVer, ServerVer]:
+        """Request the server versions again, e.g. in a long-running client.
+
+        If the server was upgraded, its schema is loaded again before the
+        next request and the memoized results are dropped.
+        """
+        versions: Tuple[ServerVer, ServerVer] = self.current_version()
+        if self._versions is not None and versions != self._versions:
+            with self._schema_lock:
+                self._schema_loaded = False
+                self._schema = None
+                self._introspection = None
+                self._validated = {}
+            with self._memo_lock:
+                self._memo.clear()
+        self._versions = versions
+        return versions
+
     def current_version(self) -> Tuple[ServerVer, ServerVer]:
-        result = self.execute(
-            gql("""
-                query sierrapy {
-                    currentVersion { text, publishDate }
-                    currentProgramVersion { text, publishDate }
-                }
-                """))
+        # not validated; the schema cache is keyed by this result
+        result = self._execute(build_document('currentVersion'))
         return (result['currentVersion'],
-                result.get('currentProgramVersion', {
-                    'text': 'Unknown',
-                    'publishDate': 'Unknown'
-                }))
+                result.get('currentProgramVersion', UNKNOWN_VERSION))
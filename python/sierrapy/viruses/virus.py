@@ -1,6 +1,10 @@
+import bisect
 from typing import List, Set, Dict, Tuple, Optional
 from ..common_types import GeneDef, TargetGeneDef
 
+# at most this many distinct gene labels are remembered
+SYNONYM_CACHE_SIZE: int = 10000
+
 
 class Virus:
     virus_name: str
@@ -11,6 +15,10 @@ class Virus:
     source_genes: Set[str]
     ordered_genes: List[str]
     default_queries: Dict[str, str]
+    _gene_indexes: Dict[str, int]
+    _synonyms: Dict[str, Optional[str]]
+    _target_genes: Dict[str, List[TargetGeneDef]]
+    _target_starts: Dict[str, List[int]]
 
     def __init__(
         self,
@@ -32,14 +40,49 @@ class Virus:
         }
         self.ordered_genes = [gdef['name'] for gdef in gene_defs]
         self.default_queries = default_queries
+        self._gene_indexes = {}
+        for idx, gene in enumerate(self.ordered_genes):
+            self._gene_indexes.setdefault(gene, idx)
+        self._synonyms = {}
+        self._target_genes = {}
+        self._target_starts = {}
+        for gene in self.source_genes:
+            self._index_target_genes(gene)
+
+    def _index_target_genes(self, gene: str) -> None:
+        """Sort the target genes of a source gene by range for bisect."""
+        target_genes: List[TargetGeneDef] = sorted(
+            self.gene_defs[gene]['target_genes'],
+            key=lambda target_gene: target_gene['range'][0])
+        for prev, target_gene in zip(target_genes, target_genes[1:]):
+            if prev['range'][1] >= target_gene['range'][0]:
+                raise ValueError(
+                    'Overlapping target genes of {}: {} and {}'.format(
+                        gene, prev['name'], target_gene['name']))
+        self._target_genes[gene] = target_genes
+        self._target_starts[gene] = [
+            target_gene['range'][0] for target_gene in target_genes]
 
     def get_default_query(self, command: str) -> str:
         return self.default_queries[command]
 
     def gene_index(self, gene: str) -> int:
-        return self.ordered_genes.index(gene)
+        try:
+            return self._gene_indexes[gene]
+        except KeyError:
+            raise ValueError('{!r} is not in list'.format(gene))
 
     def synonym_to_gene_name(self, gene: str) -> Optional[str]:
+        name: Optional[str]
+        try:
+            return self._synonyms[gene]
+        except KeyError:
+            name = self._match_synonym(gene)
+        if len(self._synonyms) < SYNONYM_CACHE_SIZE:
+            self._synonyms[gene] = name
+        return name
+
+    def _match_synonym(self, gene: str) -> Optional[str]:
         if gene in self.gene_defs:
             return gene
 
@@ -58,15 +101,14 @@ class Virus:
         pos_end: int
         pos_offset: int
         if gene in self.source_genes:
-            for target_gene in self.gene_defs[gene]['target_genes']:
-                pos_start, pos_end = target_gene['range']
-                pos_offset = target_gene['offset']
-                if pos < pos_start:
-                    continue
-                elif pos > pos_end:
-                    continue
-                return target_gene['name'], pos + 1 - pos_start + pos_offset
-            else:
+            idx: int = bisect.bisect_right(self._target_starts[gene], pos) - 1
+            if idx < 0:
+                return None, None
+            target_gene = self._target_genes[gene][idx]
+            pos_start, pos_end = target_gene['range']
+            pos_offset = target_gene['offset']
+            if pos > pos_end:
                 return None, None
+            return target_gene['name'], pos + 1 - pos_start + pos_offset
         else:
             return gene, pos
@@ -0,0 +1,171 @@
+import asyncio
+from typing import Any, Dict, List, Optional
+
+import pytest
+from graphql import GraphQLSchema, build_schema, graphql_sync
+
+from sierrapy.asyncclient import AsyncSierraClient
+from sierrapy.common_types import Sequence
+from sierrapy.sierraclient import build_document
+
+pytest.importorskip('aiohttp')
+web = pytest.importorskip('aiohttp.web')
+
+SCHEMA: GraphQLSchema = build_schema('''
+    type Query {
+        sequenceAnalysis(
+            sequences: [UnalignedSequenceInput]!
+        ): [SequenceAnalysis]
+        currentVersion: Version
+        currentProgramVersion: Version
+    }
+    input UnalignedSequenceInput {
+        header: String
+        sequence: String
+    }
+    type SequenceAnalysis {
+        inputSequence: InputSequence
+    }
+    type InputSequence {
+        header: String
+    }
+    type Version {
+        text: String
+        publishDate: String
+    }
+''')
+QUERY: str = 'inputSequence { header }'
+
+
+class Server:
+    """A GraphQL server of SCHEMA counting concurrent requests."""
+    url: str
+    failing: bool
+    running: int
+    max_running: int
+    requests: int
+    _runner: Any
+
+    def __init__(self) -> None:
+        self.url = ''
+        self.failing = False
+        self.running = 0
+        self.max_running = 0
+        self.requests = 0
+
+    async def handle(self, request: Any) -> Any:
+        body: Dict[str, Any] = await request.json()
+        variables: Dict[str, Any] = body.get('variables') or {}
+        sequences: List[Sequence] = variables.get('sequences') or []
+        if self.failing:
+            return web.Response(status=500, text='<html>down</html>')
+        self.requests += 1
+        self.running += 1
+        self.max_running = max(self.max_running, self.running)
+        try:
+            # later batches are answered first
+            await asyncio.sleep(
+                .05 / (1 + sum(int(seq['header'][1:]) for seq in sequences)))
+            await asyncio.sleep(.02)
+        finally:
+            self.running -= 1
+        result: Any = graphql_sync(
+            SCHEMA, body['query'], variable_values=variables,
+            root_value={
+                'sequenceAnalysis': lambda info, sequences: [
+                    {'inputSequence': {'header': seq['header']}}
+                    for seq in sequences],
+                'currentVersion': {'text': '1.0', 'publishDate': ''},
+                'currentProgramVersion': {'text': '1.0', 'publishDate': ''}
+            })
+        return web.json_response(result.formatted)
+
+    async def start(self) -> None:
+        app: Any = web.Application()
+        app.router.add_post('/graphql', self.handle)
+        self._runner = web.AppRunner(app)
+        await self._runner.setup()
+        site: Any = web.TCPSite(self._runner, '127.0.0.1', 0)
+        await site.start()
+        port: int = self._runner.addresses[0][1]
+        self.url = 'http://127.0.0.1:{}/graphql'.format(port)
+
+    async def stop(self) -> None:
+        await self._runner.cleanup()
+
+
+def make_sequences(count: int) -> List[Sequence]:
+    return [
+        {'header': 's{}'.format(idx), 'sequence': 'ACGT'}
+        for idx in range(count)]
+
+
+async def analyze(
+    client: AsyncSierraClient,
+    count: int,
+    step: int,
+    max_in_flight: int
+) -> List[str]:
+    return [
+        result['inputSequence']['header']
+        async for result in client.iter_sequence_analysis(
+            make_sequences(count), QUERY, step, max_in_flight)]
+
+
+def test_results_in_input_order() -> None:
+    async def run() -> List[str]:
+        server: Server = Server()
+        await server.start()
+        try:
+            async with AsyncSierraClient(server.url) as client:
+                return await analyze(client, 30, 3, 5)
+        finally:
+            await server.stop()
+
+    assert asyncio.run(run()) == ['s{}'.format(idx) for idx in range(30)]
+
+
+def test_concurrency_limit() -> None:
+    async def run() -> Server:
+        server: Server = Server()
+        await server.start()
+        try:
+            async with AsyncSierraClient(
+                server.url, max_concurrency=3
+            ) as client:
+                # several iterations share the limit of the client
+                await asyncio.gather(*[
+                    analyze(client, 12, 1, 12) for _ in range(3)])
+        finally:
+            await server.stop()
+        return server
+
+    server: Server = asyncio.run(run())
+    assert server.max_running == 3
+    # the schema introspection and 3 x 12 batches
+    assert server.requests == 37
+
+
+def test_schema_loaded_after_failed_connect() -> None:
+    async def run() -> Optional[str]:
+        error: Optional[str] = None
+        server: Server = Server()
+        await server.start()
+        client: AsyncSierraClient = AsyncSierraClient(server.url)
+        try:
+            server.failing = True
+            with pytest.raises(Exception) as e:
+                await analyze(client, 1, 1, 1)
+            error = str(e.value)
+            server.failing = False
+            # the query is validated by the schema loaded now
+            with pytest.raises(Exception, match='nosuchfield'):
+                await client.execute(
+                    build_document('sequenceAnalysis', 'nosuchfield'))
+            assert await analyze(client, 2, 1, 1) == ['s0', 's1']
+        finally:
+            await client.close()
+            await server.stop()
+        return error
+
+    assert '500' in (asyncio.run(run()) or '')
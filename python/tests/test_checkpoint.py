@@ -0,0 +1,118 @@
+import json
+from typing import Any, Dict, Iterator, List, Optional
+
+import pytest
+
+from sierrapy.checkpoint import Checkpoint, CheckpointError, PositionTracker
+from sierrapy.commands.fasta import iter_fasta_records
+from sierrapy.commands.sharding import dump_shards
+
+
+def write_fasta(path: str, names: List[str]) -> None:
+    with open(path, 'w') as fp:
+        for name in names:
+            fp.write('>{}\nACGT\nACGT\n'.format(name))
+
+
+def test_last_round_trip(tmp_path: Any) -> None:
+    checkpoint: Checkpoint = Checkpoint(str(tmp_path / 'out.json'), ['a'])
+    assert checkpoint.last() is None
+    checkpoint.start()
+    assert checkpoint.last() is None
+    checkpoint.record(0, 10, (0, 100))
+    checkpoint.record(1, 20, (1, 50))
+    assert checkpoint.last() == {
+        'shard': 1, 'count': 20, 'position': [1, 50]}
+
+
+def test_start_discards_previous_journal(tmp_path: Any) -> None:
+    checkpoint: Checkpoint = Checkpoint(str(tmp_path / 'out.json'), ['a'])
+    checkpoint.start()
+    checkpoint.record(0, 10, (0, 100))
+    checkpoint.start()
+    assert checkpoint.last() is None
+
+
+def test_last_ignores_incomplete_line(tmp_path: Any) -> None:
+    checkpoint: Checkpoint = Checkpoint(str(tmp_path / 'out.json'), ['a'])
+    checkpoint.start()
+    checkpoint.record(0, 10, (0, 100))
+    with open(checkpoint.path, 'a') as fp:
+        fp.write('{"shard": 1, "cou')
+    assert checkpoint.last() == {
+        'shard': 0, 'count': 10, 'position': [0, 100]}
+
+
+def test_last_rejects_other_inputs(tmp_path: Any) -> None:
+    Checkpoint(str(tmp_path / 'out.json'), ['a']).start()
+    with pytest.raises(CheckpointError):
+        Checkpoint(str(tmp_path / 'out.json'), ['a', 'b']).last()
+
+
+def test_tracker_follows_consumed_results() -> None:
+    tracker: PositionTracker = PositionTracker(5)
+    items: Iterator[str] = tracker.track(
+        [('a', (0, 10)), ('b', (0, 20)), ('c', (1, 5))])
+    results: Iterator[str] = tracker.follow(items)
+    assert next(results) == 'a'
+    assert (tracker.position, tracker.count) == ((0, 10), 6)
+    assert list(results) == ['b', 'c']
+    assert (tracker.position, tracker.count) == ((1, 5), 8)
+
+
+class Interrupted(Exception):
+    pass
+
+
+def interrupt(
+    records: Iterator[Dict[str, Any]],
+    limit: int
+) -> Iterator[Dict[str, Any]]:
+    for _, record in zip(range(limit), records):
+        yield record
+    raise Interrupted()
+
+
+def dump(
+    paths: List[str],
+    output: str,
+    checkpoint: Checkpoint,
+    last: Optional[Dict[str, Any]] = None,
+    limit: Optional[int] = None
+) -> None:
+    tracker: PositionTracker = PositionTracker(last['count'] if last else 0)
+    records: Iterator[Dict[str, Any]] = (
+        dict(seq) for seq in tracker.track(iter_fasta_records(
+            paths,
+            (last['position'][0], last['position'][1]) if last else (0, 0))
+        ))
+    if limit is not None:
+        records = interrupt(records, limit)
+    dump_shards(
+        records, output, 3, last['shard'] + 1 if last else 0,
+        True, True, checkpoint, tracker)
+
+
+def test_resume_writes_remaining_records(tmp_path: Any) -> None:
+    paths: List[str] = [str(tmp_path / 'a.fasta'), str(tmp_path / 'b.fasta')]
+    write_fasta(paths[0], ['a{}'.format(i) for i in range(5)])
+    write_fasta(paths[1], ['b{}'.format(i) for i in range(6)])
+    output: str = str(tmp_path / 'out.jsonl')
+    checkpoint: Checkpoint = Checkpoint(output, paths)
+    checkpoint.start()
+    # interrupted in the middle of the third shard
+    with pytest.raises(Interrupted):
+        dump(paths, output, checkpoint, limit=8)
+    assert not (tmp_path / 'out.2.jsonl').exists()
+    last: Optional[Dict[str, Any]] = checkpoint.last()
+    assert last == {'shard': 1, 'count': 6, 'position': [1, 14]}
+    dump(paths, output, checkpoint, last)
+    headers: List[str] = []
+    for idx in range(4):
+        with open(str(tmp_path / 'out.{}.jsonl'.format(idx))) as fp:
+            headers.extend(json.loads(line)['header'] for line in fp)
+    assert headers == (
+        ['a{}'.format(i) for i in range(5)] +
+        ['b{}'.format(i) for i in range(6)])
+    assert checkpoint.last() == {
+        'shard': 3, 'count': 11, 'position': [1, 84]}
@@ -0,0 +1,111 @@
+import os
+from typing import Any, List, Optional
+
+from sierrapy import viruses
+from sierrapy.codfreqcache import CodfreqCache, ParsedCodfreq
+from sierrapy.common_types import PosReads, SeqReads, UntransRegion
+from sierrapy.commands.seqreads import parse_seqreads, parse_seqreads_cached
+
+ALL_READS: List[PosReads] = [{
+    'gene': 'PR',
+    'position': 1,
+    'totalReads': 1000,
+    'allCodonReads': [
+        {'codon': 'AAA', 'reads': 568}, {'codon': 'AAG', 'reads': 292}]
+}, {
+    'gene': 'RT',
+    'position': 103,
+    'totalReads': 30,
+    'allCodonReads': []
+}, {
+    'gene': 'RT',
+    'position': 184,
+    'totalReads': 5000000000,
+    'allCodonReads': [{'codon': 'ATG', 'reads': 5000000000}]
+}]
+UNTRANS_REGIONS: List[UntransRegion] = [{
+    'name': 'PRE', 'refStart': 1, 'refEnd': 10, 'consensus': 'ACGT'}]
+
+CODFREQ: str = (
+    'gene,position,totalreads,codon,reads\n'
+    'PR,1,1000,AAA,568\n'
+    'PR,1,1000,aag,292\n'
+    'RT,184,900,ATG,890\n'
+    'RT,184,900,GTG,10\n'
+)
+
+
+def write(path: str, text: str) -> os.stat_result:
+    with open(path, 'w') as fp:
+        fp.write(text)
+    return os.stat(path)
+
+
+def test_round_trip(tmp_path: Any) -> None:
+    path: str = str(tmp_path / 'a.codfreq')
+    stat: os.stat_result = write(path, CODFREQ)
+    cache: CodfreqCache = CodfreqCache(str(tmp_path / 'cache'))
+    assert cache.load(path, 'HIV1', stat) is None
+    cache.save(path, 'HIV1', stat, ALL_READS, UNTRANS_REGIONS)
+    assert cache.load(path, 'HIV1', stat) == (ALL_READS, UNTRANS_REGIONS)
+    assert cache.load(path, 'HIV2', stat) is None
+
+
+def test_changed_file_is_not_loaded(tmp_path: Any) -> None:
+    path: str = str(tmp_path / 'a.codfreq')
+    stat: os.stat_result = write(path, CODFREQ)
+    cache: CodfreqCache = CodfreqCache(str(tmp_path / 'cache'))
+    cache.save(path, 'HIV1', stat, ALL_READS, UNTRANS_REGIONS)
+    # same size, other modification time
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+    assert cache.load(path, 'HIV1', os.stat(path)) is None
+    stat = write(path, CODFREQ + 'RT,1,1,AAA,1\n')
+    assert cache.load(path, 'HIV1', stat) is None
+
+
+def test_corrupt_entry_is_not_loaded(tmp_path: Any) -> None:
+    path: str = str(tmp_path / 'a.codfreq')
+    stat: os.stat_result = write(path, CODFREQ)
+    cache: CodfreqCache = CodfreqCache(str(tmp_path / 'cache'))
+    cache.save(path, 'HIV1', stat, ALL_READS, UNTRANS_REGIONS)
+    entry: str = cache.path(path, 'HIV1')
+    with open(entry, 'r+b') as fp:
+        fp.truncate(os.path.getsize(entry) - 4)
+    assert cache.load(path, 'HIV1', stat) is None
+
+
+def test_reads_beyond_64_bits_are_not_saved(tmp_path: Any) -> None:
+    path: str = str(tmp_path / 'a.codfreq')
+    stat: os.stat_result = write(path, CODFREQ)
+    cache: CodfreqCache = CodfreqCache(str(tmp_path / 'cache'))
+    huge: List[PosReads] = [{
+        'gene': 'PR', 'position': 1, 'totalReads': 1 << 64,
+        'allCodonReads': []
+    }]
+    cache.save(path, 'HIV1', stat, huge, [])
+    assert cache.load(path, 'HIV1', stat) is None
+
+
+def test_parse_seqreads_cached(tmp_path: Any) -> None:
+    calls: List[str] = []
+    path: str = str(tmp_path / 'a.codfreq')
+    write(path, CODFREQ)
+    cache: CodfreqCache = CodfreqCache(str(tmp_path / 'cache'))
+
+    def parse(filename: str, *args: Any) -> SeqReads:
+        calls.append(filename)
+        return parse_seqreads(filename, *args)
+
+    expected: SeqReads = parse_seqreads(path, viruses.HIV1, .1, .0005, 5, 1)
+    for cutoffs in [(.1, .0005, 5, 1), (.2, .005, 1, 10)]:
+        payload: SeqReads = parse_seqreads_cached(
+            parse, cache, path, viruses.HIV1, *cutoffs)
+        assert payload['allReads'] == expected['allReads']
+        assert (
+            payload['minPrevalence'], payload['maxMixtureRate'],
+            payload['minCodonReads'], payload['minPositionReads']
+        ) == cutoffs
+    assert calls == [path]
+    cached: Optional[ParsedCodfreq] = cache.load(
+        path, 'HIV1', os.stat(path))
+    assert cached is not None and cached[0] == expected['allReads']
@@ -0,0 +1,103 @@
+import os
+from typing import Any, List, Tuple
+
+import pytest
+
+from sierrapy import fastaindex, fastareader
+from sierrapy.checkpoint import Position
+from sierrapy.commands.fasta import iter_fasta_records
+from sierrapy.fastaindex import FastaIndex
+
+
+def write_fasta(path: str, lengths: List[int]) -> None:
+    with open(path, 'w') as fp:
+        for idx, length in enumerate(lengths):
+            fp.write('>{}\tseq {}\n{}\n'.format(idx, idx, 'A' * length))
+
+
+def headers(paths: List[str], start: Position, stop: Position) -> List[str]:
+    return [
+        seq['header'] for seq, _ in iter_fasta_records(paths, start, stop)]
+
+
+def test_build_and_load(tmp_path: Any) -> None:
+    path: str = str(tmp_path / 'a.fasta')
+    write_fasta(path, [3, 10, 5])
+    built: FastaIndex = FastaIndex.build(path)
+    assert built.count == 3
+    assert list(built.lengths) == [3, 10, 5]
+    assert [
+        seq for seq, _ in fastareader.iter_file_records(
+            path, built.offsets[1])
+    ][0]['header'] == '1\tseq 1'
+    loaded: Any = FastaIndex.load(path)
+    assert loaded is not None
+    assert list(loaded.offsets) == list(built.offsets)
+    assert list(loaded.lengths) == list(built.lengths)
+
+
+def test_outdated_index(tmp_path: Any) -> None:
+    path: str = str(tmp_path / 'a.fasta')
+    write_fasta(path, [3, 10])
+    FastaIndex.build(path)
+    write_fasta(path, [3, 10, 7])
+    assert FastaIndex.load(path) is None
+    assert FastaIndex.get(path).count == 3
+    assert FastaIndex.load(path) is not None
+    # same size, other modification time
+    stat: os.stat_result = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+    assert FastaIndex.load(path) is None
+
+
+def test_missing_or_corrupt_index(tmp_path: Any) -> None:
+    path: str = str(tmp_path / 'a.fasta')
+    write_fasta(path, [3])
+    assert FastaIndex.load(path) is None
+    FastaIndex.build(path)
+    with open(FastaIndex.index_path(path), 'a') as fp:
+        fp.write('not an entry\n')
+    assert FastaIndex.load(path) is None
+
+
+def test_locate(tmp_path: Any) -> None:
+    paths: List[str] = [str(tmp_path / 'a.fasta'), str(tmp_path / 'b.fasta')]
+    write_fasta(paths[0], [1, 2])
+    write_fasta(paths[1], [3])
+    indexes: List[FastaIndex] = [FastaIndex.get(path) for path in paths]
+    assert fastaindex.locate(indexes, 0) == (0, 0)
+    assert fastaindex.locate(indexes, 1) == (0, indexes[0].offsets[1])
+    assert fastaindex.locate(indexes, 2) == (1, 0)
+    assert fastaindex.locate(indexes, 3) == (2, 0)
+
+
+@pytest.mark.parametrize('num', [1, 2, 3, 4, 7, 12])
+def test_partitions_cover_all_records(tmp_path: Any, num: int) -> None:
+    first: int
+    count: int
+    paths: List[str] = [str(tmp_path / 'a.fasta'), str(tmp_path / 'b.fasta')]
+    write_fasta(paths[0], [5, 100, 5, 5, 30])
+    write_fasta(paths[1], [50, 5, 5, 5, 5])
+    indexes: List[FastaIndex] = [FastaIndex.get(path) for path in paths]
+    parts: List[Tuple[int, int]] = fastaindex.partition(indexes, num)
+    assert len(parts) == num
+    assert sum(count for _, count in parts) == 10
+    read: List[str] = []
+    expected: int = 0
+    for first, count in parts:
+        assert first == expected
+        expected += count
+        read.extend(headers(
+            paths,
+            fastaindex.locate(indexes, first),
+            fastaindex.locate(indexes, first + count)))
+    assert read == (
+        ['{}\tseq {}'.format(idx, idx) for idx in range(5)] * 2)
+
+
+def test_partitions_balance_nucleotides(tmp_path: Any) -> None:
+    path: str = str(tmp_path / 'a.fasta')
+    write_fasta(path, [10] * 8 + [80])
+    parts: List[Tuple[int, int]] = fastaindex.partition(
+        [FastaIndex.get(path)], 2)
+    assert parts == [(0, 8), (8, 1)]
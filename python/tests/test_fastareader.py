@@ -0,0 +1,94 @@
+import io
+import gzip
+from typing import Any, List, Tuple
+
+import pytest
+
+from sierrapy import fastareader
+from sierrapy.common_types import Sequence
+
+FASTA: str = (
+    '; ignored before the first header\n'
+    '>seq1 first\n'
+    'acgt\n'
+    'ACGT\n'
+    '>seq2\r\n'
+    'AAAA\r\n'
+    'CCCC\r\n'
+    '# a comment\n'
+    ' GGGG \t\n'
+    '>empty\n'
+    '>\n'
+    'TTTT\n'
+    '>seq3>not a header\n'
+    'NNNN\n'
+    '\n'
+    'Tt\n'
+)
+
+
+def expected() -> List[Sequence]:
+    return list(fastareader.load(io.StringIO(FASTA)))
+
+
+def write(tmp_path: Any, kind: str, text: str = FASTA) -> str:
+    path: str = str(tmp_path / ('test.fasta' + kind))
+    data: bytes = text.encode('ASCII')
+    if kind == '':
+        with open(path, 'wb') as fp:
+            fp.write(data)
+    elif kind == '.gz':
+        with gzip.open(path, 'wb') as fp:
+            fp.write(data)
+    else:
+        # bgzip writes a series of gzip members
+        with open(path, 'wb') as fp:
+            for start in range(0, len(data), 20):
+                fp.write(gzip.compress(data[start:start + 20]))
+    return path
+
+
+def test_expected_records() -> None:
+    assert [seq['header'] for seq in expected()] == [
+        'seq1 first', 'seq2', 'seq3>not a header']
+    assert expected()[1]['sequence'] == 'AAAACCCCGGGG'
+
+
+@pytest.mark.parametrize('kind', ['', '.gz', '.bgz'])
+def test_file_records(tmp_path: Any, kind: str) -> None:
+    path: str = write(tmp_path, kind)
+    assert list(fastareader.load_file(path)) == expected()
+    assert fastareader.count_records(path) == 5
+
+
+@pytest.mark.parametrize('block_size', [1, 3, 16, 1 << 16])
+def test_block_reader(block_size: int) -> None:
+    records: List[Tuple[Sequence, int]] = list(fastareader.iter_records(
+        io.BytesIO(FASTA.encode('ASCII')), block_size=block_size))
+    assert [seq for seq, _ in records] == expected()
+    assert [end for _, end in records] == [
+        FASTA.index('>seq2'), FASTA.index('>empty'),
+        len(FASTA)]
+
+
+@pytest.mark.parametrize('kind', ['', '.gz', '.bgz'])
+def test_resume_from_offsets(tmp_path: Any, kind: str) -> None:
+    end: int
+    path: str = write(tmp_path, kind)
+    records: List[Tuple[Sequence, int]] = list(
+        fastareader.iter_file_records(path))
+    for idx, (_, end) in enumerate(records):
+        assert [
+            seq for seq, _ in fastareader.iter_file_records(path, end)
+        ] == expected()[idx + 1:]
+    # stopping at the offset of a record
+    assert [
+        seq for seq, _ in fastareader.iter_file_records(
+            path, 0, records[1][1])
+    ] == expected()[:2]
+
+
+def test_empty_file(tmp_path: Any) -> None:
+    path: str = write(tmp_path, '', '')
+    assert list(fastareader.load_file(path)) == []
+    assert fastareader.count_records(path) == 0
@@ -0,0 +1,70 @@
+import io
+import json
+from typing import Any, List
+
+import pytest
+
+from sierrapy.jsonstream import (
+    JSONArrayWriter, JSONLinesWriter, get_writer, iter_json_records
+)
+
+RECORDS: List[Any] = [
+    {'header': 'a', 'mutations': [{'text': 'K103N', 'score': 1.5}]},
+    {'header': 'b\nc', 'empty': {}, 'list': []},
+    [1, 2, [3, {'x': None}]],
+    'text with ] and , inside',
+    12345678901234567890,
+    -0.25,
+    True,
+    None
+]
+
+
+@pytest.mark.parametrize('indent', [None, 2, 4])
+def test_array_writer_matches_json_dump(indent: Any) -> None:
+    for count in range(len(RECORDS) + 1):
+        fp: io.StringIO = io.StringIO()
+        with JSONArrayWriter(fp, indent) as writer:
+            for item in RECORDS[:count]:
+                writer.write(item)
+        assert fp.getvalue() == json.dumps(RECORDS[:count], indent=indent)
+        assert writer.count == count
+
+
+def test_lines_writer() -> None:
+    fp: io.StringIO = io.StringIO()
+    with JSONLinesWriter(fp) as writer:
+        for item in RECORDS:
+            writer.write(item)
+    assert [json.loads(line) for line in fp.getvalue().splitlines()] == (
+        RECORDS)
+
+
+@pytest.mark.parametrize('ugly,jsonl', [
+    (False, False), (True, False), (False, True)])
+@pytest.mark.parametrize('chunk_size', [1, 2, 7, 65536])
+def test_round_trip(ugly: bool, jsonl: bool, chunk_size: int) -> None:
+    records: List[Any] = RECORDS if not jsonl else [
+        item for item in RECORDS if isinstance(item, dict)]
+    fp: io.StringIO = io.StringIO()
+    with get_writer(fp, ugly, jsonl) as writer:
+        for item in records:
+            writer.write(item)
+    fp.seek(0)
+    assert list(iter_json_records(fp, chunk_size)) == records
+
+
+@pytest.mark.parametrize('text', ['', '  \n', '[]', ' [ \n ] '])
+def test_read_empty(text: str) -> None:
+    assert list(iter_json_records(io.StringIO(text), 2)) == []
+
+
+def test_read_number_split_across_chunks() -> None:
+    assert list(iter_json_records(io.StringIO('[123456, 7]'), 3)) == [
+        123456, 7]
+
+
+@pytest.mark.parametrize('text', ['[1, 2', '[1 2]', '[{"a": ]'])
+def test_read_invalid_array(text: str) -> None:
+    with pytest.raises(ValueError):
+        list(iter_json_records(io.StringIO(text), 2))
@@ -0,0 +1,82 @@
+import os
+import hashlib
+from typing import Any, Tuple
+
+from sierrapy.manifest import InputState, ReportManifest, file_sha256
+
+
+def write(path: str, text: str) -> None:
+    with open(path, 'w') as fp:
+        fp.write(text)
+
+
+def setup_report(tmp_path: Any) -> Tuple[str, str, ReportManifest]:
+    source: str = str(tmp_path / 'a.codfreq')
+    report: str = str(tmp_path / 'a.report.json')
+    write(source, 'codfreq')
+    write(report, '{}')
+    manifest: ReportManifest = ReportManifest(str(tmp_path / 'm.jsonl'))
+    manifest.record(report, InputState(source), 'params')
+    return source, report, manifest
+
+
+def test_file_sha256(tmp_path: Any) -> None:
+    write(str(tmp_path / 'a'), 'text')
+    assert file_sha256(str(tmp_path / 'a')) == (
+        hashlib.sha256(b'text').hexdigest())
+
+
+def test_current_report(tmp_path: Any) -> None:
+    source, report, manifest = setup_report(tmp_path)
+    assert manifest.is_current(report, InputState(source), 'params')
+    loaded: ReportManifest = ReportManifest(manifest.path)
+    loaded.load()
+    assert loaded.is_current(report, InputState(source), 'params')
+
+
+def test_stale_reports(tmp_path: Any) -> None:
+    source, report, manifest = setup_report(tmp_path)
+    # other parameters, e.g. cutoffs or server version
+    assert not manifest.is_current(report, InputState(source), 'other')
+    # another report
+    assert not manifest.is_current(
+        str(tmp_path / 'b.report.json'), InputState(source), 'params')
+    # changed input
+    write(source, 'changed')
+    assert not manifest.is_current(report, InputState(source), 'params')
+    # removed report
+    source, report, manifest = setup_report(tmp_path)
+    os.remove(report)
+    assert not manifest.is_current(report, InputState(source), 'params')
+
+
+def test_touched_input_with_same_content(tmp_path: Any) -> None:
+    source, report, manifest = setup_report(tmp_path)
+    stat: os.stat_result = os.stat(source)
+    os.utime(source, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+    assert manifest.is_current(report, InputState(source), 'params')
+    # the new modification time is recorded
+    assert manifest.entries[report]['mtime'] == stat.st_mtime_ns + 10 ** 9
+    # same size and another content
+    write(source, 'CODFREQ')
+    os.utime(source, ns=(stat.st_atime_ns, stat.st_mtime_ns + 2 * 10 ** 9))
+    assert not manifest.is_current(report, InputState(source), 'params')
+
+
+def test_load_compacts_and_skips_incomplete_lines(tmp_path: Any) -> None:
+    source, report, manifest = setup_report(tmp_path)
+    manifest.record(report, InputState(source), 'newer')
+    with open(manifest.path, 'a') as fp:
+        fp.write('{"report": "x", "inp')
+    loaded: ReportManifest = ReportManifest(manifest.path)
+    loaded.load()
+    assert list(loaded.entries) == [os.path.abspath(report)]
+    assert loaded.is_current(report, InputState(source), 'newer')
+    with open(manifest.path) as fp:
+        assert len(fp.readlines()) == 1
+
+
+def test_missing_manifest(tmp_path: Any) -> None:
+    manifest: ReportManifest = ReportManifest(str(tmp_path / 'm.jsonl'))
+    manifest.load()
+    assert manifest.entries == {}
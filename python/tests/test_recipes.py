@@ -0,0 +1,72 @@
+import io
+import json
+from typing import Any, Dict, List
+
+import click  # type: ignore
+import pytest
+from click.testing import CliRunner  # type: ignore
+
+from sierrapy.commands import cli
+from sierrapy.recipes.mutationtsv import schema
+from sierrapy.recipes.pipeline import iter_records
+
+
+def make_result(header: str, mutations: List[str]) -> Dict[str, Any]:
+    return {
+        'inputSequence': {'header': header},
+        'alignedGeneSequences': [{
+            'gene': {'name': 'RT'},
+            'mutations': [{
+                'consensus': mut[0],
+                'position': int(mut[1:-1]),
+                'AAs': mut[-1]
+            } for mut in mutations]
+        }]
+    }
+
+
+RESULTS: List[Dict[str, Any]] = [
+    make_result('seq1', ['K103N', 'M184V']),
+    make_result('seq2', []),
+    make_result('seq3', ['T69-'])
+]
+
+
+@pytest.mark.parametrize('jsonl', [False, True])
+def test_mutationtsv(tmp_path: Any, jsonl: bool) -> None:
+    path: str = str(tmp_path / 'input.json')
+    output: str = str(tmp_path / 'output.tsv')
+    with open(path, 'w') as fp:
+        if jsonl:
+            fp.writelines(json.dumps(result) + '\n' for result in RESULTS)
+        else:
+            json.dump(RESULTS, fp, indent=2)
+    result: Any = CliRunner().invoke(
+        cli, ['recipe', '--input', path, '--output', output, 'mutationtsv'],
+        obj={})
+    assert result.exit_code == 0, result.output
+    with open(output) as fp:
+        assert fp.read().splitlines() == [
+            'Header\tPR Mutations\tRT Mutations\tIN Mutations',
+            'seq1\t\tK103N, M184V\t',
+            'seq2\t\t\t',
+            'seq3\t\tT69Deletion\t'
+        ]
+
+
+def test_invalid_records_are_skipped(capsys: Any) -> None:
+    records: List[Any] = []
+    invalid: Any = make_result('seq2', [])
+    del invalid['alignedGeneSequences']
+    ctx: click.Context = click.Context(
+        click.Command('mutationtsv'),
+        obj={'INPUT': io.StringIO(json.dumps(
+            [RESULTS[0], invalid, 'text', RESULTS[2]]))})
+    with pytest.raises(click.ClickException) as e:
+        for record in iter_records(ctx, schema):
+            records.append(record)
+    assert records == [RESULTS[0], RESULTS[2]]
+    assert '2 invalid record(s)' in e.value.message
+    err: str = capsys.readouterr().err
+    assert "Invalid record #1 ('seq2')" in err
+    assert 'Invalid record #2 (None)' in err
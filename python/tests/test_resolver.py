@@ -0,0 +1,189 @@
+from typing import Any, Dict, List, Tuple
+
+import pytest
+
+from sierrapy.common_types import Sequence, ServerVer
+from sierrapy.resultcache import ResultCache
+from sierrapy.sierraclient import SierraClient, ResponseError
+
+Pattern = Tuple[str, List[str]]
+
+
+class FakeClient(SierraClient):
+    """A client analyzing sequences and patterns without a server.
+
+    Sequences containing "X" are rejected by the fake server.
+    """
+    batches: List[List[str]]
+    version: str
+
+    def __init__(self, **kw: Any):
+        super().__init__('http://localhost/graphql', fetch_schema=False, **kw)
+        self.batches = []
+        self.version = '1.0'
+
+    def current_version(self) -> Tuple[ServerVer, ServerVer]:
+        version: ServerVer = {'text': self.version, 'publishDate': ''}
+        return version, version
+
+    def _sequence_analysis(
+        self,
+        sequences: List[Sequence],
+        query: str
+    ) -> List[Dict[str, Any]]:
+        self.batches.append([seq['sequence'] for seq in sequences])
+        if any('X' in seq['sequence'] for seq in sequences):
+            raise ResponseError('invalid sequence')
+        return [{
+            'inputSequence': {'header': seq['header']},
+            'length': len(seq['sequence'])
+        } for seq in sequences]
+
+    def _pattern_analysis(
+        self,
+        patterns: Any,
+        pattern_names: Any,
+        query: str,
+        **kw: Any
+    ) -> List[Dict[str, Any]]:
+        self.batches.append([','.join(pattern) for pattern in patterns])
+        return [{
+            'name': name,
+            'mutations': sorted(pattern)
+        } for name, pattern in zip(pattern_names, patterns)]
+
+    @property
+    def sent(self) -> List[str]:
+        return [item for batch in self.batches for item in batch]
+
+
+def make_sequences(*sequences: str) -> List[Sequence]:
+    return [{
+        'header': 'seq{}'.format(idx), 'sequence': sequence
+    } for idx, sequence in enumerate(sequences)]
+
+
+def expected(sequences: List[Sequence]) -> List[Dict[str, Any]]:
+    return [{
+        'inputSequence': {'header': seq['header']},
+        'length': len(''.join(seq['sequence'].split()))
+    } for seq in sequences]
+
+
+@pytest.mark.parametrize('max_in_flight', [1, 3])
+def test_dedup_sends_each_sequence_once(max_in_flight: int) -> None:
+    client: FakeClient = FakeClient()
+    sequences: List[Sequence] = make_sequences(
+        'ACGT', 'AAA', 'acgt', 'AC GT', 'CCCC', 'AAA')
+    results: List[Dict[str, Any]] = list(client.iter_sequence_analysis(
+        sequences, '', 2, max_in_flight, dedup_window=10))
+    assert results == expected(sequences)
+    assert sorted(client.sent) == ['AAA', 'ACGT', 'CCCC']
+
+
+def test_dedup_window() -> None:
+    client: FakeClient = FakeClient()
+    sequences: List[Sequence] = make_sequences('A', 'C', 'G', 'A', 'G')
+    results: List[Dict[str, Any]] = list(client.iter_sequence_analysis(
+        sequences, '', 1, dedup_window=2))
+    assert results == expected(sequences)
+    # "A" left the window of the last two distinct sequences
+    assert client.sent == ['A', 'C', 'G', 'A']
+
+
+def test_without_dedup() -> None:
+    client: FakeClient = FakeClient()
+    sequences: List[Sequence] = make_sequences('A', 'A')
+    assert list(client.iter_sequence_analysis(sequences, '', 2)) == (
+        expected(sequences))
+    assert client.sent == ['A', 'A']
+
+
+def test_duplicates_of_rejected_sequences() -> None:
+    client: FakeClient = FakeClient()
+    errors: List[Tuple[str, str]] = []
+    sequences: List[Sequence] = make_sequences('A', 'AX', 'C', 'AX', 'G')
+
+    def on_error(seq: Sequence, error: ResponseError) -> None:
+        errors.append((seq['header'], str(error)))
+
+    results: List[Dict[str, Any]] = list(client.iter_sequence_analysis(
+        sequences, '', 4, on_error=on_error, dedup_window=10))
+    assert results == expected([sequences[idx] for idx in (0, 2, 4)])
+    assert errors == [
+        ('seq1', 'invalid sequence'), ('seq3', 'invalid sequence')]
+    # the duplicate is not sent; the original is isolated by bisecting
+    assert client.batches == [
+        ['A', 'AX', 'C', 'G'], [], ['A', 'AX'], ['A'], ['AX'], ['C', 'G']]
+
+
+def test_result_cache(tmp_path: Any) -> None:
+    cache: ResultCache = ResultCache(str(tmp_path))
+    sequences: List[Sequence] = make_sequences('A', 'C', 'A')
+    client: FakeClient = FakeClient(result_cache=cache)
+    assert list(client.iter_sequence_analysis(sequences, '', 2)) == (
+        expected(sequences))
+    # the results of the first batch are stored before the next is read
+    assert client.sent == ['A', 'C']
+
+    # cached results are returned under the header of the input
+    sequences = make_sequences('C', 'A', 'G')
+    client = FakeClient(result_cache=cache)
+    assert list(client.iter_sequence_analysis(sequences, '', 2)) == (
+        expected(sequences))
+    assert client.sent == ['G']
+
+    # another query or server version is not served from the cache
+    client = FakeClient(result_cache=cache)
+    list(client.iter_sequence_analysis(sequences, 'other', 2))
+    assert client.sent == ['C', 'A', 'G']
+    client = FakeClient(result_cache=cache)
+    client.version = '2.0'
+    list(client.iter_sequence_analysis(sequences, '', 2))
+    assert client.sent == ['C', 'A', 'G']
+
+
+def test_result_cache_stored_per_batch(tmp_path: Any) -> None:
+    cache: ResultCache = ResultCache(str(tmp_path))
+    client: FakeClient = FakeClient(result_cache=cache)
+    results: Any = client.iter_sequence_analysis(
+        make_sequences('A', 'C', 'G', 'T'), '', 2)
+    for _ in range(3):
+        next(results)
+    # the results yielded before stopping are stored
+    results.close()
+    client = FakeClient(result_cache=ResultCache(str(tmp_path)))
+    list(client.iter_sequence_analysis(
+        make_sequences('A', 'C', 'G', 'T'), '', 2))
+    assert client.sent == ['T']
+
+
+def test_pattern_memo() -> None:
+    client: FakeClient = FakeClient(memo_size=10)
+    patterns: List[Pattern] = [
+        ('p1', ['K103N', 'M184V']),
+        ('p2', ['M184V', 'K103N', ' ']),
+        ('p3', ['T215Y'])
+    ]
+    results: List[Dict[str, Any]] = list(
+        client.iter_pattern_analysis(iter(patterns), '', 1))
+    assert [result['name'] for result in results] == ['p1', 'p2', 'p3']
+    assert results[1]['mutations'] == ['K103N', 'M184V']
+    assert len(client.sent) == 2
+    # memoized across calls
+    results = list(client.iter_pattern_analysis(
+        iter([('p4', ['T215Y'])]), '', 1))
+    assert results == [{'name': 'p4', 'mutations': ['T215Y']}]
+    assert len(client.sent) == 2
+    # other algorithms
+    list(client.iter_pattern_analysis(
+        iter([('p4', ['T215Y'])]), '', 1, algorithms=['HIVDB']))
+    assert len(client.sent) == 3
+
+
+def test_memo_is_opt_in() -> None:
+    client: FakeClient = FakeClient()
+    patterns: List[Pattern] = [('p1', ['K103N']), ('p2', ['K103N'])]
+    list(client.iter_pattern_analysis(iter(patterns), '', 1))
+    list(client.iter_pattern_analysis(iter(patterns), '', 1))
+    assert len(client.sent) == 4
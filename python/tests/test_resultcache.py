@@ -0,0 +1,74 @@
+import json
+import sqlite3
+from typing import Any, Dict
+
+from sierrapy.resultcache import ResultCache, result_key
+
+
+def stored_size(cache: ResultCache) -> int:
+    with sqlite3.connect(cache.path) as db:
+        size: int = db.execute(
+            'SELECT COALESCE(SUM(size), 0) FROM results').fetchone()[0]
+    return size
+
+
+def test_result_key() -> None:
+    assert result_key('a', 'b') == result_key('a', 'b')
+    assert result_key('a', 'b') != result_key('ab')
+    assert result_key('a', 'b') != result_key('b', 'a')
+
+
+def test_round_trip(tmp_path: Any) -> None:
+    result: Dict[str, Any] = {'header': 'a', 'drugResistance': [1, 2]}
+    cache: ResultCache = ResultCache(str(tmp_path))
+    assert cache.get('key') is None
+    cache.put('key', result)
+    assert cache.get('key') == result
+    cache.close()
+    cache = ResultCache(str(tmp_path))
+    assert cache.get('key') == result
+    assert (cache.hits, cache.misses) == (1, 0)
+
+
+def test_put_many_replaces(tmp_path: Any) -> None:
+    cache: ResultCache = ResultCache(str(tmp_path))
+    cache.put_many([('a', {'v': 1}), ('b', {'v': 2})])
+    cache.put_many([('a', {'v': 'longer'}), ('c', {'v': 3})])
+    assert cache.get('a') == {'v': 'longer'}
+    assert cache.get('b') == {'v': 2}
+    assert cache._size == stored_size(cache)
+    cache.put_many([])
+    assert cache._size == stored_size(cache)
+
+
+def test_replacing_does_not_evict(tmp_path: Any) -> None:
+    size: int = len(json.dumps({'v': 0}))
+    cache: ResultCache = ResultCache(str(tmp_path), max_size=3 * size)
+    for _ in range(10):
+        cache.put_many([('a', {'v': 0}), ('b', {'v': 1})])
+    assert cache.evictions == 0
+    assert cache._size == 2 * size
+
+
+def test_evicts_least_recently_used(tmp_path: Any) -> None:
+    key: str
+    size: int = len(json.dumps({'v': 0}))
+    cache: ResultCache = ResultCache(str(tmp_path), max_size=4 * size)
+    for key in 'abcd':
+        cache.put(key, {'v': 0})
+    assert cache.get('a') == {'v': 0}
+    cache.put('e', {'v': 0})
+    assert cache.evictions > 0
+    assert cache.get('a') is not None
+    assert cache.get('b') is None
+    assert cache.get('e') is not None
+    assert cache._size == stored_size(cache) <= 4 * size
+
+
+def test_unusable_cache_is_ignored(tmp_path: Any) -> None:
+    # the cache directory is a file
+    (tmp_path / 'file').write_text('')
+    cache: ResultCache = ResultCache(str(tmp_path / 'file'))
+    cache.put('a', {'v': 0})
+    assert cache.get('a') is None
+    assert cache.misses == 1
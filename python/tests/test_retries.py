@@ -0,0 +1,246 @@
+from typing import Any, Dict, List, Set, Tuple
+
+import click  # type: ignore
+import pytest
+import requests  # type: ignore
+from graphql import ExecutionResult
+from gql.transport.exceptions import TransportServerError
+
+from sierrapy.common_types import Sequence
+from sierrapy.commands.cli import request_errors
+from sierrapy.sierraclient import (
+    SierraClient, RetryPolicy, ResponseError, build_document
+)
+
+
+def server_error(status: int, text: str = '') -> TransportServerError:
+    """A TransportServerError as raised by the gql requests transport."""
+    response: requests.Response = requests.Response()
+    response.status_code = status
+    response._content = text.encode('UTF-8')
+    cause: requests.HTTPError = requests.HTTPError(
+        '{} Server Error'.format(status), response=response)
+    error: TransportServerError = TransportServerError(str(cause), status)
+    error.__cause__ = cause
+    return error
+
+
+class FakeTransport:
+    """Raise the queued errors, then return data."""
+    errors: List[Exception]
+    calls: int
+
+    def __init__(self, *errors: Exception):
+        self.errors = list(errors)
+        self.calls = 0
+
+    def execute(self, document: Any, **kw: Any) -> ExecutionResult:
+        self.calls += 1
+        if self.errors:
+            raise self.errors.pop(0)
+        return ExecutionResult(data={'ok': True})
+
+
+class TransportClient(SierraClient):
+    fake: FakeTransport
+
+    def __init__(self, fake: FakeTransport, attempts: int):
+        super().__init__(
+            'http://localhost/graphql', fetch_schema=False,
+            retry_policy=RetryPolicy(attempts, backoff=0))
+        self.fake = fake
+
+    @property
+    def transport(self) -> Any:
+        return self.fake
+
+
+def execute(client: SierraClient) -> Dict[str, Any]:
+    return client.execute(build_document('currentVersion'))
+
+
+def test_transient_errors() -> None:
+    policy: RetryPolicy = RetryPolicy()
+    assert policy.is_transient(requests.ConnectionError())
+    assert policy.is_transient(requests.Timeout())
+    assert policy.is_transient(server_error(503))
+    assert policy.is_transient(server_error(429))
+    assert not policy.is_transient(server_error(500))
+    assert not policy.is_transient(server_error(400))
+    assert not policy.is_transient(ResponseError())
+
+
+def test_delay() -> None:
+    policy: RetryPolicy = RetryPolicy(backoff=1, max_backoff=5, jitter=.5)
+    for _ in range(20):
+        assert .5 <= policy.delay(1) <= 1.5
+        assert 2 <= policy.delay(3) <= 6
+        assert 2.5 <= policy.delay(10) <= 7.5
+
+
+def test_transient_errors_are_retried() -> None:
+    fake: FakeTransport = FakeTransport(
+        server_error(503), requests.ConnectionError(), requests.Timeout())
+    assert execute(TransportClient(fake, 4)) == {'ok': True}
+    assert fake.calls == 4
+
+
+def test_retries_are_limited_by_attempts() -> None:
+    fake: FakeTransport = FakeTransport(*[server_error(502)] * 5)
+    with pytest.raises(TransportServerError):
+        execute(TransportClient(fake, 3))
+    assert fake.calls == 3
+    fake = FakeTransport(requests.ConnectionError())
+    with pytest.raises(requests.ConnectionError):
+        execute(TransportClient(fake, 1))
+    assert fake.calls == 1
+
+
+def test_rejected_requests_are_not_retried() -> None:
+    fake: FakeTransport = FakeTransport(
+        server_error(500, '<html>NullPointerException</html>'))
+    with pytest.raises(ResponseError) as e:
+        execute(TransportClient(fake, 3))
+    assert '500 Server Error' in str(e.value)
+    assert 'NullPointerException' in str(e.value)
+    assert fake.calls == 1
+
+
+def test_error_results_are_not_retried() -> None:
+    fake: FakeTransport = FakeTransport()
+    # the transport returns the errors as decoded from the JSON response
+    fake.execute = lambda document, **kw: ExecutionResult(  # type: ignore
+        errors=[{  # type: ignore
+            'message': 'bad',
+            'exception': {'detailMessage': 'Invalid nucleotide'}
+        }])
+    with pytest.raises(ResponseError) as e:
+        execute(TransportClient(fake, 3))
+    assert 'Invalid nucleotide' in str(e.value)
+
+
+class RejectingClient(SierraClient):
+    """Reject the batches with a bad sequence, or every request."""
+    bad: Set[str]
+    broken: bool
+    requests: List[List[str]]
+
+    def __init__(self, bad: Set[str], broken: bool = False):
+        super().__init__('http://localhost/graphql', fetch_schema=False)
+        self.bad = bad
+        self.broken = broken
+        self.requests = []
+
+    def _sequence_analysis(
+        self,
+        sequences: List[Sequence],
+        query: str
+    ) -> List[Dict[str, Any]]:
+        self.requests.append([seq['header'] for seq in sequences])
+        if self.broken:
+            raise ResponseError('Invalid query')
+        if any(seq['header'] in self.bad for seq in sequences):
+            raise ResponseError('Invalid nucleotide')
+        return [{'header': seq['header']} for seq in sequences]
+
+
+def analyze(
+    client: SierraClient,
+    count: int,
+    step: int
+) -> Tuple[List[str], List[Tuple[str, str]]]:
+    errors: List[Tuple[str, str]] = []
+    sequences: List[Sequence] = [
+        {'header': 's{}'.format(idx), 'sequence': 'ACGT'}
+        for idx in range(count)]
+
+    def on_error(seq: Sequence, error: ResponseError) -> None:
+        errors.append((seq['header'], str(error)))
+
+    results: List[str] = [
+        result['header'] for result in client.iter_sequence_analysis(
+            sequences, '', step, on_error=on_error)]
+    return results, errors
+
+
+@pytest.mark.parametrize('bad', [
+    {'s4'},
+    # in the same half
+    {'s2', 's3'},
+    {'s0', 's1', 's2'},
+    # in different halves
+    {'s0', 's5'},
+    {'s1', 's3', 's4'},
+    # every record
+    {'s0', 's1', 's2', 's3', 's4', 's5'}
+])
+def test_rejected_records_are_isolated(bad: Set[str]) -> None:
+    client: RejectingClient = RejectingClient(bad)
+    results, errors = analyze(client, 8, 6)
+    assert results == [
+        's{}'.format(idx) for idx in range(8) if 's{}'.format(idx) not in bad]
+    assert errors == [
+        (header, 'Invalid nucleotide') for header in sorted(bad)]
+    # the batch, the request without records, then the bisection
+    assert client.requests[:2] == [
+        ['s0', 's1', 's2', 's3', 's4', 's5'], []]
+
+
+def test_batch_wide_error_is_raised() -> None:
+    client: RejectingClient = RejectingClient(set(), broken=True)
+    with pytest.raises(ResponseError) as e:
+        analyze(client, 8, 6)
+    assert str(e.value) == 'Invalid query'
+    assert client.requests == [['s0', 's1', 's2', 's3', 's4', 's5'], []]
+
+
+def test_without_on_error_the_error_is_raised() -> None:
+    client: RejectingClient = RejectingClient({'s1'})
+    with pytest.raises(ResponseError):
+        list(client.iter_sequence_analysis(
+            [{'header': 's1', 'sequence': 'ACGT'}], ''))
+    assert len(client.requests) == 1
+
+
+def test_pattern_probe_without_patterns() -> None:
+    sent: List[Any] = []
+
+    class Client(SierraClient):
+        def _pattern_analysis(
+            self,
+            patterns: Any,
+            pattern_names: Any,
+            query: str,
+            **kw: Any
+        ) -> List[Dict[str, Any]]:
+            sent.append(list(pattern_names))
+            if 'bad' in pattern_names:
+                raise ResponseError('Invalid mutation')
+            return [{'name': name} for name in pattern_names]
+
+    errors: List[str] = []
+    client: Client = Client('http://localhost/graphql', fetch_schema=False)
+    results: List[Dict[str, Any]] = list(client.iter_pattern_analysis(
+        iter([('p1', ['K103N']), ('bad', ['X1Y'])]), '', 2,
+        on_error=lambda pattern, error: errors.append(pattern[0])))
+    assert results == [{'name': 'p1'}]
+    assert errors == ['bad']
+    assert sent[1] == []
+
+
+def test_request_errors() -> None:
+    client: SierraClient = SierraClient(
+        'http://localhost/graphql', retry_policy=RetryPolicy(3))
+    with request_errors(client, 'hint'):
+        pass
+    with pytest.raises(click.ClickException) as e:
+        with request_errors(client, 'Run again with --resume.'):
+            raise ResponseError('Invalid query')
+    assert e.value.message == 'Invalid query\nRun again with --resume.'
+    with pytest.raises(click.ClickException) as e:
+        with request_errors(client):
+            raise server_error(503)
+    assert e.value.message.startswith('Request failed after 3 attempt(s)')
+    with pytest.raises(KeyError):
+        with request_errors(client, 'hint'):
+            raise KeyError()
@@ -0,0 +1,85 @@
+import json
+import random
+from typing import List
+
+from sierrapy.common_types import SeqReads, PosReads
+from sierrapy.commands.seqreads import (
+    prune_codon_reads, filter_codon_reads
+)
+
+
+def make_payload(min_codon_reads: int, seed: int = 0) -> SeqReads:
+    rand: random.Random = random.Random(seed)
+    all_reads: List[PosReads] = []
+    for pos in range(1, 200):
+        codons: List[str] = rand.sample(
+            ['AAA', 'AAC', 'AAG', 'AAT', 'ACA', 'ACC', 'CAT'],
+            rand.randint(1, 7))
+        depth: int = rand.choice([3, 30, 300, 3000])
+        all_reads.append({
+            'gene': 'RT',
+            'position': pos,
+            'totalReads': depth,
+            'allCodonReads': [
+                {'codon': codon, 'reads': rand.randint(1, depth)}
+                for codon in codons
+            ]
+        })
+    return {
+        'name': 'sample',
+        'strain': 'HIV1',
+        'allReads': all_reads,
+        'untranslatedRegions': [],
+        'minPrevalence': .1,
+        'maxMixtureRate': .0005,
+        'minCodonReads': min_codon_reads,
+        'minPositionReads': 1
+    }
+
+
+def test_prune_keeps_analyzed_reads() -> None:
+    for min_reads in (1, 5, 50, 500):
+        payload: SeqReads = make_payload(min_reads, min_reads)
+        pruned, _, _, _ = prune_codon_reads(payload)
+        assert filter_codon_reads(pruned) == filter_codon_reads(payload)
+        assert [
+            (one['gene'], one['position'], one['totalReads'])
+            for one in pruned['allReads']
+        ] == [
+            (one['gene'], one['position'], one['totalReads'])
+            for one in payload['allReads']
+        ]
+
+
+def test_prune_counts() -> None:
+    payload: SeqReads = make_payload(50)
+    pruned, dropped, retained, saved = prune_codon_reads(payload)
+    before: int = sum(
+        len(one['allCodonReads']) for one in payload['allReads'])
+    after: int = sum(
+        len(one['allCodonReads']) for one in pruned['allReads'])
+    below: int = sum(
+        codon['reads'] < 50
+        for one in payload['allReads'] for codon in one['allCodonReads'])
+    assert dropped == before - after
+    assert dropped + retained == below
+    assert retained > 0
+    assert saved == len(json.dumps(payload)) - len(json.dumps(pruned))
+
+
+def test_prune_keeps_positions_below_cutoff() -> None:
+    payload: SeqReads = make_payload(1000)
+    pruned, _, _, _ = prune_codon_reads(payload)
+    for orig, one in zip(payload['allReads'], pruned['allReads']):
+        if all(codon['reads'] < 1000 for codon in orig['allCodonReads']):
+            assert one is orig
+        else:
+            assert all(
+                codon['reads'] >= 1000 for codon in one['allCodonReads'])
+
+
+def test_prune_does_not_modify_payload() -> None:
+    payload: SeqReads = make_payload(50)
+    copy: str = json.dumps(payload)
+    prune_codon_reads(payload)
+    assert json.dumps(payload) == copy
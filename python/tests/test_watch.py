@@ -0,0 +1,115 @@
+import os
+import re
+from typing import Any, Dict, List, Tuple
+
+from sierrapy.common_types import ServerVer
+from sierrapy.commands.options import FASTA_PATTERN, CODFREQ_EXT_PATTERN
+from sierrapy.commands.watch import (
+    DirectoryScanner, fasta_output, codfreq_output
+)
+from sierrapy.sierraclient import SierraClient
+
+PATTERNS: List[re.Pattern] = [FASTA_PATTERN, CODFREQ_EXT_PATTERN]
+
+
+def write(path: str, text: str) -> None:
+    with open(path, 'w') as fp:
+        fp.write(text)
+
+
+def polled(scanner: DirectoryScanner) -> List[str]:
+    return [os.path.basename(state.path) for state in scanner.poll()]
+
+
+def test_outputs() -> None:
+    assert fasta_output('d/x.fa') == 'd/x.fa.report.json'
+    assert fasta_output('d/x.fasta') == 'd/x.fasta.report.json'
+    assert fasta_output('d/x.fas.gz') == 'd/x.fas.gz.report.json'
+    assert codfreq_output('d/x.codfreq') == 'd/x.report.json'
+    assert codfreq_output('d/x.codfreq.gz') == 'd/x.report.json'
+    # outputs are never taken for inputs
+    assert not any(
+        pattern.search(fasta_output('x.fa')) for pattern in PATTERNS)
+
+
+def test_files_settle_after_two_polls(tmp_path: Any) -> None:
+    write(str(tmp_path / 'a.fasta'), '>a\nACGT\n')
+    write(str(tmp_path / 'b.codfreq'), 'PR,1,1,AAA,1\n')
+    write(str(tmp_path / 'notes.txt'), 'text')
+    write(str(tmp_path / 'empty.fasta'), '')
+    scanner: DirectoryScanner = DirectoryScanner([str(tmp_path)], PATTERNS)
+    assert polled(scanner) == []
+    assert polled(scanner) == ['a.fasta', 'b.codfreq']
+    # each settled version is returned once
+    assert polled(scanner) == []
+
+
+def test_changing_file(tmp_path: Any) -> None:
+    path: str = str(tmp_path / 'a.fasta')
+    write(path, '>a\nAC')
+    scanner: DirectoryScanner = DirectoryScanner([str(tmp_path)], PATTERNS)
+    polled(scanner)
+    write(path, '>a\nACGT\n')
+    assert polled(scanner) == []
+    assert polled(scanner) == ['a.fasta']
+    # a new version settles again
+    write(path, '>a\nACGT\n>b\nACGT\n')
+    assert polled(scanner) == []
+    assert polled(scanner) == ['a.fasta']
+
+
+def test_forget(tmp_path: Any) -> None:
+    write(str(tmp_path / 'a.fasta'), '>a\nACGT\n')
+    scanner: DirectoryScanner = DirectoryScanner([str(tmp_path)], PATTERNS)
+    polled(scanner)
+    states: Any = scanner.poll()
+    scanner.forget(states)
+    assert polled(scanner) == ['a.fasta']
+
+
+def test_missing_directory(tmp_path: Any) -> None:
+    write(str(tmp_path / 'a.fasta'), '>a\nACGT\n')
+    scanner: DirectoryScanner = DirectoryScanner(
+        [str(tmp_path / 'missing'), str(tmp_path)], PATTERNS)
+    polled(scanner)
+    assert polled(scanner) == ['a.fasta']
+
+
+class VersionedClient(SierraClient):
+    version: str
+    sent: int
+
+    def __init__(self) -> None:
+        super().__init__(
+            'http://localhost/graphql', fetch_schema=False, memo_size=10)
+        self.version = '1.0'
+        self.sent = 0
+
+    def current_version(self) -> Tuple[ServerVer, ServerVer]:
+        version: ServerVer = {'text': self.version, 'publishDate': ''}
+        return version, version
+
+    def _pattern_analysis(
+        self,
+        patterns: Any,
+        pattern_names: Any,
+        query: str,
+        **kw: Any
+    ) -> List[Dict[str, Any]]:
+        self.sent += len(patterns)
+        return [{'name': name} for name in pattern_names]
+
+
+def test_refresh_versions() -> None:
+    client: VersionedClient = VersionedClient()
+    patterns: List[Tuple[str, List[str]]] = [('p1', ['K103N'])]
+    list(client.iter_pattern_analysis(iter(patterns), '', 1))
+    assert client.refresh_versions()[0]['text'] == '1.0'
+    list(client.iter_pattern_analysis(iter(patterns), '', 1))
+    assert client.sent == 1
+    # an upgraded server drops the memoized results
+    client.version = '2.0'
+    assert client.refresh_versions()[0]['text'] == '2.0'
+    assert client.server_versions()[0]['text'] == '2.0'
+    list(client.iter_pattern_analysis(iter(patterns), '', 1))
+    assert client.sent == 2